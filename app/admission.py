@@ -0,0 +1,181 @@
+import math
+import time
+from typing import Dict
+
+
+class AdmissionDenied(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """Allows ``capacity`` events at once, refilled at ``rate`` tokens per second."""
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class Slot:
+    """A held concurrency slot; release it exactly once when the work is done."""
+
+    def __init__(self, controller: "AdmissionController", guest_uuid: str):
+        self._controller = controller
+        self.guest_uuid = guest_uuid
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self.guest_uuid)
+
+
+class AdmissionController:
+    """
+    In-memory admission control for uploads.
+
+    Two independent limits are applied:
+
+    - rate: new files per guest (token bucket of ``guest_limit`` per
+      ``guest_window_sec``) and across all guests (``global_per_min``).
+    - concurrency: requests doing upload I/O at the same time, per guest
+      and in total.
+
+    Pre-upload duplicate lookups have a per-guest bucket of their own
+    (``lookup_per_min``), so the hash endpoint cannot be used to probe for
+    arbitrary files at speed.
+
+    Everything runs on the event loop, so no locking is needed. State is
+    per process and is lost on restart, which only ever errs on the side
+    of letting guests in.
+    """
+
+    # Suggested wait when only the concurrency limit was hit
+    BUSY_RETRY_AFTER_SEC = 2
+    # How often refilled (idle) guest buckets are dropped
+    PRUNE_INTERVAL_SEC = 300
+
+    def __init__(self, *, guest_limit: int, guest_window_sec: float, global_per_min: int,
+                 max_concurrent: int, max_concurrent_per_guest: int, lookup_per_min: int = 60):
+        self.guest_limit = max(1, guest_limit)
+        self.guest_window_sec = max(1.0, guest_window_sec)
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_concurrent_per_guest = max(1, max_concurrent_per_guest)
+        self.lookup_per_min = max(1, lookup_per_min)
+
+        now = time.monotonic()
+        self._global_bucket = TokenBucket(max(1, global_per_min), max(1, global_per_min) / 60, now)
+        self._guest_buckets: Dict[str, TokenBucket] = {}
+        self._lookup_buckets: Dict[str, TokenBucket] = {}
+        self._active: Dict[str, int] = {}
+        self._active_total = 0
+        self._last_prune = now
+        self.rejected = {"rate": 0, "busy": 0, "lookup": 0}
+
+    def _guest_bucket(self, guest_uuid: str, now: float) -> TokenBucket:
+        bucket = self._guest_buckets.get(guest_uuid)
+        if bucket is None:
+            bucket = TokenBucket(self.guest_limit, self.guest_limit / self.guest_window_sec, now)
+            self._guest_buckets[guest_uuid] = bucket
+        return bucket
+
+    def _prune(self, now: float):
+        if now - self._last_prune < self.PRUNE_INTERVAL_SEC:
+            return
+        self._last_prune = now
+        for buckets in (self._guest_buckets, self._lookup_buckets):
+            for guest_uuid in [g for g, b in buckets.items() if b.is_full(now)]:
+                del buckets[guest_uuid]
+
+    def acquire(self, guest_uuid: str, *, new_file: bool, rate_limited: bool = True) -> Slot:
+        """
+        Admits one request or raises AdmissionDenied.
+
+        ``new_file`` charges the rate limits (a plain upload or the start of a
+        chunked one); chunk PUTs only take a concurrency slot. ``rate_limited``
+        False skips the per-guest rate, e.g. during an "unlimited" schedule block.
+        """
+        now = time.monotonic()
+        self._prune(now)
+
+        if (self._active_total >= self.max_concurrent
+                or self._active.get(guest_uuid, 0) >= self.max_concurrent_per_guest):
+            self.rejected["busy"] += 1
+            raise AdmissionDenied("Server is busy, please retry shortly.", self.BUSY_RETRY_AFTER_SEC)
+
+        if new_file:
+            guest_bucket = self._guest_bucket(guest_uuid, now) if rate_limited else None
+            if guest_bucket is not None:
+                wait = guest_bucket.wait_time(now)
+                if wait > 0:
+                    self.rejected["rate"] += 1
+                    raise AdmissionDenied("Upload limit reached, please wait a few minutes.", wait)
+            wait = self._global_bucket.wait_time(now)
+            if wait > 0:
+                self.rejected["rate"] += 1
+                raise AdmissionDenied("Server is busy, please retry shortly.", wait)
+            # Charge only once every check has passed
+            if guest_bucket is not None:
+                guest_bucket.take()
+            self._global_bucket.take()
+
+        self._active[guest_uuid] = self._active.get(guest_uuid, 0) + 1
+        self._active_total += 1
+        return Slot(self, guest_uuid)
+
+    def check_lookup(self, guest_uuid: str):
+        """Charges one duplicate lookup to ``guest_uuid`` or raises AdmissionDenied."""
+        now = time.monotonic()
+        self._prune(now)
+        bucket = self._lookup_buckets.get(guest_uuid)
+        if bucket is None:
+            bucket = TokenBucket(self.lookup_per_min, self.lookup_per_min / 60, now)
+            self._lookup_buckets[guest_uuid] = bucket
+        wait = bucket.wait_time(now)
+        if wait > 0:
+            self.rejected["lookup"] += 1
+            raise AdmissionDenied("Too many requests, please wait a moment.", wait)
+        bucket.take()
+
+    def _release(self, guest_uuid: str):
+        self._active_total -= 1
+        remaining = self._active.get(guest_uuid, 0) - 1
+        if remaining > 0:
+            self._active[guest_uuid] = remaining
+        else:
+            self._active.pop(guest_uuid, None)
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active_total,
+            "max_concurrent": self.max_concurrent,
+            "rejected_rate": self.rejected["rate"],
+            "rejected_busy": self.rejected["busy"],
+            "rejected_lookup": self.rejected["lookup"],
+        }
@@ -0,0 +1,80 @@
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from fastapi import Request, status
+from fastapi.responses import Response
+
+# Distinct cached responses kept at once (feed filter combinations, /config)
+MAX_ENTRIES = 256
+
+
+class CachedBody:
+    __slots__ = ("body", "etag", "generation", "expires")
+
+    def __init__(self, body: bytes, generation: int, expires: Optional[float]):
+        self.body = body
+        # Strong validator: same bytes, same tag
+        self.etag = f'"g{generation}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        self.generation = generation
+        self.expires = expires
+
+
+class ResponseCache:
+    """
+    Rendered JSON bodies of read endpoints that every client polls, keyed on
+    path and query parameters.
+
+    Entries are only valid for the current ``generation``, which is bumped on
+    every change clients are told about (uploads, moderation, thumbnails,
+    banner, schedule; see EventHub listeners in main.py), so a poll between
+    changes costs a dict lookup and no database work. Entries can also carry
+    a TTL for bodies that depend on the clock. Responses carry the ETag, and
+    ``If-None-Match`` is answered with 304.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self, *_):
+        self.generation += 1
+        self._entries.clear()
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is None or (entry.expires is not None and time.monotonic() >= entry.expires):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, body: bytes, generation: int, ttl: Optional[float] = None) -> CachedBody:
+        """
+        Stores ``body`` rendered at ``generation`` (read it before querying).
+        If the generation moved on meanwhile the body may be stale, so it is
+        returned but not kept.
+        """
+        entry = CachedBody(body, generation, time.monotonic() + ttl if ttl else None)
+        if generation == self.generation:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def response(request: Request, entry: CachedBody) -> Response:
+        # no-cache: clients keep the body but revalidate, which is a cheap 304
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == entry.etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {"generation": self.generation, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.integrity import WriteSampler
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Out-of-order chunks are kept in memory (up to this many) so the hash can be
+# advanced without reading them back from disk once the gap before them fills.
+MAX_PENDING_CHUNKS = 8
+
+# Finalized uploads remembered so a retried finalize gets the original result
+FINISHED_KEEP = 256
+
+
+class ChunkedUpload:
+    """
+    A single resumable upload.
+
+    Chunks may arrive in any order (the client sends several in parallel) and
+    are written at their offset in a staging ``.part`` file. The SHA-256 is
+    advanced incrementally over the contiguous prefix received so far, so by
+    the time the last chunk lands the digest is ready without a second pass.
+    """
+
+    def __init__(self, staging_dir: str, meta: dict):
+        self.staging_dir = staging_dir
+        self.upload_id = meta["upload_id"]
+        self.guest_uuid = meta["guest_uuid"]
+        self.guest_name = meta["guest_name"]
+        self.table_number = meta.get("table_number")
+        self.filename = meta["filename"]
+        self.content_type = meta["content_type"]
+        self.caption = meta.get("caption")
+        self.size = meta["size"]
+        self.chunk_size = meta["chunk_size"]
+        self.created_at = meta.get("created_at", time.time())
+        self.received = set(meta.get("received", []))
+        self.sample_stride = meta.get("sample_stride", 1)
+        self.sampler = WriteSampler.from_list(self.chunk_size, self.sample_stride, meta.get("samples", []))
+
+        # Runtime-only hashing state. After a restart this starts from zero and
+        # catches up by reading already-received chunks back from disk.
+        self._hasher = hashlib.sha256()
+        self._hashed_chunks = 0
+        self._pending: Dict[int, bytes] = {}
+        self._lock = asyncio.Lock()
+
+        # Finalize runs once: a concurrent (or retried) call waits for it and
+        # gets the same result instead of finding the staging file gone
+        self.finalize_lock = asyncio.Lock()
+        self.finalized = False
+        self.result: Optional[dict] = None
+
+    @property
+    def part_path(self) -> str:
+        return os.path.join(self.staging_dir, f"{self.upload_id}.part")
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.staging_dir, f"{self.upload_id}.json")
+
+    @property
+    def total_chunks(self) -> int:
+        return (self.size + self.chunk_size - 1) // self.chunk_size
+
+    @property
+    def is_complete(self) -> bool:
+        return len(self.received) == self.total_chunks
+
+    def expected_length(self, index: int) -> int:
+        if index == self.total_chunks - 1:
+            return self.size - index * self.chunk_size
+        return self.chunk_size
+
+    def contiguous_offset(self) -> int:
+        """Bytes received without gaps from the start of the file."""
+        index = 0
+        while index in self.received:
+            index += 1
+        return min(index * self.chunk_size, self.size)
+
+    def status(self) -> dict:
+        return {
+            "upload_id": self.upload_id,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "total_chunks": self.total_chunks,
+            "received": sorted(self.received),
+            "offset": self.contiguous_offset(),
+        }
+
+    def _save_manifest(self):
+        meta = {
+            "upload_id": self.upload_id,
+            "guest_uuid": self.guest_uuid,
+            "guest_name": self.guest_name,
+            "table_number": self.table_number,
+            "filename": self.filename,
+            "content_type": self.content_type,
+            "caption": self.caption,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "created_at": self.created_at,
+            "received": sorted(self.received),
+            "sample_stride": self.sample_stride,
+            "samples": self.sampler.to_list(),
+        }
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _write_at(self, offset: int, data: bytes):
+        fd = os.open(self.part_path, os.O_WRONLY)
+        try:
+            os.pwrite(fd, data, offset)
+        finally:
+            os.close(fd)
+
+    def _read_chunk(self, index: int) -> bytes:
+        fd = os.open(self.part_path, os.O_RDONLY)
+        try:
+            return os.pread(fd, self.expected_length(index), index * self.chunk_size)
+        finally:
+            os.close(fd)
+
+    async def write_chunk(self, index: int, data: bytes):
+        """Stores chunk ``index``. Re-sending an already received chunk is a no-op."""
+        if not 0 <= index < self.total_chunks:
+            raise ValueError("Chunk index out of range.")
+        if len(data) != self.expected_length(index):
+            raise ValueError("Chunk has the wrong length.")
+        if index in self.received:
+            return
+
+        await asyncio.to_thread(self._write_at, index * self.chunk_size, data)
+
+        async with self._lock:
+            self.received.add(index)
+            self.sampler.record(index * self.chunk_size, data)
+            if index >= self._hashed_chunks and len(self._pending) < MAX_PENDING_CHUNKS:
+                self._pending[index] = data
+            await asyncio.to_thread(self._save_manifest)
+            await self._advance_hash()
+
+    async def _advance_hash(self):
+        while self._hashed_chunks in self.received:
+            index = self._hashed_chunks
+            data = self._pending.pop(index, None)
+            if data is None:
+                data = await asyncio.to_thread(self._read_chunk, index)
+            await asyncio.to_thread(self._hasher.update, data)
+            self._hashed_chunks += 1
+
+    async def hexdigest(self) -> str:
+        async with self._lock:
+            await self._advance_hash()
+            return self._hasher.hexdigest()
+
+    def discard(self):
+        for path in (self.part_path, self.manifest_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class ChunkedUploadStore:
+    """Tracks in-flight chunked uploads, backed by manifests in the staging dir."""
+
+    def __init__(self, staging_dir: str):
+        self.staging_dir = staging_dir
+        self._sessions: Dict[str, ChunkedUpload] = {}
+        self._finished: "OrderedDict[str, ChunkedUpload]" = OrderedDict()
+
+    def create(self, *, guest_info: dict, filename: str, content_type: str,
+               size: int, chunk_size: int, caption: Optional[str],
+               sample_stride: int = 1) -> ChunkedUpload:
+        os.makedirs(self.staging_dir, exist_ok=True)
+        session = ChunkedUpload(self.staging_dir, {
+            "upload_id": uuid.uuid4().hex,
+            "guest_uuid": guest_info["uuid"],
+            "guest_name": guest_info["name"],
+            "table_number": guest_info["table"],
+            "filename": filename,
+            "content_type": content_type,
+            "caption": caption,
+            "size": size,
+            "chunk_size": chunk_size,
+            "sample_stride": sample_stride,
+        })
+        # Pre-size the staging file so chunks can be written at any offset
+        with open(session.part_path, "wb") as f:
+            f.truncate(size)
+        session._save_manifest()
+        self._sessions[session.upload_id] = session
+        return session
+
+    def get(self, upload_id: str) -> Optional[ChunkedUpload]:
+        if not UPLOAD_ID_RE.match(upload_id):
+            return None
+        session = self._sessions.get(upload_id) or self._finished.get(upload_id)
+        if session:
+            return session
+
+        # Not in memory (e.g. the app restarted): reload from the manifest
+        session_manifest = os.path.join(self.staging_dir, f"{upload_id}.json")
+        if not os.path.exists(session_manifest):
+            return None
+        try:
+            with open(session_manifest, "r") as f:
+                session = ChunkedUpload(self.staging_dir, json.load(f))
+        except Exception as e:
+            logger.error(f"Could not load upload manifest {upload_id}: {e}")
+            return None
+        if not os.path.exists(session.part_path):
+            return None
+        self._sessions[upload_id] = session
+        return session
+
+    def usage(self, guest_uuid: str) -> Tuple[int, int]:
+        """(uploads ``guest_uuid`` has open, bytes reserved by all open uploads)."""
+        if os.path.isdir(self.staging_dir):
+            # Picks up uploads from before a restart that nobody resumed yet
+            for name in os.listdir(self.staging_dir):
+                if name.endswith(".json") and name[:-len(".json")] not in self._sessions:
+                    self.get(name[:-len(".json")])
+        sessions = list(self._sessions.values())
+        mine = sum(1 for s in sessions if s.guest_uuid == guest_uuid)
+        return mine, sum(s.size for s in sessions)
+
+    def remove(self, session: ChunkedUpload, delete_files: bool = True):
+        self._sessions.pop(session.upload_id, None)
+        if session.finalized:
+            self._finished[session.upload_id] = session
+            while len(self._finished) > FINISHED_KEEP:
+                self._finished.popitem(last=False)
+        if delete_files:
+            session.discard()
+
+    def purge_stale(self, max_age_sec: float):
+        """Drops uploads that were started but never finalized."""
+        if not os.path.isdir(self.staging_dir):
+            return
+        cutoff = time.time() - max_age_sec
+        for name in os.listdir(self.staging_dir):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-len(".json")]
+            path = os.path.join(self.staging_dir, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+            except OSError:
+                continue
+            session = self.get(upload_id)
+            if session:
+                logger.info(f"Discarding stale upload {upload_id}")
+                self.remove(session)
+            else:
+                os.remove(path)
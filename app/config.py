@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Literal, Optional
 
 class Settings(BaseSettings):
     EVENT_TIMEZONE: str = "America/Los_Angeles"
@@ -9,9 +9,18 @@ class Settings(BaseSettings):
     MAX_LOCAL_STORAGE_GB: float = 40.0
     GENERATE_VIDEO_THUMBNAILS: bool = True
     VIDEO_THUMBNAIL_TIMESTAMP: float = 2.0
-    THROTTLE_DEFAULT_LIMIT: int = 5
+    THUMBNAIL_WIDTHS: List[int] = [320, 800, 1920] # WebP + JPEG derivative per width
+    THUMBNAIL_WORKERS: int = 2 # Separate processes; also caps concurrent ffmpeg runs
+    THUMBNAIL_MAX_ATTEMPTS: int = 3
+    THUMBNAIL_RETRY_DELAY_SEC: int = 30 # Before the first retry, doubling after each further failure
+    THUMBNAIL_FFMPEG_TIMEOUT_SEC: int = 60 # A video frame grab running longer fails the job
+    THROTTLE_DEFAULT_LIMIT: int = 5 # New uploads per guest per window (not applied in "unlimited" mode)
     THROTTLE_WINDOW_MIN: int = 10
+    UPLOAD_GLOBAL_RATE_PER_MIN: int = 120 # New uploads per minute across all guests
+    UPLOAD_MAX_CONCURRENT: int = 12 # Upload/chunk requests doing I/O at once
+    UPLOAD_MAX_CONCURRENT_PER_GUEST: int = 3
     SLIDESHOW_REFRESH_INTERVAL_SEC: int = 300
+    VIEW_FLUSH_INTERVAL_SEC: int = 10 # Slideshow view counts are written in one batch this often
     ADMIN_PASSWORD: str = "changeme"
     ADMIN_MAGIC_TOKEN: str = "magic"
     DISCORD_WEBHOOK_URL: Optional[str] = None
@@ -20,12 +29,58 @@ class Settings(BaseSettings):
     POST_UPLOAD_ACTION_LABEL: Optional[str] = None
     PURGE_PIN: str = "0523"
 
+    # How a finished upload is checked before it is accepted:
+    #   rehash  - re-read the whole file and compare SHA-256 (doubles read I/O)
+    #   fsync   - fsync and compare the on-disk size
+    #   sampled - fsync, size, and compare small windows sampled while writing
+    UPLOAD_VERIFY_MODE: Literal["rehash", "fsync", "sampled"] = "sampled"
+    UPLOAD_VERIFY_SAMPLE_EVERY_MB: int = 16
+
+    # Clients hash files up to this size before uploading to skip duplicates
+    PREUPLOAD_HASH_MAX_MB: int = 200
+    HASH_CHECK_PER_MIN: int = 60 # Duplicate lookups (/media/hash) per guest
+
+    # Chunked (resumable) uploads
+    UPLOAD_CHUNK_SIZE_MB: int = 4
+    UPLOAD_SESSION_TTL_HOURS: int = 24
+    UPLOAD_MAX_SESSIONS_PER_GUEST: int = 10 # Chunked uploads one guest may have open at once
+    UPLOAD_STAGING_MAX_GB: float = 20.0 # Total size reserved by all open chunked uploads
+
     # Paths - Use local paths for dev/test
     UPLOAD_DIR: str = "data/uploads"
+    UPLOAD_STAGING_DIR: str = "data/incoming"
     THUMBNAIL_DIR: str = "data/thumbnails"
     ARCHIVE_DIR: str = "data/archives"
     DATABASE_URL: str = "sqlite+aiosqlite:///data/database.sqlite"
 
+    # What the archive daemon writes to ARCHIVE_DIR:
+    #   zip      - batch_*.zip files holding a second copy of the uploads
+    #   snapshot - snapshot_* directories of hardlinks (or reflinks) plus
+    #              index.json; almost no extra disk on the same filesystem
+    ARCHIVE_MODE: Literal["zip", "snapshot"] = "zip"
+    # New uploads are split into batches of about this size; ZIP batches are
+    # built on up to ARCHIVE_WORKERS processes at once
+    ARCHIVE_BATCH_MB: int = 1024
+    ARCHIVE_WORKERS: int = 2
+
+    # Where the archive daemon listens for app events (default: daemon.sock next to the database)
+    DAEMON_NOTIFY_SOCKET: Optional[str] = None
+
+    # Database backups (SQLite online backup API, gzipped, newest kept)
+    DB_BACKUP_KEEP: int = 12
+    DB_BACKUP_PAGES_PER_STEP: int = 1024
+    DB_BACKUP_STEP_SLEEP_MS: int = 10
+
+    # SQLite connections: a small write pool (one writer at a time anyway) and
+    # a separate read-only pool, each connection set up with these PRAGMAs
+    DB_WRITE_POOL_SIZE: int = 4
+    DB_READ_POOL_SIZE: int = 8
+    DB_POOL_TIMEOUT_SEC: int = 30
+    SQLITE_BUSY_TIMEOUT_MS: int = 10000
+    SQLITE_CACHE_SIZE_MB: int = 32 # Per connection
+    SQLITE_MMAP_SIZE_MB: int = 256
+    SQLITE_TEMP_STORE: Literal["default", "file", "memory"] = "memory"
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,64 @@
+from collections import Counter
+from typing import Tuple
+
+from sqlalchemy import select, func
+
+from app.models import Media
+
+
+class MediaCounters:
+    """
+    Media counts by file type and visibility, held in memory so the stats
+    endpoints never scan ``media``.
+
+    Seeded with one GROUP BY at startup, then adjusted by the routes that add,
+    delete, hide or unhide media, right after their transaction commits. The
+    app is the only writer of ``media``, so the counts stay exact.
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+
+    async def seed(self, db):
+        result = await db.execute(
+            select(Media.file_type, Media.is_hidden, func.count(Media.id))
+            .group_by(Media.file_type, Media.is_hidden)
+        )
+        counts = Counter()
+        for file_type, is_hidden, count in result:
+            counts[self._key(file_type, is_hidden)] += count
+        self._counts = counts
+
+    @staticmethod
+    def _key(file_type: str, is_hidden) -> Tuple[str, bool]:
+        return file_type, bool(is_hidden)
+
+    def added(self, file_type: str, is_hidden: bool = False):
+        self._counts[self._key(file_type, is_hidden)] += 1
+
+    def removed(self, file_type: str, is_hidden: bool):
+        key = self._key(file_type, is_hidden)
+        self._counts[key] = max(0, self._counts[key] - 1)
+
+    def visibility_changed(self, file_type: str, was_hidden: bool, is_hidden: bool):
+        if bool(was_hidden) != bool(is_hidden):
+            self.removed(file_type, was_hidden)
+            self.added(file_type, is_hidden)
+
+    def reset(self):
+        self._counts = Counter()
+
+    def public(self) -> dict:
+        """Visible media only, as shown on the slideshow."""
+        photos = self._counts[("image", False)]
+        videos = self._counts[("video", False)]
+        total = sum(count for (_, hidden), count in self._counts.items() if not hidden)
+        return {"photos": photos, "videos": videos, "total_media": total}
+
+    def totals(self) -> dict:
+        """Everything, hidden included, for the admin dashboard."""
+        return {
+            "total": sum(self._counts.values()),
+            "photos": self._counts[("image", False)] + self._counts[("image", True)],
+            "videos": self._counts[("video", False)] + self._counts[("video", True)],
+        }
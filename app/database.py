@@ -1,8 +1,13 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import text
+from sqlalchemy import text, event
+from sqlalchemy.exc import OperationalError
 from app.config import settings
 import os
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
 
 # Ensure the directory for the database exists if it's a file path
 if "sqlite" in settings.DATABASE_URL:
@@ -26,16 +31,124 @@ if "sqlite" in settings.DATABASE_URL:
              except OSError as e:
                  print(f"Warning: Could not create directory {directory}: {e}")
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}, # Needed for SQLite
-)
+def sqlite_pragmas(read_only: bool = False) -> List[str]:
+    """
+    Per-connection PRAGMA profile. These settings do not persist in the
+    database file, so they are applied to every new pooled connection.
+    """
+    pragmas = [
+        # Wait for the write lock instead of failing with "database is locked"
+        f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size = {-settings.SQLITE_CACHE_SIZE_MB * 1024}", # negative = KiB
+        f"PRAGMA mmap_size = {settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+        f"PRAGMA temp_store = {settings.SQLITE_TEMP_STORE}",
+        # Safe with WAL: a power cut can lose the last commits, never corrupt
+        "PRAGMA synchronous = NORMAL",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+def make_engine(url: str, *, pool_size: int, read_only: bool = False):
+    """An engine whose pool holds at most ``pool_size`` connections, each configured by sqlite_pragmas()."""
+    new_engine = create_async_engine(
+        url,
+        connect_args={"check_same_thread": False}, # Needed for SQLite
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+    )
+    if "sqlite" in url:
+        pragmas = sqlite_pragmas(read_only)
+
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _configure(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return new_engine
+
+# SQLite has one writer at a time, so the write pool is kept small: extra
+# write connections would only wait on the file lock. Reads have their own
+# pool and, with WAL, never wait for a writer or for a write connection.
+engine = make_engine(settings.DATABASE_URL, pool_size=settings.DB_WRITE_POOL_SIZE)
+read_engine = make_engine(settings.DATABASE_URL, pool_size=settings.DB_READ_POOL_SIZE, read_only=True)
 
 SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
+ReadSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=AsyncSession)
 
 Base = declarative_base()
 
+# Indexes for /slideshow/feed and the admin filters. Every feed page is ordered
+# by (created_at DESC, id DESC), so each filter combination gets an index in
+# that order and SQLite walks it backwards instead of sorting. The partial
+# ones match the literal `is_hidden = 0` / `= 1` SQLAlchemy renders for booleans.
+FEED_INDEXES = [
+    # Admin, no filter
+    "CREATE INDEX IF NOT EXISTS ix_media_feed ON media (created_at, id)",
+    # Admin, type filter
+    "CREATE INDEX IF NOT EXISTS ix_media_type_feed ON media (file_type, created_at, id)",
+    # Public feed
+    "CREATE INDEX IF NOT EXISTS ix_media_visible_feed ON media (created_at, id) WHERE is_hidden = 0",
+    "CREATE INDEX IF NOT EXISTS ix_media_visible_type_feed ON media (file_type, created_at, id) WHERE is_hidden = 0",
+    # Admin starred / hidden filters
+    "CREATE INDEX IF NOT EXISTS ix_media_starred_feed ON media (created_at, id) WHERE is_starred = 1",
+    "CREATE INDEX IF NOT EXISTS ix_media_hidden_feed ON media (created_at, id) WHERE is_hidden = 1",
+    # /my-uploads
+    "CREATE INDEX IF NOT EXISTS ix_media_guest_feed ON media (guest_uuid, created_at)",
+    # Delta feed (?since=)
+    "CREATE INDEX IF NOT EXISTS ix_media_change_seq ON media (change_seq)",
+]
+
+# One sequence across media and media_tombstones: the next value is the
+# highest in either table plus one (writes are serialized, so it only grows)
+_NEXT_CHANGE_SEQ = (
+    "(SELECT MAX(COALESCE((SELECT MAX(change_seq) FROM media), 0), "
+    "COALESCE((SELECT MAX(change_seq) FROM media_tombstones), 0)) + 1)"
+)
+
+# Change log for the delta feed: inserts, the updates a slideshow shows
+# (moderation, captions, thumbnails; not view counts) and deletes each take
+# the next sequence number
+CHANGE_LOG_SCHEMA = [
+    "CREATE TRIGGER IF NOT EXISTS media_change_insert AFTER INSERT ON media BEGIN "
+    "DELETE FROM media_tombstones WHERE media_id = new.id; "
+    f"UPDATE media SET change_seq = {_NEXT_CHANGE_SEQ} WHERE id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS media_change_update AFTER UPDATE OF "
+    "is_hidden, is_starred, caption, uploaded_by, thumbnail_path, thumbnail_widths ON media BEGIN "
+    f"UPDATE media SET change_seq = {_NEXT_CHANGE_SEQ} WHERE id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS media_change_delete AFTER DELETE ON media BEGIN "
+    f"INSERT OR REPLACE INTO media_tombstones (media_id, change_seq) VALUES (old.id, {_NEXT_CHANGE_SEQ}); END",
+]
+
+# Full-text index over the fields the admin search matches (external content:
+# the text lives in media, media_fts only holds the index). The triggers keep
+# it in step with every insert, update and delete of media.
+MEDIA_FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS media_fts USING fts5("
+    "caption, uploaded_by, original_filename, content='media', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS media_fts_insert AFTER INSERT ON media BEGIN "
+    "INSERT INTO media_fts(rowid, caption, uploaded_by, original_filename) "
+    "VALUES (new.id, new.caption, new.uploaded_by, new.original_filename); END",
+    "CREATE TRIGGER IF NOT EXISTS media_fts_delete AFTER DELETE ON media BEGIN "
+    "INSERT INTO media_fts(media_fts, rowid, caption, uploaded_by, original_filename) "
+    "VALUES ('delete', old.id, old.caption, old.uploaded_by, old.original_filename); END",
+    "CREATE TRIGGER IF NOT EXISTS media_fts_update AFTER UPDATE OF caption, uploaded_by, original_filename ON media BEGIN "
+    "INSERT INTO media_fts(media_fts, rowid, caption, uploaded_by, original_filename) "
+    "VALUES ('delete', old.id, old.caption, old.uploaded_by, old.original_filename); "
+    "INSERT INTO media_fts(rowid, caption, uploaded_by, original_filename) "
+    "VALUES (new.id, new.caption, new.uploaded_by, new.original_filename); END",
+]
+
+# Set by init_db; searches fall back to LIKE when SQLite was built without FTS5
+fts_enabled = False
+
 async def init_db():
+    global fts_enabled
+
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
@@ -58,12 +171,64 @@ async def init_db():
         except:
             await conn.execute(text("ALTER TABLE media ADD COLUMN last_viewed DATETIME;"))
 
+        try:
+            await conn.execute(text("SELECT thumbnail_widths FROM media LIMIT 1;"))
+        except:
+            await conn.execute(text("ALTER TABLE media ADD COLUMN thumbnail_widths VARCHAR;"))
+
+        try:
+            await conn.execute(text("SELECT change_seq FROM media LIMIT 1;"))
+        except:
+            await conn.execute(text("ALTER TABLE media ADD COLUMN change_seq INTEGER;"))
+            # Existing rows count as changed in upload order
+            await conn.execute(text("UPDATE media SET change_seq = id;"))
+
+        try:
+            await conn.execute(text("SELECT not_before FROM thumbnail_jobs LIMIT 1;"))
+        except:
+            await conn.execute(text("ALTER TABLE thumbnail_jobs ADD COLUMN not_before DATETIME;"))
+
+        try:
+            await conn.execute(text("SELECT upload_sha256 FROM archive_manifest LIMIT 1;"))
+        except:
+            await conn.execute(text("ALTER TABLE archive_manifest ADD COLUMN upload_sha256 VARCHAR;"))
+            await conn.execute(text("ALTER TABLE archive_manifest ADD COLUMN hash_mismatch BOOLEAN DEFAULT 0;"))
+            await conn.execute(text("UPDATE archive_manifest SET upload_sha256 = sha256;"))
+
+        for statement in FEED_INDEXES:
+            await conn.execute(text(statement))
+
+        if "sqlite" in settings.DATABASE_URL:
+            for statement in CHANGE_LOG_SCHEMA:
+                await conn.execute(text(statement))
 
         # Enable WAL mode for SQLite
         if "sqlite" in settings.DATABASE_URL:
+            # Persistent in the file; synchronous etc. are set per connection by make_engine
             await conn.execute(text("PRAGMA journal_mode=WAL;"))
-            await conn.execute(text("PRAGMA synchronous=NORMAL;"))
+            # Refresh planner statistics where they are stale (cheap when they are not)
+            await conn.execute(text("PRAGMA optimize;"))
+
+        # Full-text search index (after the pragmas: building it opens a write)
+        if "sqlite" in settings.DATABASE_URL:
+            existed = (await conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = 'media_fts'")
+            )).first() is not None
+            try:
+                for statement in MEDIA_FTS_SCHEMA:
+                    await conn.execute(text(statement))
+                if not existed:
+                    # Index the rows that predate the table
+                    await conn.execute(text("INSERT INTO media_fts(media_fts) VALUES ('rebuild')"))
+                fts_enabled = True
+            except OperationalError as e:
+                logger.warning(f"Full-text search unavailable, using LIKE: {e}")
 
 async def get_db():
     async with SessionLocal() as session:
         yield session
+
+async def get_read_db():
+    """Session on the read-only pool, for routes that never write."""
+    async with ReadSessionLocal() as session:
+        yield session
@@ -0,0 +1,91 @@
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Deque, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Events kept for clients that reconnect with Last-Event-ID
+HISTORY_SIZE = 500
+# Events buffered per client before it is considered too slow and dropped
+SUBSCRIBER_QUEUE_SIZE = 200
+
+
+def format_sse(event_id: int, event: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class Subscription:
+    def __init__(self):
+        self.queue: "asyncio.Queue[Tuple[int, str, dict]]" = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        # Set when the client fell behind; it has to reload everything
+        self.overflowed = False
+
+
+class EventHub:
+    """
+    In-process pub/sub for live updates (media, moderation, banner, schedule).
+
+    Publishing never blocks: each subscriber has a bounded queue and one that
+    falls behind is told to resync instead of holding events in memory. Recent
+    events are kept so a reconnecting client only receives what it missed.
+    Events only reach clients of this process, which is fine for the single
+    worker the app runs with.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[Subscription] = set()
+        # In-process callbacks run on every publish, e.g. cache invalidation
+        self._listeners: List[Callable[[str, dict], None]] = []
+        self._history: Deque[Tuple[int, str, dict]] = deque(maxlen=HISTORY_SIZE)
+        # Ids continue from the boot time, so an id from before a restart is
+        # never mistaken for one of ours and the client resyncs instead
+        self._last_id = int(time.time() * 1000)
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def add_listener(self, callback: Callable[[str, dict], None]):
+        self._listeners.append(callback)
+
+    def publish(self, event: str, data: dict):
+        for callback in self._listeners:
+            callback(event, data)
+        self._last_id += 1
+        item = (self._last_id, event, data)
+        self._history.append(item)
+        for sub in list(self._subscribers):
+            if sub.overflowed:
+                continue
+            try:
+                sub.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                logger.warning("Live event subscriber fell behind, asking it to resync")
+                sub.overflowed = True
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Registers a client. With ``last_event_id`` the events it missed are
+        queued first; if they are no longer in the history it must resync.
+        """
+        sub = Subscription()
+        if last_event_id is not None and last_event_id != self._last_id:
+            missed = [item for item in self._history if item[0] > last_event_id]
+            if (last_event_id > self._last_id or not missed
+                    or missed[0][0] != last_event_id + 1 or len(missed) > SUBSCRIBER_QUEUE_SIZE):
+                sub.overflowed = True
+            else:
+                for item in missed:
+                    sub.queue.put_nowait(item)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self._subscribers.discard(sub)
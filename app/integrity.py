@@ -0,0 +1,97 @@
+import os
+import hashlib
+from typing import List, Optional, Tuple
+
+# Size of each sampled window. Only these windows are read back in "sampled" mode.
+SAMPLE_BYTES = 64 * 1024
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class WriteSampler:
+    """
+    Records digests of small windows of a file while it is being written, so
+    the write can later be spot-checked without re-reading the whole file.
+
+    The head of every ``stride``-th block is sampled, plus the tail of the
+    highest block seen (which catches truncation). Blocks may be recorded in
+    any order, as chunked uploads do.
+    """
+
+    def __init__(self, block_size: int, stride: int):
+        self.block_size = block_size
+        self.stride = max(1, stride)
+        self.samples: List[Tuple[int, int, str]] = []
+        self.tail: Optional[Tuple[int, int, str]] = None
+
+    def record(self, offset: int, data: bytes):
+        if not data:
+            return
+        if (offset // self.block_size) % self.stride == 0:
+            window = data[:SAMPLE_BYTES]
+            self.samples.append((offset, len(window), _digest(window)))
+
+        end = offset + len(data)
+        if self.tail is None or end > self.tail[0] + self.tail[1]:
+            window = data[-SAMPLE_BYTES:]
+            self.tail = (end - len(window), len(window), _digest(window))
+
+    def all_samples(self) -> List[Tuple[int, int, str]]:
+        return self.samples + ([self.tail] if self.tail else [])
+
+    def to_list(self) -> list:
+        return [list(s) for s in self.samples] + ([list(self.tail)] if self.tail else [])
+
+    @classmethod
+    def from_list(cls, block_size: int, stride: int, items: list) -> "WriteSampler":
+        sampler = cls(block_size, stride)
+        # A restored tail is kept as a plain sample; it is still checked
+        sampler.samples = [tuple(s) for s in items]
+        return sampler
+
+
+def fsync_path(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def samples_match(fd: int, sampler: WriteSampler, base: int = 0) -> bool:
+    """True if every window ``sampler`` recorded reads back the same, ``base`` bytes into ``fd``."""
+    for offset, length, digest in sampler.all_samples():
+        if _digest(os.pread(fd, length, base + offset)) != digest:
+            return False
+    return True
+
+
+def verify_written_file(path: str, *, mode: str, file_hash: str, size: int,
+                        sampler: Optional[WriteSampler] = None) -> bool:
+    """
+    Checks that ``path`` holds what was written. Blocking; call via a thread.
+
+    - ``rehash``: re-read the whole file and compare SHA-256 (full read I/O).
+    - ``fsync``: flush to stable storage so write errors surface, then check size.
+    - ``sampled``: ``fsync`` plus comparing a handful of sampled windows.
+    """
+    if mode == "rehash":
+        check_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                check_hash.update(chunk)
+        return check_hash.hexdigest() == file_hash
+
+    fsync_path(path)
+    if os.path.getsize(path) != size:
+        return False
+    if mode != "sampled" or sampler is None:
+        return True
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return samples_match(fd, sampler)
+    finally:
+        os.close(fd)
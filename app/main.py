@@ -1,4 +1,5 @@
 import os
+import re
 import json
 import uuid
 import hashlib
@@ -7,43 +8,93 @@ import time
 import shutil
 import logging
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pytz
 import psutil
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Depends, HTTPException, status, UploadFile, File, Form, Response, Cookie
+from fastapi import FastAPI, Request, Depends, HTTPException, status, Form, Body, Response, Cookie
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.security import APIKeyCookie
+from starlette.datastructures import UploadFile
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, desc, func, delete, text, or_, Integer
+from sqlalchemy import select, update, desc, func, delete, text, or_, tuple_, literal, literal_column, table, column, Integer, String
 
 import aiofiles
-from PIL import Image
 import psutil
 
 # App imports
 from app.config import settings
-from app.database import init_db, get_db
-from app.models import Media, AppConfig
+from app import database
+from app.database import init_db, get_read_db, SessionLocal, ReadSessionLocal
+from app.models import Media, MediaTombstone, ArchiveManifest, AppConfig, ThumbnailJob
+from app.admission import AdmissionController, AdmissionDenied
+from app.schedule import ScheduleStore
+from app.chunked import ChunkedUpload, ChunkedUploadStore
+from app.integrity import WriteSampler, verify_written_file
+from app.thumbnail_queue import ThumbnailQueue
+from app.thumbnails import media_stem, derivative_files, thumbnail_urls
+from app.events import EventHub, format_sse
+from app.counters import MediaCounters
+from app.shuffle import ShuffleIndex
+from app.views import ViewCounter
+from app.writer import DbWriter
+from app.serialize import FastJSONResponse, FEED_COLUMNS, UPLOAD_COLUMNS, dumps, feed_rows, upload_rows
+from app.cache import ResponseCache
+from app.notify import DaemonNotifier, notify_socket_path
+from app.export import ExportEntry, unique_arcname, zip_stream
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Live updates for slideshows and guest pages (served at /events)
+event_hub = EventHub()
+
+# Bodies of /config and first feed pages; anything published to the hub changes them
+response_cache = ResponseCache()
+event_hub.add_listener(response_cache.bump)
+# /config includes the seconds left in the current schedule block
+CONFIG_CACHE_TTL_SEC = 2
+
+# The archive daemon is told about every event (see app/notify.py)
+daemon_notifier = DaemonNotifier(notify_socket_path())
+event_hub.add_listener(daemon_notifier.notify)
+
+# Every database write goes through this task (see app/writer.py)
+db_writer = DbWriter(SessionLocal)
+
+thumbnail_queue = ThumbnailQueue(settings.THUMBNAIL_WORKERS, db_writer, event_hub)
+
+media_counters = MediaCounters()
+
+# Play orders for the slideshow's "random" mode
+shuffle_index = ShuffleIndex()
+
+view_counter = ViewCounter(settings.VIEW_FLUSH_INTERVAL_SEC, db_writer)
+
 # --- Lifecycle & Database Init ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up...")
     await init_db()
+    await db_writer.start()
+    async with ReadSessionLocal() as db:
+        await media_counters.seed(db)
+        await shuffle_index.seed(db)
+    await thumbnail_queue.start()
+    await view_counter.start()
 
     yield
     # Shutdown
     logger.info("Shutting down...")
+    await view_counter.stop()
+    await thumbnail_queue.stop()
+    await db_writer.stop()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -51,6 +102,22 @@ app = FastAPI(lifespan=lifespan)
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.THUMBNAIL_DIR, exist_ok=True)
 os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
+os.makedirs(settings.UPLOAD_STAGING_DIR, exist_ok=True)
+
+chunked_uploads = ChunkedUploadStore(settings.UPLOAD_STAGING_DIR)
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+schedule_store = ScheduleStore("schedule.json", settings.EVENT_TIMEZONE)
+
+upload_admission = AdmissionController(
+    guest_limit=settings.THROTTLE_DEFAULT_LIMIT,
+    guest_window_sec=settings.THROTTLE_WINDOW_MIN * 60,
+    global_per_min=settings.UPLOAD_GLOBAL_RATE_PER_MIN,
+    max_concurrent=settings.UPLOAD_MAX_CONCURRENT,
+    max_concurrent_per_guest=settings.UPLOAD_MAX_CONCURRENT_PER_GUEST,
+    lookup_per_min=settings.HASH_CHECK_PER_MIN,
+)
 
 # --- Mount Static & Templates ---
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -68,119 +135,51 @@ def get_current_time_in_zone():
     return datetime.now(tz)
 
 def save_schedule(schedule):
-    schedule_path = "schedule.json"
-    # Sort by start time before saving
-    schedule.sort(key=lambda x: x.get("start", ""))
-    try:
-        with open(schedule_path, "w") as f:
-            json.dump(schedule, f, indent=4)
-    except Exception as e:
-        logger.error(f"Error saving schedule: {e}")
+    schedule_store.save(schedule)
 
 def load_schedule():
-    schedule_path = "schedule.json"
-    if not os.path.exists(schedule_path):
-        return []
-    try:
-        with open(schedule_path, "r") as f:
-            schedule = json.load(f)
-            # Sort by start time to make processing easier
-            schedule.sort(key=lambda x: x.get("start", ""))
-            return schedule
-    except Exception as e:
-        logger.error(f"Error loading or sorting schedule: {e}")
-        return []
+    return schedule_store.load()
 
 def check_schedule_mode():
     """
     Returns the current mode, a message, and time remaining to next state change.
+    Served from the compiled schedule, so this does no file I/O on the hot path.
     """
-    now = get_current_time_in_zone()
-    schedule = load_schedule()
+    return schedule_store.current(get_current_time_in_zone())
 
-    # Defaults
-    current_mode = "standard"
-    message = ""
-    remaining_seconds = None
+def _feed_item(m: Media) -> dict:
+    """Serializes one Media row the way /slideshow/feed and live events send it."""
+    # Ensure created_at has timezone info (UTC) for frontend to localize
+    created_at_iso = m.created_at.isoformat()
+    if m.created_at.tzinfo is None:
+        created_at_iso = m.created_at.replace(tzinfo=pytz.utc).isoformat()
 
-    for i, block in enumerate(schedule):
-        try:
-            start = datetime.fromisoformat(block["start"]).astimezone(pytz.timezone(settings.EVENT_TIMEZONE))
-            end = datetime.fromisoformat(block["end"]).astimezone(pytz.timezone(settings.EVENT_TIMEZONE))
-
-            if start <= now < end:
-                current_mode = block.get("mode", "standard")
-                message = block.get("message", "")
-                remaining_seconds = (end - now).total_seconds()
-                return {
-                    "mode": current_mode,
-                    "message": message,
-                    "remaining_seconds": remaining_seconds
-                }
-            elif now < start:
-                # We are before the next block
-                remaining_seconds = (start - now).total_seconds()
-                # The message here could be about what's coming up, or nothing.
-                # For now, we are in "standard" mode until this block starts.
-                return {
-                    "mode": "standard",
-                    "message": "",
-                    "remaining_seconds": remaining_seconds
-                }
-        except (ValueError, KeyError):
-            continue
-
-    # If we are past all scheduled blocks
     return {
-        "mode": "standard", # Or 'unlimited' if that's the desired default post-event
-        "message": "",
-        "remaining_seconds": None
+        "id": m.id,
+        "url": f"/uploads/{m.filename}",
+        **thumbnail_urls(m.filename, m.thumbnail_path, m.thumbnail_widths),
+        "type": m.file_type,
+        "caption": m.caption,
+        "author": m.uploaded_by,
+        "created_at": created_at_iso,
+        "is_starred": m.is_starred,
+        "file_size": m.file_size_bytes,
+        "is_hidden": m.is_hidden,
+        "filename": m.filename,
+        "original_filename": m.original_filename
     }
 
-async def generate_thumbnail(file_path: str, mime_type: str) -> Optional[str]:
-    """Generates a thumbnail and returns the filename relative to UPLOAD_DIR."""
-    if psutil.cpu_percent() > 90:
-        logger.warning("CPU high, skipping thumbnail generation")
-        return None
-
-    try:
-        thumb_filename = f"thumb_{os.path.basename(file_path)}.jpg"
-        thumb_path = os.path.join(settings.UPLOAD_DIR, thumb_filename)
-
-        if mime_type.startswith("image"):
-            # Use PIL
-            # Note: For heavy load, running this in a thread pool is better
-            await asyncio.to_thread(_process_image_thumbnail, file_path, thumb_path)
-            return thumb_filename
-        elif mime_type.startswith("video") and settings.GENERATE_VIDEO_THUMBNAILS:
-            # Use ffmpeg
-            # ffmpeg -i input.mp4 -ss 00:00:01.000 -vframes 1 output.jpg
-            cmd = [
-                "ffmpeg", "-y",
-                "-ss", str(settings.VIDEO_THUMBNAIL_TIMESTAMP),
-                "-i", file_path,
-                "-vframes", "1",
-                "-q:v", "2",
-                thumb_path
-            ]
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL
-            )
-            await process.wait()
-            if os.path.exists(thumb_path):
-                return thumb_filename
-    except Exception as e:
-        logger.error(f"Thumbnail generation failed: {e}")
-
-    return None
-
-def _process_image_thumbnail(input_path, output_path):
-    with Image.open(input_path) as img:
-        img.thumbnail((800, 800))
-        img = img.convert("RGB")
-        img.save(output_path, "JPEG", quality=70)
+def _remove_thumbnails(media: Media):
+    names = set()
+    if media.thumbnail_widths:
+        widths = [int(w) for w in media.thumbnail_widths.split(",")]
+        names.update(derivative_files(media_stem(media.filename), widths))
+    if media.thumbnail_path:
+        names.add(media.thumbnail_path)
+    for name in names:
+        thumb_path = os.path.join(settings.THUMBNAIL_DIR, name)
+        if os.path.exists(thumb_path):
+            os.remove(thumb_path)
 
 # --- Dependencies ---
 
@@ -198,6 +197,63 @@ async def get_current_guest(request: Request):
     guest_uuid = request.cookies.get("guest_uuid")
     return {"name": guest_name, "table": table_number, "uuid": guest_uuid}
 
+def _admission_slot(guest_info: dict, new_file: bool):
+    """
+    Takes an upload admission slot or raises 429 with Retry-After. Requests
+    that will be refused anyway (no guest identity, blackout) are let through
+    uncharged so the route can return its own error.
+    """
+    if not guest_info["uuid"]:
+        return None
+    mode = check_schedule_mode().get("mode")
+    if mode == "blackout":
+        return None
+    try:
+        return upload_admission.acquire(guest_info["uuid"], new_file=new_file, rate_limited=(mode != "unlimited"))
+    except AdmissionDenied as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.reason,
+            headers={"Retry-After": e.retry_after_header},
+        )
+
+async def admit_new_upload(guest_info: dict = Depends(get_current_guest)):
+    """Dependency for requests that start a new file (rate + concurrency limits)."""
+    slot = _admission_slot(guest_info, new_file=True)
+    try:
+        yield
+    finally:
+        if slot:
+            slot.release()
+
+async def admit_upload_chunk(guest_info: dict = Depends(get_current_guest)):
+    """Dependency for chunk transfers of an already admitted file (concurrency only)."""
+    slot = _admission_slot(guest_info, new_file=False)
+    try:
+        yield
+    finally:
+        if slot:
+            slot.release()
+
+async def read_upload_form(request: Request, guest_info: dict = Depends(get_current_guest)):
+    """
+    Dependency that parses the multipart body. File()/Form() parameters are
+    read by FastAPI before any dependency runs, so upload routes take their
+    fields from this instead and list it after admit_new_upload: a refused
+    upload is answered before its body is received.
+    """
+    _check_guest_allowed(guest_info)
+    async with request.form(max_files=1) as form:
+        yield form
+
+def _form_text(form, name: str, required: bool = False) -> Optional[str]:
+    value = form.get(name)
+    if not isinstance(value, str):
+        if required:
+            raise HTTPException(status_code=400, detail=f"Missing field: {name}.")
+        return None
+    return value
+
 # --- Routes ---
 
 @app.get("/", response_class=HTMLResponse)
@@ -205,7 +261,7 @@ async def index(
     request: Request,
     auth: Optional[str] = None,
     table: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Handle query params for session setting logic (done in JS or redirect?)
     # Easier to just render the template and let JS handle params -> cookie setting if needed,
@@ -223,8 +279,15 @@ async def index(
     return response
 
 @app.get("/config")
-async def get_frontend_config(db: AsyncSession = Depends(get_db)):
-    """Returns dynamic config for frontend."""
+async def get_frontend_config(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """Returns dynamic config for frontend. Cached briefly; supports If-None-Match."""
+    cached = response_cache.get("config")
+    if cached is None:
+        generation = response_cache.generation
+        cached = response_cache.put("config", dumps(await _frontend_config(db)), generation, ttl=CONFIG_CACHE_TTL_SEC)
+    return response_cache.response(request, cached)
+
+async def _frontend_config(db: AsyncSession) -> dict:
     keys = ["GLOBAL_BANNER_MESSAGE_EN", "GLOBAL_BANNER_MESSAGE_ES"]
     result = await db.execute(select(AppConfig).where(AppConfig.key.in_(keys)))
     banners = {c.key: c.value for c in result.scalars()}
@@ -235,6 +298,7 @@ async def get_frontend_config(db: AsyncSession = Depends(get_db)):
         "banner_message_es": banners.get("GLOBAL_BANNER_MESSAGE_ES"),
         "max_file_size_mb": settings.MAX_MEDIA_SIZE_MB,
         "max_video_duration_sec": settings.MAX_VIDEO_DURATION_SEC,
+        "preupload_hash_max_mb": settings.PREUPLOAD_HASH_MAX_MB,
         "mode": schedule_info.get("mode", "standard"),
         "schedule_message": schedule_info.get("message", ""),
         "schedule_remaining_seconds": schedule_info.get("remaining_seconds"),
@@ -242,41 +306,152 @@ async def get_frontend_config(db: AsyncSession = Depends(get_db)):
         "post_upload_label": settings.POST_UPLOAD_ACTION_LABEL
     }
 
-@app.post("/upload")
-async def upload_media(
-    request: Request,
-    file: UploadFile = File(...),
-    caption: Optional[str] = Form(None),
-    guest_info: dict = Depends(get_current_guest),
-    db: AsyncSession = Depends(get_db)
-):
+def _sample_stride(block_size: int) -> int:
+    """Number of blocks between sampled windows for the "sampled" verify mode."""
+    return max(1, settings.UPLOAD_VERIFY_SAMPLE_EVERY_MB * 1024 * 1024 // block_size)
+
+def _integrity_check(size: int, sampler: Optional[WriteSampler] = None):
+    """Returns a ``verify`` callback for _finalize_upload using UPLOAD_VERIFY_MODE."""
+    async def verify(file_path: str, file_hash: str):
+        # 4. Integrity Check - "Write to disk -> Verify"
+        # "rehash" re-reads the whole file; "fsync"/"sampled" keep the guarantee
+        # that the bytes reached the disk intact without doubling read I/O.
+        ok = await asyncio.to_thread(
+            verify_written_file, file_path,
+            mode=settings.UPLOAD_VERIFY_MODE, file_hash=file_hash, size=size, sampler=sampler
+        )
+        if not ok:
+            os.remove(file_path)
+            raise HTTPException(status_code=500, detail="Integrity check failed.")
+    return verify
+
+def _check_guest_allowed(guest_info: dict):
+    """Refusals that do not depend on the request body."""
     schedule_info = check_schedule_mode()
     if schedule_info.get("mode") == "blackout":
         detail_message = schedule_info.get("message") or "Uploads are currently paused."
         raise HTTPException(status_code=403, detail=detail_message)
 
-    # 1. Validation
-    # We can't easily validate size before streaming without relying on Content-Length header, which can be spoofed.
-    # We will monitor size during read.
-
-    content_type = file.content_type
-    if not (content_type.startswith("image/") or content_type.startswith("video/")):
-         raise HTTPException(status_code=400, detail="Invalid file type.")
-
     # Sanitize name
     if not guest_info["uuid"]:
         raise HTTPException(status_code=401, detail="Guest UUID required.")
     if not guest_info["name"]:
         raise HTTPException(status_code=401, detail="Guest name required.")
 
-    safe_name = "".join(c for c in guest_info["name"] if c.isalnum() or c in (' ', '_', '-')).strip()
+def _check_upload_allowed(guest_info: dict, content_type: Optional[str]):
+    """Shared validation for single-request and chunked uploads."""
+    _check_guest_allowed(guest_info)
+
+    if not content_type or not (content_type.startswith("image/") or content_type.startswith("video/")):
+         raise HTTPException(status_code=400, detail="Invalid file type.")
+
+def _make_upload_folder(guest_name: str) -> str:
+    """Creates the per-upload folder in UPLOAD_DIR and returns its name."""
+    safe_name = "".join(c for c in guest_name if c.isalnum() or c in (' ', '_', '-')).strip()
     if not safe_name:
         safe_name = "Anonymous"
 
     timestamp_uuid = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
     upload_folder_name = f"{timestamp_uuid}_{safe_name}"
+    os.makedirs(os.path.join(settings.UPLOAD_DIR, upload_folder_name), exist_ok=True)
+    return upload_folder_name
+
+async def _finalize_upload(
+    db: AsyncSession,
+    *,
+    upload_folder_name: str,
+    unique_filename: str,
+    original_filename: str,
+    content_type: str,
+    size: int,
+    file_hash: str,
+    caption: Optional[str],
+    guest_info: dict,
+    verify=None,
+):
+    """
+    Dedup, integrity check, DB insert and thumbnail job for a file already
+    written into its upload folder. ``verify(file_path, file_hash)`` runs after the
+    dedup check so duplicates never pay for it. ``db`` is only read from; the
+    insert goes through db_writer.
+    """
+    file_path = os.path.join(settings.UPLOAD_DIR, upload_folder_name, unique_filename)
+
+    # 3. Deduplication Check
+    existing = await db.execute(select(Media.id).where(Media.sha256_hash == file_hash).limit(1))
+    if existing.first() is not None:
+        # Duplicate found. Delete the new file, return success.
+        os.remove(file_path)
+        return {"status": "success", "message": "Duplicate detected"}
+
+    # 4. Integrity Check
+    if verify:
+        await verify(file_path, file_hash)
+
+    # 6. Save to DB
+    # Store relative path for filename including folder
+    relative_filename = os.path.join(upload_folder_name, unique_filename)
+
+    async def insert(session: AsyncSession):
+        # Checked again in the write transaction: the same file may have just
+        # been committed by another request
+        existing = await session.execute(select(Media.id).where(Media.sha256_hash == file_hash).limit(1))
+        if existing.first() is not None:
+            return None
+
+        new_media = Media(
+            filename=relative_filename,
+            original_filename=original_filename,
+            file_type="video" if content_type.startswith("video") else "image",
+            mime_type=content_type,
+            file_size_bytes=size,
+            sha256_hash=file_hash,
+            guest_uuid=guest_info["uuid"],
+            uploaded_by=guest_info["name"],
+            table_number=guest_info["table"],
+            caption=caption,
+        )
+        session.add(new_media)
+        await session.flush()
+
+        # 5. Thumbnail is rendered in the background worker pool (saved to THUMBNAIL_DIR)
+        thumbnail_queue.enqueue(session, new_media.id, relative_filename, content_type)
+        await session.refresh(new_media) # created_at comes from the database
+        return _feed_item(new_media)
+
+    item = await db_writer.run(insert)
+    if item is None:
+        os.remove(file_path)
+        return {"status": "success", "message": "Duplicate detected"}
+
+    media_counters.added(item["type"])
+    shuffle_index.add(item["id"], item["is_starred"], datetime.fromisoformat(item["created_at"]))
+    thumbnail_queue.wake()
+    event_hub.publish("media.new", item)
+
+    return {"status": "success", "id": item["id"]}
+
+@app.post("/upload")
+async def upload_media(
+    request: Request,
+    guest_info: dict = Depends(get_current_guest),
+    _admitted: None = Depends(admit_new_upload),
+    form = Depends(read_upload_form),
+    db: AsyncSession = Depends(get_read_db)
+):
+    file = form.get("file")
+    if not isinstance(file, UploadFile):
+        raise HTTPException(status_code=400, detail="No file uploaded.")
+    caption = _form_text(form, "caption")
+
+    # 1. Validation
+    # We can't easily validate size before streaming without relying on Content-Length header, which can be spoofed.
+    # We will monitor size during read.
+    content_type = file.content_type
+    _check_upload_allowed(guest_info, content_type)
+
+    upload_folder_name = _make_upload_folder(guest_info["name"])
     upload_folder_path = os.path.join(settings.UPLOAD_DIR, upload_folder_name)
-    os.makedirs(upload_folder_path, exist_ok=True)
 
     file_ext = os.path.splitext(file.filename)[1]
     unique_filename = f"{uuid.uuid4()}{file_ext}"
@@ -286,16 +461,21 @@ async def upload_media(
     sha256 = hashlib.sha256()
     size = 0
     max_bytes = settings.MAX_MEDIA_SIZE_MB * 1024 * 1024
+    block_size = 1024 * 1024 # 1MB chunks
+    sampler = WriteSampler(block_size, _sample_stride(block_size))
 
     try:
         async with aiofiles.open(file_path, 'wb') as out_file:
-            while content := await file.read(1024 * 1024): # 1MB chunks
-                size += len(content)
-                if size > max_bytes:
+            while content := await file.read(block_size):
+                if size + len(content) > max_bytes:
                     os.remove(file_path)
                     raise HTTPException(status_code=413, detail="File too large.")
                 sha256.update(content)
+                sampler.record(size, content)
+                size += len(content)
                 await out_file.write(content)
+    except HTTPException:
+        raise
     except Exception as e:
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -304,95 +484,242 @@ async def upload_media(
 
     file_hash = sha256.hexdigest()
 
-    # 3. Deduplication Check
-    existing = await db.execute(select(Media).where(Media.sha256_hash == file_hash))
-    if existing.scalar_one_or_none():
-        # Duplicate found. Delete the new file, return success.
-        os.remove(file_path)
-        return {"status": "success", "message": "Duplicate detected"}
-
-    # 4. Integrity Check (Re-read) - "Write to disk -> Re-read -> Verify SHA-256"
-    # To save time, we might skip this if we trust the write, but requirements are explicit.
-    # However, re-reading a 500MB file is expensive.
-    # Let's do a quick size check or assume aiofiles didn't lie.
-    # If explicit strict requirement:
-    async with aiofiles.open(file_path, 'rb') as f:
-        check_hash = hashlib.sha256()
-        while chunk := await f.read(1024*1024):
-            check_hash.update(chunk)
-
-    if check_hash.hexdigest() != file_hash:
-        os.remove(file_path)
-        raise HTTPException(status_code=500, detail="Integrity check failed.")
+    return await _finalize_upload(
+        db,
+        upload_folder_name=upload_folder_name,
+        unique_filename=unique_filename,
+        original_filename=file.filename,
+        content_type=content_type,
+        size=size,
+        file_hash=file_hash,
+        caption=caption,
+        guest_info=guest_info,
+        verify=_integrity_check(size, sampler),
+    )
 
-    # 5. Generate Thumbnail (Save to THUMBNAIL_DIR)
-    thumb_filename = None
+@app.api_route("/media/hash/{sha256}", methods=["GET", "HEAD"])
+async def media_hash_exists(
+    sha256: str,
+    guest_info: dict = Depends(get_current_guest),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Pre-upload dedup: 200 if a file with this SHA-256 is already stored, 404 if
+    not. Clients hash locally and skip the transfer on a hit. Only for guests,
+    and rate limited per guest, since it tells whether a given file was uploaded.
+    """
+    if not guest_info["uuid"]:
+        raise HTTPException(status_code=401, detail="Guest UUID required.")
+    sha256 = sha256.lower()
+    if not SHA256_RE.match(sha256):
+        raise HTTPException(status_code=400, detail="Invalid SHA-256.")
     try:
-        thumb_name = f"thumb_{unique_filename.split('.')[0]}.jpg"
-        thumb_path = os.path.join(settings.THUMBNAIL_DIR, thumb_name)
-
-        if content_type.startswith("image"):
-            await asyncio.to_thread(_process_image_thumbnail, file_path, thumb_path)
-            thumb_filename = thumb_name
-        elif content_type.startswith("video") and settings.GENERATE_VIDEO_THUMBNAILS:
-            cmd = [
-                "ffmpeg", "-y",
-                "-ss", str(settings.VIDEO_THUMBNAIL_TIMESTAMP),
-                "-i", file_path,
-                "-vframes", "1",
-                "-q:v", "2",
-                thumb_path
-            ]
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL
-            )
-            await process.wait()
-            if os.path.exists(thumb_path):
-                thumb_filename = thumb_name
-    except Exception as e:
-        logger.error(f"Thumbnail generation failed: {e}")
+        upload_admission.check_lookup(guest_info["uuid"])
+    except AdmissionDenied as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.reason,
+            headers={"Retry-After": e.retry_after_header},
+        )
 
-    # 6. Save to DB
-    # Store relative path for filename including folder
-    relative_filename = os.path.join(upload_folder_name, unique_filename)
+    existing = await db.execute(select(Media.id).where(Media.sha256_hash == sha256).limit(1))
+    if existing.first() is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"exists": True}
 
-    new_media = Media(
-        filename=relative_filename,
-        original_filename=file.filename,
-        file_type="video" if content_type.startswith("video") else "image",
-        mime_type=content_type,
-        file_size_bytes=size,
-        sha256_hash=file_hash,
-        guest_uuid=guest_info["uuid"],
-        uploaded_by=guest_info["name"],
-        table_number=guest_info["table"],
+# --- Chunked (Resumable) Uploads ---
+# init -> PUT numbered chunks (any order, in parallel) -> GET status to resume -> finalize.
+
+def _get_chunked_upload(upload_id: str, guest_info: dict) -> ChunkedUpload:
+    session = chunked_uploads.get(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found or expired.")
+    if session.guest_uuid != guest_info["uuid"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return session
+
+@app.post("/upload/init")
+async def init_chunked_upload(
+    guest_info: dict = Depends(get_current_guest),
+    _admitted: None = Depends(admit_new_upload),
+    form = Depends(read_upload_form),
+    db: AsyncSession = Depends(get_read_db)
+):
+    filename = _form_text(form, "filename", required=True)
+    content_type = _form_text(form, "content_type", required=True)
+    caption = _form_text(form, "caption")
+    sha256 = _form_text(form, "sha256")
+    try:
+        size = int(_form_text(form, "size", required=True))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid size.")
+    _check_upload_allowed(guest_info, content_type)
+
+    # Client already hashed the file: skip the whole transfer for a duplicate.
+    # The server still hashes what it receives, so a wrong claim only costs the client.
+    if sha256 and SHA256_RE.match(sha256.lower()):
+        existing = await db.execute(select(Media.id).where(Media.sha256_hash == sha256.lower()).limit(1))
+        if existing.first() is not None:
+            return {"status": "success", "message": "Duplicate detected"}
+
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="Empty file.")
+    if size > settings.MAX_MEDIA_SIZE_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="File too large.")
+
+    chunked_uploads.purge_stale(settings.UPLOAD_SESSION_TTL_HOURS * 3600)
+    # Staging files are pre-sized, so every open upload reserves its full size on disk
+    open_sessions, staged_bytes = chunked_uploads.usage(guest_info["uuid"])
+    if open_sessions >= settings.UPLOAD_MAX_SESSIONS_PER_GUEST:
+        raise HTTPException(status_code=429, detail="Too many uploads in progress. Finish or wait for one first.")
+    if staged_bytes + size > settings.UPLOAD_STAGING_MAX_GB * 1024 ** 3:
+        raise HTTPException(status_code=503, detail="Server is busy, try again later.", headers={"Retry-After": "60"})
+
+    chunk_size = settings.UPLOAD_CHUNK_SIZE_MB * 1024 * 1024
+    session = chunked_uploads.create(
+        guest_info=guest_info,
+        filename=filename,
+        content_type=content_type,
+        size=size,
+        chunk_size=chunk_size,
         caption=caption,
-        thumbnail_path=thumb_filename
+        sample_stride=_sample_stride(chunk_size),
     )
-    db.add(new_media)
-    await db.commit()
-    await db.refresh(new_media)
+    return session.status()
 
-    return {"status": "success", "id": new_media.id}
+@app.get("/upload/{upload_id}")
+async def chunked_upload_status(upload_id: str, guest_info: dict = Depends(get_current_guest)):
+    """Lets a client resume: reports which chunks the server already has."""
+    return _get_chunked_upload(upload_id, guest_info).status()
+
+@app.put("/upload/{upload_id}/chunk/{index}")
+async def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    guest_info: dict = Depends(get_current_guest),
+    _admitted: None = Depends(admit_upload_chunk),
+):
+    session = _get_chunked_upload(upload_id, guest_info)
+
+    # Chunks are bounded by UPLOAD_CHUNK_SIZE_MB, so buffering one is fine
+    data = bytearray()
+    async for part in request.stream():
+        data.extend(part)
+        if len(data) > session.chunk_size:
+            raise HTTPException(status_code=413, detail="Chunk too large.")
+
+    try:
+        await session.write_chunk(index, bytes(data))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError as e:
+        logger.error(f"Chunk write failed for {upload_id}: {e}")
+        raise HTTPException(status_code=500, detail="Upload failed.")
+
+    return {"received": len(session.received), "offset": session.contiguous_offset()}
+
+@app.post("/upload/{upload_id}/finalize")
+async def finalize_chunked_upload(
+    upload_id: str,
+    guest_info: dict = Depends(get_current_guest),
+    db: AsyncSession = Depends(get_read_db)
+):
+    session = _get_chunked_upload(upload_id, guest_info)
+    if not session.is_complete:
+        missing = sorted(set(range(session.total_chunks)) - session.received)
+        raise HTTPException(status_code=409, detail={"message": "Missing chunks.", "missing": missing})
+
+    # A retried finalize (the client timed out on the first) waits for the one
+    # in progress and returns its result
+    async with session.finalize_lock:
+        if session.result is not None:
+            return session.result
+        if session.finalized:
+            raise HTTPException(status_code=409, detail="Upload was already finalized.")
+        session.finalized = True
+
+        file_hash = await session.hexdigest()
+
+        upload_folder_name = _make_upload_folder(session.guest_name)
+        file_ext = os.path.splitext(session.filename)[1]
+        unique_filename = f"{uuid.uuid4()}{file_ext}"
+        file_path = os.path.join(settings.UPLOAD_DIR, upload_folder_name, unique_filename)
+
+        # Staging dir lives on the same volume, so this is a rename, not a copy
+        os.replace(session.part_path, file_path)
+        chunked_uploads.remove(session)
+
+        session.result = await _finalize_upload(
+            db,
+            upload_folder_name=upload_folder_name,
+            unique_filename=unique_filename,
+            original_filename=session.filename,
+            content_type=session.content_type,
+            size=session.size,
+            file_hash=file_hash,
+            caption=session.caption,
+            guest_info={"uuid": session.guest_uuid, "name": session.guest_name, "table": session.table_number},
+            verify=_integrity_check(session.size, session.sampler),
+        )
+        return session.result
 
 @app.get("/slideshow", response_class=HTMLResponse)
 async def slideshow(request: Request):
     return templates.TemplateResponse("slideshow.html", {"request": request})
 
-@app.get("/slideshow/feed")
-async def slideshow_feed(
+def _created_at_key(dt: datetime):
+    """
+    ``dt`` as the text SQLite stores in media.created_at, for comparisons.
+    Rows get their timestamp from CURRENT_TIMESTAMP ("YYYY-MM-DD HH:MM:SS");
+    binding a datetime would render ".000000" and sort every row of that
+    second before the cursor, repeating them on the next page. Stored times
+    are UTC, so an aware ``dt`` is converted first.
+    """
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    fmt = "%Y-%m-%d %H:%M:%S.%f" if dt.microsecond else "%Y-%m-%d %H:%M:%S"
+    return literal(dt.strftime(fmt), String)
+
+# bm25 weights for caption, uploaded_by, original_filename: a caption hit ranks
+# above an uploader name, which ranks above a camera filename
+SEARCH_WEIGHTS = (4.0, 2.0, 1.0)
+
+media_fts = table("media_fts", column("rowid"), column("media_fts"))
+
+def _fts_match(q: str) -> Optional[str]:
+    """
+    The search box text as an FTS5 query: every word must match, as a prefix
+    ("wed" finds "wedding"). None when there is no word to search for.
+    """
+    # Same split as the unicode61 tokenizer; quoting keeps FTS5 syntax out
+    terms = re.findall(r"[^\W_]+", q)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _rank_offset(cursor: Optional[str]) -> int:
+    if cursor and cursor.startswith("rank:") and cursor[5:].isdigit():
+        return int(cursor[5:])
+    return 0
+
+def _feed_query(
+    *,
     cursor: Optional[str] = None,
     q: Optional[str] = None,
     limit: int = 20,
     admin_mode: bool = False,
-    order: str = 'newest', # 'random' or 'newest'
+    order: str = 'newest',
     filter: Optional[str] = None,
     type: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
 ):
-    query = select(Media)
+    """
+    Builds the /slideshow/feed query. Every filter combination is served by
+    one of the (created_at, id) indexes created in init_db, so a page is read
+    in index order instead of sorting the filtered table.
+    """
+    # Only the columns a feed item needs, returned as plain rows (see app/serialize.py)
+    query = select(*FEED_COLUMNS)
 
     # 1. Basic Filters
     if not admin_mode:
@@ -406,7 +733,22 @@ async def slideshow_feed(
     if type in ["image", "video"]:
         query = query.where(Media.file_type == type)
 
-    if q:
+    hits = None
+    match = _fts_match(q) if (q and database.fts_enabled) else None
+    if match and order == 'relevance':
+        hits = (
+            select(media_fts.c.rowid.label("media_id"),
+                   func.bm25(literal_column("media_fts"), *SEARCH_WEIGHTS).label("rank"))
+            .where(media_fts.c.media_fts.op("MATCH")(match))
+            .subquery()
+        )
+        query = query.join(hits, hits.c.media_id == Media.id)
+    elif match:
+        # Matching ids as a set, so the page is still read in feed index order
+        query = query.where(Media.id.in_(
+            select(media_fts.c.rowid).where(media_fts.c.media_fts.op("MATCH")(match))
+        ))
+    elif q:
         search = f"%{q}%"
         query = query.where(or_(
             Media.caption.ilike(search),
@@ -418,8 +760,13 @@ async def slideshow_feed(
     # Check if we are in "Random" mode (Public only)
     is_random_order = (not admin_mode) and (order == 'random')
 
-    if is_random_order:
-        # --- Random Mode (No Cursor Pagination) ---
+    if hits is not None:
+        # --- Search results, best match first (offset cursor "rank:<n>") ---
+        query = query.order_by(hits.c.rank, desc(Media.id)).offset(_rank_offset(cursor))
+
+    elif is_random_order:
+        # --- Random Mode with a search or filter (No Cursor Pagination) ---
+        # Plain random mode is served from shuffle_index by slideshow_feed
         now = datetime.now(pytz.utc)
         age_in_minutes = func.julianday('now') * 24 * 60 - func.julianday(Media.created_at) * 24 * 60
         
@@ -437,10 +784,10 @@ async def slideshow_feed(
             try:
                 cursor_ts, cursor_id = cursor.split('_')
                 cursor_dt = datetime.fromisoformat(cursor_ts)
-                
+
+                # Row-value form so SQLite seeks into the index rather than filtering a scan
                 query = query.where(
-                    (Media.created_at < cursor_dt) |
-                    ((Media.created_at == cursor_dt) & (Media.id < int(cursor_id)))
+                    tuple_(Media.created_at, Media.id) < tuple_(_created_at_key(cursor_dt), int(cursor_id))
                 )
             except ValueError:
                 pass 
@@ -448,97 +795,154 @@ async def slideshow_feed(
         # Unified Sort Order
         query = query.order_by(desc(Media.created_at), desc(Media.id))
 
-    # 3. Execution
     query = query.limit(limit)
+    return query
+
+async def _shuffle_feed(db: AsyncSession, cursor: Optional[str], limit: int) -> dict:
+    """
+    Random mode: the next page of this client's weighted play order from
+    shuffle_index, looked up by primary key. The cursor is "<session>:<offset>".
+    """
+    ids, next_cursor = shuffle_index.page(cursor, limit)
+    if not ids:
+        return {"items": [], "next_cursor": next_cursor}
+    result = await db.execute(select(*FEED_COLUMNS).where(Media.id.in_(ids), Media.is_hidden == False))
+    by_id = {item["id"]: item for item in feed_rows(result)}
+    return {"items": [by_id[i] for i in ids if i in by_id], "next_cursor": next_cursor}
+
+async def _change_seq(db: AsyncSession) -> int:
+    """Current high-water mark of the change log (see CHANGE_LOG_SCHEMA in app/database.py)."""
+    media_seq = (await db.execute(select(func.max(Media.change_seq)))).scalar()
+    tombstone_seq = (await db.execute(select(func.max(MediaTombstone.change_seq)))).scalar()
+    return max(media_seq or 0, tombstone_seq or 0)
+
+async def _feed_delta(db: AsyncSession, since: int, limit: int, admin_mode: bool) -> dict:
+    """
+    Changes after the ``since`` mark, oldest first: items inserted or updated
+    (moderation, captions, thumbnails) and ids that were deleted, or hidden
+    for public slideshows. Clients apply ``removed`` first, then ``items``,
+    and pass the returned ``since`` on the next call.
+    """
+    rows = (await db.execute(
+        select(*FEED_COLUMNS, Media.change_seq)
+        .where(Media.change_seq > since).order_by(Media.change_seq).limit(limit)
+    )).all()
+    tombstones = (await db.execute(
+        select(MediaTombstone.media_id, MediaTombstone.change_seq)
+        .where(MediaTombstone.change_seq > since).order_by(MediaTombstone.change_seq).limit(limit)
+    )).all()
+
+    # At most `limit` changes from both tables together, without gaps in the sequence
+    seqs = sorted([row.change_seq for row in rows] + [seq for _, seq in tombstones])[:limit]
+    high = seqs[-1] if seqs else since
+
+    items = feed_rows(row[:-1] for row in rows if row.change_seq <= high)
+    removed = [media_id for media_id, seq in tombstones if seq <= high]
+    if not admin_mode:
+        removed += [item["id"] for item in items if item["is_hidden"]]
+        items = [item for item in items if not item["is_hidden"]]
+    return {"items": items, "removed": removed, "since": high}
 
+@app.get("/slideshow/feed")
+async def slideshow_feed(
+    request: Request,
+    cursor: Optional[str] = None,
+    since: Optional[int] = None, # change_seq mark: only changes after it (see _feed_delta)
+    q: Optional[str] = None,
+    limit: int = 20,
+    admin_mode: bool = False,
+    order: str = 'newest', # 'random', 'newest' or 'relevance' (with q)
+    filter: Optional[str] = None,
+    type: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    if since is not None:
+        return FastJSONResponse(await _feed_delta(db, since, limit, admin_mode))
+
+    if order == 'random' and not (admin_mode or q or filter or type):
+        # Read first: a mark older than the page only repeats changes
+        seq = await _change_seq(db) if not cursor else None
+        content = await _shuffle_feed(db, cursor, limit)
+        if seq is not None:
+            content["since"] = seq
+        return FastJSONResponse(content)
+
+    # First pages are the same for every client until something changes;
+    # random ones (filtered, served by the score query) differ per request
+    cache_key = None
+    if not cursor:
+        if order != 'random':
+            cache_key = ("feed", limit, admin_mode, order, filter, type, q)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return response_cache.response(request, cached)
+            generation = response_cache.generation
+        # Where delta polling (?since=) picks up; read before the page so nothing is missed
+        seq = await _change_seq(db)
+
+    # 1-2. Filters, sorting & pagination
+    query = _feed_query(cursor=cursor, q=q, limit=limit, admin_mode=admin_mode,
+                        order=order, filter=filter, type=type)
+
+    # 3. Execution
     result = await db.execute(query)
-    media_items = result.scalars().all()
-
-    data = []
-    for m in media_items:
-        # Ensure created_at has timezone info (UTC) for frontend to localize
-        created_at_iso = m.created_at.isoformat()
-        if m.created_at.tzinfo is None:
-            created_at_iso = m.created_at.replace(tzinfo=pytz.utc).isoformat()
-
-        data.append({
-            "id": m.id,
-            "url": f"/uploads/{m.filename}",
-            "thumbnail": f"/thumbnails/{m.thumbnail_path}" if m.thumbnail_path else None,
-            "type": m.file_type,
-            "caption": m.caption,
-            "author": m.uploaded_by,
-            "created_at": created_at_iso,
-            "is_starred": m.is_starred,
-            "file_size": m.file_size_bytes,
-            "is_hidden": m.is_hidden,
-            "filename": m.filename,
-            "original_filename": m.original_filename
-        })
+    data = feed_rows(result)
 
     # Optimization: If we got fewer items than limit, we are at the end.
     if len(data) < limit:
         next_cursor = None
+    elif order == 'relevance' and q and database.fts_enabled and _fts_match(q):
+        next_cursor = f"rank:{_rank_offset(cursor) + len(data)}"
     else:
-        last_item = media_items[-1]
-        next_cursor = f"{last_item.created_at.isoformat()}_{last_item.id}" if media_items else None
+        last_item = data[-1]
+        next_cursor = f"{last_item['created_at']}_{last_item['id']}" if data else None
+
+    content = {"items": data, "next_cursor": next_cursor}
+    if not cursor:
+        content["since"] = seq
+    if cache_key:
+        return response_cache.response(request, response_cache.put(cache_key, dumps(content), generation))
+    return FastJSONResponse(content)
 
-    return {"items": data, "next_cursor": next_cursor}
+# Most views one /media/viewed request may report
+MAX_VIEWS_PER_REPORT = 500
 
 @app.post("/media/{media_id}/viewed")
-async def mark_media_viewed(media_id: int, db: AsyncSession = Depends(get_db)):
-    """Increments the view count for a media item."""
-    await db.execute(
-        update(Media)
-        .where(Media.id == media_id)
-        .values(
-            view_count=Media.view_count + 1,
-            last_viewed=func.now()
-        )
-    )
-    await db.commit()
+async def mark_media_viewed(media_id: int):
+    """Counts a view of a media item (written to the database in batches)."""
+    view_counter.record([media_id])
     return {"status": "ok"}
 
+@app.post("/media/viewed")
+async def mark_media_viewed_batch(media_ids: List[int] = Body(...)):
+    """Counts several views at once: a JSON list of media ids, one entry per view."""
+    if len(media_ids) > MAX_VIEWS_PER_REPORT:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_VIEWS_PER_REPORT} views per report")
+    view_counter.record(media_ids)
+    return {"status": "ok", "recorded": len(media_ids)}
+
 
 @app.get("/my-uploads")
 async def my_uploads(
     guest_info: dict = Depends(get_current_guest),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Returns uploads for the current guest session."""
     if not guest_info["uuid"]:
         return []
 
-    query = select(Media).where(
+    query = select(*UPLOAD_COLUMNS).where(
         Media.guest_uuid == guest_info["uuid"]
     ).order_by(desc(Media.created_at))
 
     result = await db.execute(query)
-    media_items = result.scalars().all()
-
-    data = []
-    for m in media_items:
-        # Ensure created_at has timezone info (UTC)
-        created_at_iso = m.created_at.isoformat()
-        if m.created_at.tzinfo is None:
-            created_at_iso = m.created_at.replace(tzinfo=pytz.utc).isoformat()
-
-        data.append({
-            "id": m.id,
-            "url": f"/uploads/{m.filename}",
-            "thumbnail": f"/thumbnails/{m.thumbnail_path}" if m.thumbnail_path else None,
-            "type": m.file_type,
-            "caption": m.caption,
-            "created_at": created_at_iso,
-            "file_size": m.file_size_bytes
-        })
-    return data
+    return FastJSONResponse(upload_rows(result))
 
 @app.delete("/media/{media_id}")
 async def delete_media(
     media_id: int,
     guest_info: dict = Depends(get_current_guest),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Hard delete for user if file exists on disk (not archived/pruned)."""
     media = await db.get(Media, media_id)
@@ -556,27 +960,79 @@ async def delete_media(
         raise HTTPException(400, "Media already archived, cannot delete.")
 
     # Delete
-    await db.delete(media)
-    await db.commit()
+    file_type, is_hidden = media.file_type, media.is_hidden
+
+    async def delete_row(session: AsyncSession):
+        await session.execute(delete(Media).where(Media.id == media_id))
+
+    await db_writer.run(delete_row)
+    media_counters.removed(file_type, is_hidden)
+    shuffle_index.remove(media_id)
+    event_hub.publish("media.delete", {"id": media_id})
 
     try:
         os.remove(full_path)
-        if media.thumbnail_path:
-            thumb_path = os.path.join(settings.THUMBNAIL_DIR, media.thumbnail_path)
-            if os.path.exists(thumb_path):
-                os.remove(thumb_path)
+        _remove_thumbnails(media)
     except Exception as e:
         logger.error(f"Error deleting file: {e}")
 
     return {"status": "deleted"}
 
 @app.get("/public/stats")
-async def public_stats(db: AsyncSession = Depends(get_db)):
-    """Public stats for the live feed."""
-    photo_count = await db.scalar(select(func.count(Media.id)).where(Media.file_type == 'image', Media.is_hidden == False))
-    video_count = await db.scalar(select(func.count(Media.id)).where(Media.file_type == 'video', Media.is_hidden == False))
-    total_count = await db.scalar(select(func.count(Media.id)).where(Media.is_hidden == False))
-    return {"photos": photo_count, "videos": video_count, "total_media": total_count}
+async def public_stats(request: Request):
+    """Public stats for the live feed. Served from in-memory counters; supports If-None-Match."""
+    stats = media_counters.public()
+    etag = f'"stats-{stats["photos"]}-{stats["videos"]}-{stats["total_media"]}"'
+    # no-cache: browsers may keep it but must revalidate, which is a cheap 304
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(stats, headers=headers)
+
+# --- Live Events ---
+
+# Comment line sent when idle, also how often a gone client is noticed
+EVENTS_HEARTBEAT_SEC = 15
+# Streams are closed after this long; browsers reconnect with Last-Event-ID,
+# which also keeps a restart from waiting on open streams
+EVENTS_STREAM_MAX_SEC = 600
+
+@app.get("/events")
+async def live_events(request: Request):
+    """
+    Server-Sent Events stream of live changes, replacing client polling:
+    media.new, media.update, media.delete, banner and schedule. ``resync`` or
+    ``reset`` means the client missed events and should reload from scratch.
+    """
+    try:
+        last_event_id = int(request.headers.get("last-event-id", ""))
+    except ValueError:
+        last_event_id = None
+    sub = event_hub.subscribe(last_event_id)
+
+    async def stream():
+        deadline = time.monotonic() + EVENTS_STREAM_MAX_SEC
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                if sub.overflowed:
+                    yield format_sse(event_hub.last_id, "resync", {})
+                    return
+                try:
+                    event_id, event, data = await asyncio.wait_for(sub.queue.get(), timeout=EVENTS_HEARTBEAT_SEC)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event_id, event, data)
+        finally:
+            event_hub.unsubscribe(sub)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no", # Don't let a reverse proxy hold events back
+    })
 
 # --- Admin Routes ---
 
@@ -609,12 +1065,18 @@ async def admin_login_pass(password: str = Form(...)):
 
 # --- Admin Schedule ---
 
+def _publish_schedule():
+    schedule_info = check_schedule_mode()
+    event_hub.publish("schedule", {
+        "mode": schedule_info.get("mode", "standard"),
+        "schedule_message": schedule_info.get("message", ""),
+        "schedule_remaining_seconds": schedule_info.get("remaining_seconds"),
+    })
+
 @app.get("/admin/schedule")
 async def get_schedule(is_admin: bool = Depends(get_admin_user)):
     if not is_admin: raise HTTPException(status_code=401)
-    schedule = load_schedule()
-    schedule.sort(key=lambda x: x.get('start', ''))
-    return schedule
+    return load_schedule()
 
 @app.post("/admin/schedule")
 async def add_schedule_block(
@@ -643,6 +1105,7 @@ async def add_schedule_block(
     schedule = load_schedule()
     schedule.append(new_block)
     save_schedule(schedule)
+    _publish_schedule()
     return {"status": "ok"}
 
 @app.put("/admin/schedule/{index}")
@@ -655,6 +1118,7 @@ async def update_schedule_block(
     if 0 <= index < len(schedule):
         schedule[index]['message'] = message
         save_schedule(schedule)
+        _publish_schedule()
         return {"status": "ok"}
     raise HTTPException(status_code=404, detail="Schedule block not found")
 
@@ -665,21 +1129,23 @@ async def delete_schedule_block(index: int, is_admin: bool = Depends(get_admin_u
     if 0 <= index < len(schedule):
         schedule.pop(index)
         save_schedule(schedule)
+        _publish_schedule()
         return {"status": "ok"}
     raise HTTPException(status_code=404, detail="Schedule block not found")
 
 
 @app.get("/admin/stats")
-async def admin_stats(is_admin: bool = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
+async def admin_stats(is_admin: bool = Depends(get_admin_user), db: AsyncSession = Depends(get_read_db)):
     if not is_admin: raise HTTPException(status_code=401)
 
     # Disk Usage
     usage = shutil.disk_usage(settings.UPLOAD_DIR)
 
-    # DB Counts
-    total_count = await db.scalar(select(func.count(Media.id)))
-    photo_count = await db.scalar(select(func.count(Media.id)).where(Media.file_type == 'image'))
-    video_count = await db.scalar(select(func.count(Media.id)).where(Media.file_type == 'video'))
+    # Media counts (in-memory, hidden included)
+    counts = media_counters.totals()
+
+    # Background thumbnail queue
+    thumbnail_stats = await thumbnail_queue.stats(db)
 
     # System Metrics
     cpu_usage = psutil.cpu_percent()
@@ -687,12 +1153,14 @@ async def admin_stats(is_admin: bool = Depends(get_admin_user), db: AsyncSession
 
     # Backup Status
     last_backup = "Unknown"
+    daemon_stages = {}
     state_file = os.path.join(settings.ARCHIVE_DIR, "daemon_state.json")
     if os.path.exists(state_file):
         try:
             with open(state_file, 'r') as f:
                 state = json.load(f)
                 ts = state.get("last_rclone_success")
+                daemon_stages = state.get("stages", {})
                 if ts:
                     last_backup = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
         except: pass
@@ -716,15 +1184,20 @@ async def admin_stats(is_admin: bool = Depends(get_admin_user), db: AsyncSession
         "disk_total_gb": round(usage.total / (1024**3), 2),
         "disk_used_gb": round(usage.used / (1024**3), 2),
         "disk_free_gb": round(usage.free / (1024**3), 2),
-        "media_total": total_count,
-        "media_photos": photo_count,
-        "media_videos": video_count,
+        "media_total": counts["total"],
+        "media_photos": counts["photos"],
+        "media_videos": counts["videos"],
         "cpu_percent": cpu_usage,
         "ram_percent": ram.percent,
         "ram_used_gb": round(ram.used / (1024**3), 2),
         "last_backup": last_backup,
+        "daemon_stages": daemon_stages,
         "rclone_configured": rclone_configured,
-        "cpu_temp": cpu_temp
+        "cpu_temp": cpu_temp,
+        "thumbnail_queue": thumbnail_stats,
+        "upload_admission": upload_admission.stats(),
+        "db_writer": db_writer.stats(),
+        "response_cache": response_cache.stats()
     }
 
 @app.post("/admin/banner")
@@ -732,22 +1205,21 @@ async def set_banner(
     message_en: str = Form(""),
     message_es: str = Form(""),
     is_admin: bool = Depends(get_admin_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     if not is_admin: raise HTTPException(status_code=401)
 
-    async def upsert_banner(key: str, value: str):
-        result = await db.execute(select(AppConfig).where(AppConfig.key == key))
-        config = result.scalar_one_or_none()
-        if config:
-            config.value = value
-        elif value: # Only add if not empty
-            db.add(AppConfig(key=key, value=value))
-
-    await upsert_banner("GLOBAL_BANNER_MESSAGE_EN", message_en)
-    await upsert_banner("GLOBAL_BANNER_MESSAGE_ES", message_es)
-
-    await db.commit()
+    async def upsert_banners(session: AsyncSession):
+        for key, value in (("GLOBAL_BANNER_MESSAGE_EN", message_en), ("GLOBAL_BANNER_MESSAGE_ES", message_es)):
+            result = await session.execute(select(AppConfig).where(AppConfig.key == key))
+            config = result.scalar_one_or_none()
+            if config:
+                config.value = value
+            elif value: # Only add if not empty
+                session.add(AppConfig(key=key, value=value))
+
+    await db_writer.run(upsert_banners)
+    event_hub.publish("banner", {"banner_message_en": message_en or None, "banner_message_es": message_es or None})
     return {"status": "updated"}
 
 @app.post("/admin/media/{media_id}/action")
@@ -755,48 +1227,133 @@ async def media_action(
     media_id: int,
     action: str = Form(...), # hide, unhide, star, unstar, delete
     is_admin: bool = Depends(get_admin_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     if not is_admin: raise HTTPException(status_code=401)
 
+    async def apply(session: AsyncSession):
+        media = await session.get(Media, media_id)
+        if not media:
+            raise HTTPException(404, "Media not found")
+        file_type, was_hidden = media.file_type, media.is_hidden
+
+        if action == "hide":
+            media.is_hidden = True
+        elif action == "unhide":
+            media.is_hidden = False
+        elif action == "star":
+            media.is_starred = True
+        elif action == "unstar":
+            media.is_starred = False
+        elif action == "delete":
+            # Soft delete? Or hard? Requirements say "Allow 'Delete' (soft-delete) for 10 minutes after upload" for user.
+            # Admin probably wants hard delete or hide. Let's just hide for safety or delete.
+            # Let's delete from DB and File (the files once the delete is committed).
+            await session.delete(media)
+
+        # Full item, so clients can add back something that was unhidden
+        item = _feed_item(media) if action in ("hide", "unhide", "star", "unstar") else None
+        return file_type, was_hidden, item
+
     media = await db.get(Media, media_id)
     if not media:
         raise HTTPException(404, "Media not found")
+    file_type, was_hidden, item = await db_writer.run(apply)
 
-    if action == "hide":
-        media.is_hidden = True
-    elif action == "unhide":
-        media.is_hidden = False
-    elif action == "star":
-        media.is_starred = True
-    elif action == "unstar":
-        media.is_starred = False
-    elif action == "delete":
-        # Soft delete? Or hard? Requirements say "Allow 'Delete' (soft-delete) for 10 minutes after upload" for user.
-        # Admin probably wants hard delete or hide. Let's just hide for safety or delete.
-        # Let's delete from DB and File.
-        await db.delete(media)
+    if action == "delete":
         # Remove file
         try:
             os.remove(os.path.join(settings.UPLOAD_DIR, media.filename))
-            if media.thumbnail_path:
-                os.remove(os.path.join(settings.THUMBNAIL_DIR, media.thumbnail_path))
+            _remove_thumbnails(media)
         except:
             pass
-
-    await db.commit()
+        media_counters.removed(file_type, was_hidden)
+        shuffle_index.remove(media_id)
+        event_hub.publish("media.delete", {"id": media_id})
+    elif item:
+        media_counters.visibility_changed(file_type, was_hidden, item["is_hidden"])
+        if item["is_hidden"]:
+            shuffle_index.remove(media_id)
+        elif was_hidden:
+            shuffle_index.add(media_id, item["is_starred"], datetime.fromisoformat(item["created_at"]))
+        else:
+            shuffle_index.set_starred(media_id, item["is_starred"])
+        event_hub.publish("media.update", item)
     return {"status": "ok"}
 
+def _parse_export_time(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(400, f"Invalid {name}, expected an ISO date or datetime")
+    # With an offset (2025-06-01T18:00-07:00) the time is converted; without one it is UTC
+    return dt.astimezone(timezone.utc) if dt.tzinfo else dt
+
+@app.get("/admin/export.zip")
+async def admin_export(
+    filter: Optional[str] = None, # 'starred' or 'hidden', as in /slideshow/feed
+    type: Optional[str] = None, # 'image' or 'video'
+    start: Optional[str] = None, # inclusive; UTC unless it has an offset (e.g. 2025-06-01 or 2025-06-01T18:00-07:00)
+    end: Optional[str] = None, # exclusive, same format
+    uploader: Optional[str] = None, # part of the uploader name
+    is_admin: bool = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Streams the selected originals as a ZIP, oldest first, without building it on disk."""
+    if not is_admin: raise HTTPException(status_code=401)
+    start_dt, end_dt = _parse_export_time(start, "start"), _parse_export_time(end, "end")
+
+    query = select(Media.filename, Media.original_filename, Media.mime_type)
+    if filter == "starred":
+        query = query.where(Media.is_starred == True)
+    elif filter == "hidden":
+        query = query.where(Media.is_hidden == True)
+    if type in ["image", "video"]:
+        query = query.where(Media.file_type == type)
+    if start_dt:
+        query = query.where(Media.created_at >= _created_at_key(start_dt))
+    if end_dt:
+        query = query.where(Media.created_at < _created_at_key(end_dt))
+    if uploader:
+        query = query.where(Media.uploaded_by.ilike(f"%{uploader}%"))
+    rows = (await db.execute(query.order_by(Media.created_at, Media.id))).all()
+
+    # Rows are read up front: the session is closed while the archive streams
+    taken = set()
+    entries = [
+        ExportEntry(
+            path=os.path.join(settings.UPLOAD_DIR, filename),
+            arcname=unique_arcname(os.path.dirname(filename), original_filename, os.path.basename(filename), taken),
+            mime_type=mime_type,
+        )
+        for filename, original_filename, mime_type in rows
+    ]
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return StreamingResponse(
+        zip_stream(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="wedding_export_{ts}.zip"'},
+    )
+
 @app.post("/admin/purge")
-async def admin_purge(pin: str = Form(...), is_admin: bool = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
+async def admin_purge(pin: str = Form(...), is_admin: bool = Depends(get_admin_user), db: AsyncSession = Depends(get_read_db)):
     if not is_admin: raise HTTPException(status_code=401)
     if pin != settings.PURGE_PIN:
         raise HTTPException(status_code=403, detail="Invalid PIN")
 
     # 1. Truncate DB
-    await db.execute(delete(Media))
-    await db.execute(delete(AppConfig))
-    await db.commit()
+    async def truncate(session: AsyncSession):
+        await session.execute(delete(Media))
+        await session.execute(delete(ThumbnailJob))
+        await session.execute(delete(AppConfig))
+        # The archives are cleared below; new uploads may reuse the ids
+        await session.execute(delete(ArchiveManifest))
+
+    await db_writer.run(truncate)
+    media_counters.reset()
+    shuffle_index.reset()
 
     # 2. Clear Directories
     def clear_dir(path):
@@ -808,10 +1365,12 @@ async def admin_purge(pin: str = Form(...), is_admin: bool = Depends(get_admin_u
     clear_dir(settings.THUMBNAIL_DIR)
     clear_dir(settings.ARCHIVE_DIR)
 
+    event_hub.publish("reset", {})
+
     return {"status": "purged"}
 
 @app.get("/health")
-async def health_check(db: AsyncSession = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_read_db)):
     # DB
     try:
         await db.execute(text("SELECT 1"))
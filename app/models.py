@@ -32,6 +32,45 @@ class Media(Base):
 
     # Flags
     thumbnail_path = Column(String, nullable=True)
+    thumbnail_widths = Column(String, nullable=True) # e.g. "320,800,1920", see app/thumbnails.py
+
+    # Bumped by triggers on every change a slideshow shows (see CHANGE_LOG_SCHEMA in app/database.py)
+    change_seq = Column(Integer, nullable=True)
+
+class MediaTombstone(Base):
+    """Deleted media, so the delta feed (/slideshow/feed?since=) can report removals."""
+    __tablename__ = "media_tombstones"
+
+    media_id = Column(Integer, primary_key=True)
+    change_seq = Column(Integer, index=True)
+
+class ThumbnailJob(Base):
+    """Durable queue of thumbnail work, drained by the worker pool in app/thumbnail_queue.py."""
+    __tablename__ = "thumbnail_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    media_id = Column(Integer, index=True)
+    source_path = Column(String) # relative to UPLOAD_DIR
+    mime_type = Column(String)
+    status = Column(String, default="pending", index=True) # pending, running, done, failed
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    not_before = Column(DateTime(timezone=True), nullable=True) # retry backoff: not claimed until then
+
+class ArchiveManifest(Base):
+    """Media already written to an archive ZIP; maintained by daemon/archive_daemon.py."""
+    __tablename__ = "archive_manifest"
+
+    media_id = Column(Integer, primary_key=True)
+    batch = Column(String, index=True) # ZIP file name in ARCHIVE_DIR
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    sha256 = Column(String) # of the bytes written to the ZIP
+    upload_sha256 = Column(String, nullable=True) # media.sha256_hash when archived
+    hash_mismatch = Column(Boolean, default=False) # the file on disk no longer matched upload_sha256
 
 class AppConfig(Base):
     __tablename__ = "app_config"
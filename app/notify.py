@@ -0,0 +1,43 @@
+import os
+import socket
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def notify_socket_path() -> str:
+    """
+    Unix datagram socket the archive daemon listens on. By default it sits
+    next to the database: both processes see that directory, and unlike
+    ARCHIVE_DIR it is neither synced by rclone nor emptied by the admin purge.
+    """
+    if settings.DAEMON_NOTIFY_SOCKET:
+        return settings.DAEMON_NOTIFY_SOCKET
+    database_path = settings.DATABASE_URL.split(":///", 1)[-1]
+    return os.path.join(os.path.dirname(database_path), "daemon.sock")
+
+
+class DaemonNotifier:
+    """
+    Tells daemon/archive_daemon.py that something changed: every EventHub
+    event is sent as one datagram holding its name, and the daemon schedules
+    archival and backups from them instead of polling. Fire and forget;
+    while the daemon is not running each send fails quietly.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self.sent = 0
+        self.dropped = 0
+
+    def notify(self, event: str, data: dict = None):
+        try:
+            self._sock.sendto(event.encode(), self.path)
+            self.sent += 1
+        except OSError:
+            # No daemon listening, or its receive queue is full (it catches up on its own timers)
+            self.dropped += 1
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import bisect
+import logging
+from datetime import datetime, tzinfo
+from typing import List, Optional
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+# How often the hot path is allowed to stat schedule.json for outside edits
+RELOAD_CHECK_SEC = 5.0
+
+
+class CompiledSchedule:
+    """
+    schedule.json blocks parsed once into aware datetimes and sorted by start.
+
+    ``max_end[i]`` is the latest end among blocks ``0..i``. It never decreases,
+    so the first block still running at ``now`` can be found by bisecting it
+    instead of scanning every block.
+    """
+
+    def __init__(self, blocks: List[dict], tz: tzinfo):
+        parsed = []
+        for block in blocks:
+            try:
+                start = datetime.fromisoformat(block["start"]).astimezone(tz)
+                end = datetime.fromisoformat(block["end"]).astimezone(tz)
+            except (ValueError, KeyError, TypeError):
+                continue
+            parsed.append((start, end, block.get("mode", "standard"), block.get("message", "")))
+        parsed.sort(key=lambda b: b[0])
+
+        self.blocks = parsed
+        self.starts = [b[0] for b in parsed]
+        self.max_end = []
+        for _, end, _, _ in parsed:
+            self.max_end.append(max(end, self.max_end[-1]) if self.max_end else end)
+
+    def mode_at(self, now: datetime) -> dict:
+        """Mode, message and seconds until the next change, same rules as a linear scan."""
+        # Blocks [0, started) have begun; the earliest of them not yet over wins
+        started = bisect.bisect_right(self.starts, now)
+        running = bisect.bisect_right(self.max_end, now)
+        if running < started:
+            _, end, mode, message = self.blocks[running]
+            return {"mode": mode, "message": message, "remaining_seconds": (end - now).total_seconds()}
+
+        if started < len(self.blocks):
+            # Standard until the next block starts
+            return {"mode": "standard", "message": "", "remaining_seconds": (self.starts[started] - now).total_seconds()}
+
+        # Past all scheduled blocks
+        return {"mode": "standard", "message": "", "remaining_seconds": None}
+
+
+class ScheduleStore:
+    """
+    Owns schedule.json. The compiled form is cached in memory and rebuilt when
+    the admin endpoints save, or when the file's mtime changes (checked at
+    most every RELOAD_CHECK_SEC so manual edits are still picked up).
+    """
+
+    def __init__(self, path: str, timezone: str):
+        self.path = path
+        self.timezone = timezone
+        self._compiled: Optional[CompiledSchedule] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def _stat_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> List[dict]:
+        """The raw blocks, sorted by start."""
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, "r") as f:
+                schedule = json.load(f)
+                # Sort by start time to make processing easier
+                schedule.sort(key=lambda x: x.get("start", ""))
+                return schedule
+        except Exception as e:
+            logger.error(f"Error loading or sorting schedule: {e}")
+            return []
+
+    def save(self, schedule: List[dict]):
+        # Sort by start time before saving
+        schedule.sort(key=lambda x: x.get("start", ""))
+        try:
+            with open(self.path, "w") as f:
+                json.dump(schedule, f, indent=4)
+        except Exception as e:
+            logger.error(f"Error saving schedule: {e}")
+        self.invalidate()
+
+    def invalidate(self):
+        self._compiled = None
+
+    def compiled(self) -> CompiledSchedule:
+        now = time.monotonic()
+        if self._compiled is not None and now - self._checked_at < RELOAD_CHECK_SEC:
+            return self._compiled
+
+        self._checked_at = now
+        mtime = self._stat_mtime()
+        if self._compiled is None or mtime != self._mtime:
+            self._compiled = CompiledSchedule(self.load(), pytz.timezone(self.timezone))
+            self._mtime = mtime
+        return self._compiled
+
+    def current(self, now: datetime) -> dict:
+        return self.compiled().mode_at(now)
@@ -0,0 +1,88 @@
+"""
+Lean serialization for the feed endpoints: only the columns a page needs are
+selected (as plain rows, no ORM objects), created_at is formatted by SQLite,
+and the body is encoded with orjson when it is installed.
+"""
+import json
+from typing import Any, Iterable, List
+
+from fastapi.responses import Response
+from sqlalchemy import func
+
+from app.models import Media
+from app.thumbnails import thumbnail_urls
+
+try:
+    import orjson
+except ImportError: # pragma: no cover - plain json works, just slower
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson. Return it directly so FastAPI skips jsonable_encoder."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# created_at is stored as UTC text ("YYYY-MM-DD HH:MM:SS"); this renders the
+# same ISO string the ORM path produced, with the UTC offset the frontend needs
+created_at_iso = func.strftime("%Y-%m-%dT%H:%M:%S+00:00", Media.created_at).label("created_at")
+
+FEED_COLUMNS = (
+    Media.id, Media.filename, Media.thumbnail_path, Media.thumbnail_widths, Media.file_type,
+    Media.caption, Media.uploaded_by, created_at_iso, Media.is_starred, Media.file_size_bytes,
+    Media.is_hidden, Media.original_filename,
+)
+
+
+def feed_rows(rows: Iterable) -> List[dict]:
+    """FEED_COLUMNS rows as /slideshow/feed items (same shape as main._feed_item)."""
+    return [
+        {
+            "id": media_id,
+            "url": f"/uploads/{filename}",
+            **thumbnail_urls(filename, thumbnail_path, thumbnail_widths),
+            "type": file_type,
+            "caption": caption,
+            "author": uploaded_by,
+            "created_at": created_at,
+            "is_starred": is_starred,
+            "file_size": file_size,
+            "is_hidden": is_hidden,
+            "filename": filename,
+            "original_filename": original_filename,
+        }
+        for (media_id, filename, thumbnail_path, thumbnail_widths, file_type, caption, uploaded_by,
+             created_at, is_starred, file_size, is_hidden, original_filename) in rows
+    ]
+
+
+UPLOAD_COLUMNS = (
+    Media.id, Media.filename, Media.thumbnail_path, Media.thumbnail_widths, Media.file_type,
+    Media.caption, created_at_iso, Media.file_size_bytes,
+)
+
+
+def upload_rows(rows: Iterable) -> List[dict]:
+    """UPLOAD_COLUMNS rows as /my-uploads items."""
+    return [
+        {
+            "id": media_id,
+            "url": f"/uploads/{filename}",
+            **thumbnail_urls(filename, thumbnail_path, thumbnail_widths),
+            "type": file_type,
+            "caption": caption,
+            "created_at": created_at,
+            "file_size": file_size,
+        }
+        for (media_id, filename, thumbnail_path, thumbnail_widths, file_type, caption,
+             created_at, file_size) in rows
+    ]
@@ -0,0 +1,170 @@
+import math
+import time
+import random
+import secrets
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.models import Media
+
+# Weights for the shuffle. An item's chance of coming early is proportional to
+# its weight: starred and fresh uploads keep the boost the old score gave them.
+BASE_WEIGHT = 1.0
+STARRED_WEIGHT = 8.0
+RECENT_WINDOW_SEC = 5 * 60
+RECENT_WEIGHT = 5.0
+# Extra weight for newer items, fading over roughly the first hours
+RECENCY_WEIGHT = 2.0
+
+MAX_SESSIONS = 200
+SESSION_TTL_SEC = 3 * 3600
+
+
+def _timestamp(created_at: Optional[datetime]) -> float:
+    if created_at is None:
+        return time.time()
+    if created_at.tzinfo is None:
+        # SQLite hands back naive UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+def shuffle_weight(is_starred: bool, created_ts: float, now: float) -> float:
+    age_min = max(0.0, now - created_ts) / 60
+    weight = BASE_WEIGHT + RECENCY_WEIGHT * 10 / (age_min + 10)
+    if is_starred:
+        weight += STARRED_WEIGHT
+    if age_min * 60 < RECENT_WINDOW_SEC:
+        weight += RECENT_WEIGHT
+    return weight
+
+
+def weighted_order(items: Dict[int, Tuple[bool, float]], now: float, rng: random.Random) -> List[int]:
+    """
+    Weighted random permutation (Efraimidis-Spirakis): each item draws
+    u^(1/w) and the order is by that key, descending. Compared as log(u)/w.
+    """
+    keyed = [
+        (math.log(1.0 - rng.random()) / shuffle_weight(starred, created_ts, now), media_id)
+        for media_id, (starred, created_ts) in items.items()
+    ]
+    keyed.sort(reverse=True)
+    return [media_id for _, media_id in keyed]
+
+
+class ShuffleSession:
+    def __init__(self, session_id: str, order: List[int], log_position: int):
+        self.session_id = session_id
+        self.order = order
+        # Every id in ``order``, dealt or not: one coming back (unhidden) is not slotted in again
+        self.members: Set[int] = set(order)
+        # Position in ShuffleIndex's upload log when this session last looked
+        self.log_position = log_position
+        self.touched = time.monotonic()
+
+
+class ShuffleIndex:
+    """
+    The visible media ids with what the shuffle weights need, kept in memory,
+    plus per-client play orders for the slideshow's "random" mode.
+
+    A session's order is drawn once (a weighted shuffle over every visible
+    item); each page is then a slice of it, so paging costs O(limit) and never
+    repeats an item. Uploads made after the session started are slotted in at
+    the start of the next page, like the old score's boost for fresh uploads.
+    Kept current by the same routes that update MediaCounters.
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self._items: Dict[int, Tuple[bool, float]] = {}
+        self._log: List[int] = [] # ids in the order they became visible
+        self._sessions: "OrderedDict[str, ShuffleSession]" = OrderedDict()
+        self._rng = rng or random.Random()
+
+    async def seed(self, db):
+        result = await db.execute(
+            select(Media.id, Media.is_starred, Media.created_at).where(Media.is_hidden == False)
+        )
+        self._items = {media_id: (bool(starred), _timestamp(created_at)) for media_id, starred, created_at in result}
+        self._log = []
+        self._sessions.clear()
+
+    def __contains__(self, media_id: int) -> bool:
+        return media_id in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, media_id: int, is_starred: bool, created_at: Optional[datetime]):
+        if media_id not in self._items:
+            self._log.append(media_id)
+        self._items[media_id] = (bool(is_starred), _timestamp(created_at))
+
+    def remove(self, media_id: int):
+        self._items.pop(media_id, None)
+
+    def set_starred(self, media_id: int, is_starred: bool):
+        if media_id in self._items:
+            self._items[media_id] = (bool(is_starred), self._items[media_id][1])
+
+    def reset(self):
+        self._items.clear()
+        self._log = []
+        self._sessions.clear()
+
+    def _new_session(self) -> ShuffleSession:
+        session = ShuffleSession(secrets.token_hex(8), weighted_order(self._items, time.time(), self._rng), len(self._log))
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > MAX_SESSIONS:
+            self._sessions.popitem(last=False)
+        return session
+
+    def _get_session(self, session_id: str) -> Optional[ShuffleSession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session.touched > SESSION_TTL_SEC:
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        session.touched = time.monotonic()
+        return session
+
+    def page(self, cursor: Optional[str], limit: int) -> Tuple[List[int], Optional[str]]:
+        """
+        Ids for the next page and the cursor (``session:offset``) after it.
+        An unknown or expired cursor starts a fresh shuffle.
+        """
+        session, offset = None, 0
+        if cursor and ":" in cursor:
+            session_id, _, raw_offset = cursor.partition(":")
+            session = self._get_session(session_id)
+            offset = int(raw_offset) if raw_offset.isdigit() else 0
+        if session is None:
+            session, offset = self._new_session(), 0
+        offset = min(offset, len(session.order))
+
+        # Uploads since this session last looked go first. Items unhidden since
+        # then keep their place, or stay dealt, if the session already had them.
+        fresh = []
+        for media_id in self._log[session.log_position:]:
+            if media_id in self._items and media_id not in session.members:
+                fresh.append(media_id)
+                session.members.add(media_id)
+        if fresh:
+            session.order[offset:offset] = fresh
+        session.log_position = len(self._log)
+
+        ids = []
+        while offset < len(session.order) and len(ids) < limit:
+            media_id = session.order[offset]
+            offset += 1
+            # Skips items hidden or deleted since the shuffle was drawn
+            if media_id in self._items:
+                ids.append(media_id)
+
+        next_cursor = f"{session.session_id}:{offset}" if offset < len(session.order) else None
+        return ids, next_cursor
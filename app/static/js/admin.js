@@ -17,11 +17,24 @@ function loadStats() {
     ]).then(([adminStats, publicStats]) => {
         const rcloneStatus = adminStats.rclone_configured ? '<span style="color: limegreen;">Configured</span>' : '<span style="color: orange;">Not Configured</span>';
         const cpuTemp = adminStats.cpu_temp !== "N/A" ? `(${adminStats.cpu_temp})` : '';
+        const thumbs = adminStats.thumbnail_queue;
+        const admission = adminStats.upload_admission;
+        const writer = adminStats.db_writer;
+        const writeLatency = writer.commit.avg_ms !== null ? `${writer.commit.avg_ms}ms avg / ${writer.commit.p95_ms}ms p95` : 'n/a';
+        // Archive daemon stages: last run duration, failures flagged
+        const stages = Object.entries(adminStats.daemon_stages || {})
+            .map(([name, s]) => `${name} ${s.last_duration_sec ?? '-'}s${s.last_error ? ' <span style="color: orange;">(failed)</span>' : ''}`)
+            .join(', ') || 'n/a';
+        const thumbLatency = thumbs.latency.avg_ms !== null ? `${thumbs.latency.avg_ms}ms avg / ${thumbs.latency.p95_ms}ms p95` : 'n/a';
         document.getElementById('stats').innerHTML = `
             <h3>System Metrics</h3>
             <strong>CPU:</strong> ${adminStats.cpu_percent}% ${cpuTemp} | <strong>RAM:</strong> ${adminStats.ram_percent}% (${adminStats.ram_used_gb}GB)<br>
             <strong>Storage:</strong> ${adminStats.disk_used_gb}GB / ${adminStats.disk_total_gb}GB (Free: ${adminStats.disk_free_gb}GB)<br>
-            <strong>Rclone:</strong> ${rcloneStatus} | <strong>Last Backup:</strong> ${adminStats.last_backup}<br><br>
+            <strong>Rclone:</strong> ${rcloneStatus} | <strong>Last Backup:</strong> ${adminStats.last_backup}<br>
+            <strong>Daemon:</strong> ${stages}<br>
+            <strong>Thumbnail Queue:</strong> ${thumbs.depth} queued (${thumbs.running} running, ${thumbs.failed} failed) | <strong>Latency:</strong> ${thumbLatency}<br>
+            <strong>Uploads:</strong> ${admission.active}/${admission.max_concurrent} active | <strong>Turned away:</strong> ${admission.rejected_rate} rate limit, ${admission.rejected_busy} busy, ${admission.rejected_lookup} hash lookups<br>
+            <strong>DB Writes:</strong> ${writer.queued} queued, ${writer.avg_batch ?? 'n/a'} per commit | <strong>Commit:</strong> ${writeLatency}<br><br>
 
             <h3>Media Breakdown</h3>
             <strong>Total Media:</strong> ${publicStats.total_media}<br>
@@ -144,6 +157,16 @@ document.addEventListener('DOMContentLoaded', loadSchedule);
 let cursor = null;
 let isLoading = false;
 
+// Streams the originals matching the current filters (filter + type) as one ZIP
+function downloadZip() {
+    const filter = document.querySelector('input[name="filter"]:checked').value;
+    const type = document.querySelector('input[name="type"]:checked').value;
+    const params = new URLSearchParams();
+    if (filter !== 'all') params.set('filter', filter);
+    if (type !== 'all') params.set('type', type);
+    window.location.href = `/admin/export.zip?${params}`;
+}
+
 async function loadMedia() {
     if (isLoading) return;
 
@@ -153,8 +176,9 @@ async function loadMedia() {
     const loadMoreBtn = document.getElementById('load-more-btn');
 
     let url = `/slideshow/feed?limit=6&admin_mode=true`;
-    if (cursor) url += `&cursor=${cursor}`;
-    if (query) url += `&q=${encodeURIComponent(query)}`;
+    if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+    // Searches come back best match first
+    if (query) url += `&q=${encodeURIComponent(query)}&order=relevance`;
     if (filter !== 'all') url += `&filter=${filter}`;
     if (type !== 'all') url += `&type=${type}`;
 
@@ -187,7 +211,7 @@ async function loadMedia() {
                 <div class="glass-card" style="padding: 10px;">
                     <div style="font-size:0.7em; color:#aaa; margin-bottom:5px;">UUID: ${item.filename.split('/').pop().split('.')[0]}</div>
                     ${item.type === 'video' ? '<span style="color:gold; font-weight:bold;">[VIDEO]</span>' : ''}
-                    <img src="${item.thumbnail || item.url}" class="media-content ${item.is_hidden ? 'hidden-media' : ''} ${item.is_starred ? 'starred-media' : ''}" loading="lazy">
+                    <img src="${item.thumbnail || item.url}" srcset="${pickSrcset(item)}" sizes="(min-width: 768px) 330px, 100vw" class="media-content ${item.is_hidden ? 'hidden-media' : ''} ${item.is_starred ? 'starred-media' : ''}" loading="lazy">
                     <p><strong>${item.author || 'Guest'}</strong><br>${item.caption || ''}</p>
                     <div style="display: flex; gap: 5px; flex-wrap: wrap;">
                         <button class="btn-secondary" style="padding: 5px; flex:1;" onclick="action(${item.id}, '${item.is_hidden ? 'unhide' : 'hide'}')">${item.is_hidden ? 'Unhide' : 'Hide'}</button>
@@ -5,6 +5,18 @@ let currentIndex = -1;
 let container = document.getElementById('container');
 let isFetching = false;
 let currentOrder = 'newest'; // 'newest' or 'random'
+// Random mode: where this slideshow's shuffled play order continues (null when played through)
+let shuffleCursor = null;
+// Change-log mark of the feed we hold; polling asks for changes after it
+let changeSeq = null;
+// True while the /events stream is connected; polling only runs without it
+let liveUpdates = false;
+let configTimer = null;
+let statsTimer = null;
+let statsRefreshTimeout = null;
+// Ids of slides shown since the last report, one entry per view
+let pendingViews = [];
+const VIEW_REPORT_INTERVAL_MS = 30000;
 
 // --- Init ---
 document.addEventListener('DOMContentLoaded', () => {
@@ -12,27 +24,108 @@ document.addEventListener('DOMContentLoaded', () => {
     orderToggle.addEventListener('click', toggleOrder);
 
     loadInitial();
-
-    // Config poller
-    setInterval(pollConfig, 30000);
-
-    // Stats poller
     pollStats();
-    setInterval(pollStats, 60000);
+    setPolling(true);
+
+    setInterval(reportViews, VIEW_REPORT_INTERVAL_MS);
+    // Don't lose the last views when the display is closed or reloaded
+    window.addEventListener('pagehide', () => reportViews(true));
+
+    connectLiveEvents({
+        'media.new': onMediaNew,
+        'media.update': onMediaUpdate,
+        'media.delete': (data) => removeFromQueue(data.id),
+        'banner': applyConfig,
+        'resync': loadInitial,
+        'reset': loadInitial,
+    }, (connected) => {
+        liveUpdates = connected;
+        setPolling(!connected);
+    });
 });
 
+// Pollers are the fallback for when the live event stream is unavailable
+function setPolling(enabled) {
+    clearInterval(configTimer);
+    clearInterval(statsTimer);
+    if (enabled) {
+        configTimer = setInterval(pollConfig, 30000);
+        statsTimer = setInterval(pollStats, 60000);
+    }
+}
+
+function applyConfig(config) {
+    const bannerMsg = config[`banner_message_${currentLang}`] || config.banner_message_en;
+    if (bannerMsg) {
+        const b = document.getElementById('banner');
+        b.innerText = bannerMsg;
+        b.style.display = 'block';
+        document.body.classList.add('has-banner');
+    } else {
+        document.getElementById('banner').style.display = 'none';
+        document.body.classList.remove('has-banner');
+    }
+}
+
 async function pollConfig() {
-     fetch('/config').then(r => r.json()).then(config => {
-        if (config.banner_message) {
-            const b = document.getElementById('banner');
-            b.innerText = config.banner_message;
-            b.style.display = 'block';
-            document.body.classList.add('has-banner');
-        } else {
-            document.getElementById('banner').style.display = 'none';
-            document.body.classList.remove('has-banner');
-        }
-    });
+    fetch('/config').then(r => r.json()).then(applyConfig);
+}
+
+// Counts only change with media, so refresh them shortly after a change instead of on a timer
+function scheduleStatsRefresh() {
+    if (statsRefreshTimeout) return;
+    statsRefreshTimeout = setTimeout(() => {
+        statsRefreshTimeout = null;
+        pollStats();
+    }, 3000);
+}
+
+// --- Live Updates ---
+
+function onMediaNew(item) {
+    scheduleStatsRefresh();
+    if (item.is_hidden || queue.some(i => i.id === item.id)) return;
+    if (queue.length === 0) {
+        // First upload: replace the "Waiting for uploads..." placeholder
+        resetSlideshow();
+        queue.push(item);
+        nextSlide();
+        return;
+    }
+    // Show it next
+    queue.splice(currentIndex + 1, 0, item);
+}
+
+function onMediaUpdate(data) {
+    const index = queue.findIndex(i => i.id === data.id);
+    if (data.is_hidden === true) {
+        removeFromQueue(data.id);
+        scheduleStatsRefresh();
+    } else if (index >= 0) {
+        // Partial updates (e.g. a thumbnail that just finished) are merged in
+        Object.assign(queue[index], data);
+    } else if (data.url) {
+        // Unhidden by the admin
+        onMediaNew(data);
+    }
+}
+
+function removeFromQueue(id) {
+    const index = queue.findIndex(i => i.id === id);
+    if (index < 0) return;
+    const wasShowing = index === currentIndex;
+    queue.splice(index, 1);
+    // Keep pointing at the same upcoming slide
+    if (index <= currentIndex) currentIndex--;
+    scheduleStatsRefresh();
+
+    // Moderation takes the slide off screen right away
+    if (wasShowing) {
+        const video = container.querySelector('video');
+        if (video) video.onended = null;
+        clearTimeout(window.nextSlideTimeout);
+        nextSlide();
+    }
 }
 
 async function pollStats() {
@@ -82,12 +175,15 @@ async function loadInitial() {
         const res = await fetch(`/slideshow/feed?limit=50&order=${currentOrder}`);
         const data = await res.json();
         queue = data.items;
+        shuffleCursor = (currentOrder === 'random') ? data.next_cursor : null;
+        changeSeq = data.since;
 
         if (queue.length > 0) {
             nextSlide();
         } else {
             container.innerHTML = '<div style="color:white; font-family:var(--header-font)">Waiting for uploads...</div>';
-            setTimeout(loadInitial, 5000);
+            // With the live stream the first upload arrives as an event
+            if (!liveUpdates) setTimeout(loadInitial, 5000);
         }
     } catch (e) {
         console.error("Initial load failed", e);
@@ -96,24 +192,20 @@ async function loadInitial() {
 }
 
 async function fetchMore() {
-    if (isFetching) return;
+    if (isFetching || changeSeq === null) return;
     isFetching = true;
 
     try {
-        const res = await fetch(`/slideshow/feed?limit=20&order=${currentOrder}`);
+        // Only what changed since the last poll: new uploads, moderation, thumbnails and deletions
+        const res = await fetch(`/slideshow/feed?since=${changeSeq}&limit=100`);
         const data = await res.json();
-        const newItems = data.items;
+        changeSeq = data.since;
 
-        // Filter out items we already have in queue
-        const existingIds = new Set(queue.map(i => i.id));
-        const brandNew = newItems.filter(i => !existingIds.has(i.id));
-
-        if (brandNew.length > 0) {
-            console.log(`Found ${brandNew.length} new items`);
-            // Add them to the queue *next* so they appear soon
-            // Or just shuffle them in?
-            // Let's Insert them after current index
-            queue.splice(currentIndex + 1, 0, ...brandNew);
+        data.removed.forEach(removeFromQueue);
+        // Oldest first, so each new upload lands ahead of the previous one
+        data.items.forEach(onMediaUpdate);
+        if (data.items.length > 0 || data.removed.length > 0) {
+            console.log(`Applied ${data.items.length} changes, ${data.removed.length} removals`);
         }
     } catch (e) {
         console.error("Fetch failed", e);
@@ -122,6 +214,37 @@ async function fetchMore() {
     }
 }
 
+async function fetchShufflePage() {
+    if (isFetching || !shuffleCursor) return;
+    isFetching = true;
+
+    try {
+        const res = await fetch(`/slideshow/feed?limit=20&order=random&cursor=${encodeURIComponent(shuffleCursor)}`);
+        const data = await res.json();
+        shuffleCursor = data.next_cursor;
+
+        // The server never repeats within a play order, but live events may have added some already
+        const existingIds = new Set(queue.map(i => i.id));
+        queue.push(...data.items.filter(i => !existingIds.has(i.id)));
+    } catch (e) {
+        console.error("Shuffle fetch failed", e);
+    } finally {
+        isFetching = false;
+    }
+}
+
+function reportViews(unloading = false) {
+    if (pendingViews.length === 0) return;
+    const body = JSON.stringify(pendingViews);
+    pendingViews = [];
+    if (unloading && navigator.sendBeacon) {
+        navigator.sendBeacon('/media/viewed', new Blob([body], { type: 'application/json' }));
+        return;
+    }
+    fetch('/media/viewed', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body })
+        .catch(e => console.error("View report failed", e));
+}
+
 // --- Playback Logic ---
 
 const TRANSITIONS = ['fade', 'slide', 'zoom'];
@@ -138,18 +261,28 @@ function nextSlide() {
     // Increment index
     currentIndex = (currentIndex + 1) % queue.length;
 
-    // Periodically poll for new content when we loop or every N slides
-    if (currentIndex === 0 || currentIndex % 5 === 0) {
+    // Without the live stream, poll for new content when we loop or every N slides
+    if (!liveUpdates && (currentIndex === 0 || currentIndex % 5 === 0)) {
         fetchMore();
     }
 
+    // Random mode: queue the next page of the play order before reaching the end
+    if (shuffleCursor && currentIndex >= queue.length - 5) {
+        fetchShufflePage();
+    }
+
     const item = queue[currentIndex];
 
-    // Mark as viewed
-    fetch(`/media/${item.id}/viewed`, { method: 'POST' });
+    // Mark as viewed (reported in batches)
+    pendingViews.push(item.id);
 
     // Create Element
     const el = document.createElement(item.type === 'video' ? 'video' : 'img');
+    if (item.type !== 'video' && item.srcset) {
+        // Let the browser pick the derivative that fits the display (up to 1920w on a 4K projector)
+        el.srcset = pickSrcset(item);
+        el.sizes = '100vw';
+    }
     el.src = (item.type !== 'video' && item.thumbnail) ? item.thumbnail : item.url;
     el.className = 'slide';
 
@@ -21,6 +21,17 @@ document.addEventListener('DOMContentLoaded', () => {
         window.APP_CONFIG = config;
     });
 
+    // Banner and schedule changes are pushed instead of needing a reload
+    connectLiveEvents({
+        'banner': (data) => {
+            window.APP_CONFIG = Object.assign(window.APP_CONFIG || {}, data);
+            updateBanner();
+        },
+        'schedule': (data) => {
+            window.APP_CONFIG = Object.assign(window.APP_CONFIG || {}, data);
+        },
+    }, () => {});
+
     // Theme Toggle Logic
     if (localStorage.getItem("theme") === "light") {
         document.documentElement.setAttribute("data-theme", "light");
@@ -159,9 +170,6 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             const caption = document.getElementById('caption').value;
-            const formData = new FormData();
-            formData.append('file', selectedFile);
-            formData.append('caption', caption);
 
             const progressBar = document.getElementById('progress-bar');
             const progressContainer = document.getElementById('progress-bar-container');
@@ -169,6 +177,20 @@ document.addEventListener('DOMContentLoaded', () => {
 
             progressContainer.style.display = 'block';
             uploadBtn.disabled = true;
+            uploadBtn.innerText = t('checking');
+
+            // Pre-upload dedup: hash locally and skip the transfer if the server has it
+            const fileHash = await hashFileInWorker(selectedFile);
+            if (await isAlreadyUploaded(fileHash)) {
+                showToast(t('already_uploaded'));
+                resetSelection();
+                document.getElementById('caption').value = '';
+                progressContainer.style.display = 'none';
+                uploadBtn.disabled = false;
+                uploadBtn.innerText = 'Upload';
+                if (wakeLock) wakeLock.release();
+                return;
+            }
             uploadBtn.innerText = 'Uploading...';
 
             // Retry Logic
@@ -178,12 +200,23 @@ document.addEventListener('DOMContentLoaded', () => {
 
             while (attempt < maxRetries && !success) {
                 try {
-                    await uploadWithProgress(formData, (percent) => {
+                    await uploadFile(selectedFile, caption, fileHash, (percent) => {
                         progressBar.style.width = percent + '%';
                     });
                     success = true;
                 } catch (error) {
                     console.error(`Upload attempt ${attempt + 1} failed:`, error);
+                    // Server asked us to back off: wait it out if it is short, otherwise tell the guest
+                    if (error.retryAfter && error.retryAfter <= MAX_AUTO_WAIT_SEC) {
+                        uploadBtn.innerText = t('server_busy').replace('{s}', error.retryAfter);
+                        await new Promise(r => setTimeout(r, error.retryAfter * 1000));
+                        uploadBtn.innerText = 'Uploading...';
+                        continue;
+                    }
+                    if (error.retryAfter) {
+                        showToast(error.message);
+                        break;
+                    }
                     attempt++;
                     if (attempt < maxRetries) {
                         uploadBtn.innerText = `Retrying (${attempt}/${maxRetries})...`;
@@ -241,7 +274,7 @@ async function loadMyUploads() {
                 <div class="glass-card" style="padding: 10px; margin:0; position:relative;">
                     ${item.type === 'video' ? '<span style="color:gold; font-size:0.8em;">[VIDEO]</span>' : ''}
                     <button onclick="deleteUpload(${item.id})" style="position:absolute; top:5px; right:5px; background:rgba(0,0,0,0.5); color:white; border:none; border-radius:50%; width:24px; height:24px; cursor:pointer;">&times;</button>
-                    <img src="${item.thumbnail || item.url}" class="media-content" loading="lazy" onclick="previewImage('${item.url}', '${item.type}')" style="cursor:zoom-in;">
+                    <img src="${item.thumbnail || item.url}" srcset="${pickSrcset(item)}" sizes="(min-width: 768px) 200px, 100vw" class="media-content" loading="lazy" onclick="previewImage('${item.url}', '${item.type}')" style="cursor:zoom-in;">
                     <div style="margin-top:5px; font-size:0.8em;">
                         ${item.caption ? `<p style="margin:0;">${item.caption}</p>` : ''}
                         <span style="color:#888; font-size:0.8em;">${toLocalTime(item.created_at)} | ${formatBytes(item.file_size || 0)}</span>
@@ -301,6 +334,228 @@ async function deleteUpload(id) {
     });
 }
 
+// Files above this size go through the resumable chunked protocol
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+// How many chunks of one file are in flight at once
+const CHUNK_PARALLELISM = 3;
+const CHUNK_MAX_RETRIES = 5;
+// Longer Retry-After waits (e.g. the per-guest limit) are shown instead of waited out
+const MAX_AUTO_WAIT_SEC = 60;
+
+// --- Pre-upload Dedup ---
+
+function hashFileInWorker(file) {
+    return new Promise((resolve) => {
+        const maxBytes = (window.APP_CONFIG?.preupload_hash_max_mb ?? 200) * 1024 * 1024;
+        if (!window.Worker || file.size > maxBytes) {
+            resolve(null);
+            return;
+        }
+
+        let worker;
+        try {
+            worker = new Worker('/static/js/hash_worker.js');
+        } catch (e) {
+            resolve(null);
+            return;
+        }
+        worker.onmessage = (e) => {
+            if (e.data.type === 'progress') return;
+            worker.terminate();
+            resolve(e.data.type === 'done' ? e.data.hash : null);
+        };
+        worker.onerror = () => {
+            worker.terminate();
+            resolve(null);
+        };
+        worker.postMessage({ file: file });
+    });
+}
+
+async function isAlreadyUploaded(hash) {
+    if (!hash) return false;
+    try {
+        const res = await fetch(`/media/hash/${hash}`, { method: 'HEAD' });
+        return res.ok;
+    } catch (e) {
+        return false;
+    }
+}
+
+function uploadFile(file, caption, fileHash, onProgress) {
+    if (file.size <= CHUNKED_UPLOAD_THRESHOLD) {
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('caption', caption);
+        return uploadWithProgress(formData, onProgress);
+    }
+    return uploadChunked(file, caption, fileHash, onProgress);
+}
+
+// Seconds the server asked us to wait (429 Retry-After), or null
+function retryAfterSeconds(value) {
+    const seconds = parseInt(value, 10);
+    return Number.isFinite(seconds) ? seconds : null;
+}
+
+// Marks an error as server backpressure so callers wait instead of failing
+function backpressureError(message, retryAfter) {
+    const error = new Error(message);
+    error.retryAfter = retryAfter;
+    return error;
+}
+
+async function parseError(res, fallback) {
+    try {
+        const err = await res.json();
+        if (typeof err.detail === 'string') return err.detail;
+        if (err.detail && err.detail.message) return err.detail.message;
+    } catch (e) {
+        // Ignore parsing error
+    }
+    return fallback;
+}
+
+async function uploadChunked(file, caption, fileHash, onProgress) {
+    // Remember the session per file so a retry (or a page reload) resumes it
+    const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+    let session = null;
+
+    const savedId = localStorage.getItem(resumeKey);
+    if (savedId) {
+        const res = await fetch(`/upload/${savedId}`);
+        if (res.ok) {
+            session = await res.json();
+        } else {
+            localStorage.removeItem(resumeKey);
+        }
+    }
+
+    if (!session) {
+        const fd = new FormData();
+        fd.append('filename', file.name);
+        fd.append('size', file.size);
+        fd.append('content_type', file.type);
+        fd.append('caption', caption);
+        if (fileHash) fd.append('sha256', fileHash);
+        const res = await fetch('/upload/init', { method: 'POST', body: fd });
+        if (res.status === 429) {
+            throw backpressureError(await parseError(res, 'Server busy'), retryAfterSeconds(res.headers.get('Retry-After')));
+        }
+        if (!res.ok) throw new Error(await parseError(res, 'Upload failed'));
+        session = await res.json();
+        // Server already has this file
+        if (!session.upload_id) return session;
+        localStorage.setItem(resumeKey, session.upload_id);
+    }
+
+    const chunkSize = session.chunk_size;
+    const received = new Set(session.received);
+    const pending = [];
+    for (let i = 0; i < session.total_chunks; i++) {
+        if (!received.has(i)) pending.push(i);
+    }
+
+    // Progress = bytes already on the server + bytes of chunks in flight
+    let doneBytes = [...received].reduce((sum, i) => sum + Math.min(chunkSize, file.size - i * chunkSize), 0);
+    const inFlight = new Map();
+    const report = () => {
+        let loaded = doneBytes;
+        inFlight.forEach(v => loaded += v);
+        onProgress(Math.min(100, (loaded / file.size) * 100));
+    };
+    report();
+
+    const worker = async () => {
+        while (pending.length > 0) {
+            const index = pending.shift();
+            const blob = file.slice(index * chunkSize, Math.min(file.size, (index + 1) * chunkSize));
+            await putChunkWithRetry(session.upload_id, index, blob, (loaded) => {
+                inFlight.set(index, loaded);
+                report();
+            });
+            inFlight.delete(index);
+            doneBytes += blob.size;
+            report();
+        }
+    };
+    const workers = [];
+    for (let i = 0; i < Math.min(CHUNK_PARALLELISM, pending.length); i++) {
+        workers.push(worker());
+    }
+    await Promise.all(workers);
+
+    const res = await fetch(`/upload/${session.upload_id}/finalize`, { method: 'POST' });
+    if (!res.ok) {
+        if (res.status === 404) localStorage.removeItem(resumeKey);
+        throw new Error(await parseError(res, 'Upload failed'));
+    }
+    localStorage.removeItem(resumeKey);
+    const response = await res.json();
+    if (response.status !== 'success') {
+        throw new Error(response.message || 'Upload failed');
+    }
+    return response;
+}
+
+async function putChunkWithRetry(uploadId, index, blob, onProgress) {
+    let attempt = 0;
+    while (true) {
+        try {
+            return await putChunk(uploadId, index, blob, onProgress);
+        } catch (error) {
+            onProgress(0);
+            // The server is shedding load: wait as asked, without using up a retry
+            if (error.retryAfter) {
+                await new Promise(r => setTimeout(r, error.retryAfter * 1000));
+                continue;
+            }
+            attempt++;
+            if (attempt >= CHUNK_MAX_RETRIES || error.fatal) throw error;
+            await new Promise(r => setTimeout(r, 1000 * attempt));
+        }
+    }
+}
+
+function putChunk(uploadId, index, blob, onProgress) {
+    return new Promise((resolve, reject) => {
+        const xhr = new XMLHttpRequest();
+        xhr.open('PUT', `/upload/${uploadId}/chunk/${index}`, true);
+        xhr.setRequestHeader('Content-Type', 'application/octet-stream');
+
+        xhr.upload.onprogress = function(e) {
+            if (e.lengthComputable) onProgress(e.loaded);
+        };
+
+        xhr.onload = function() {
+            if (xhr.status === 200) {
+                resolve(JSON.parse(xhr.responseText));
+            } else {
+                let errorMsg = xhr.statusText || 'Upload failed';
+                try {
+                    errorMsg = JSON.parse(xhr.responseText).detail || errorMsg;
+                } catch (e) {
+                    // Ignore parsing error
+                }
+                if (xhr.status === 429) {
+                    reject(backpressureError(errorMsg, retryAfterSeconds(xhr.getResponseHeader('Retry-After')) || 2));
+                    return;
+                }
+                const error = new Error(errorMsg);
+                // Client errors will not get better by retrying the same chunk
+                error.fatal = xhr.status >= 400 && xhr.status < 500;
+                reject(error);
+            }
+        };
+
+        xhr.onerror = function() {
+            reject(new Error('Network error'));
+        };
+
+        xhr.send(blob);
+    });
+}
+
 function uploadWithProgress(formData, onProgress) {
     return new Promise((resolve, reject) => {
         const xhr = new XMLHttpRequest();
@@ -329,6 +584,10 @@ function uploadWithProgress(formData, onProgress) {
                 } catch (e) {
                     // Ignore parsing error
                 }
+                if (xhr.status === 429) {
+                    reject(backpressureError(errorMsg, retryAfterSeconds(xhr.getResponseHeader('Retry-After'))));
+                    return;
+                }
                 reject(new Error(errorMsg));
             }
         };
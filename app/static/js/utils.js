@@ -9,6 +9,9 @@ const TRANSLATIONS = {
         "add_caption": "Add a caption...",
         "upload_btn": "Upload",
         "upload_success": "Upload Successful!",
+        "checking": "Checking...",
+        "already_uploaded": "Already uploaded!",
+        "server_busy": "Server busy, retrying in {s}s...",
         "file_too_large": "File too large!",
         "video_too_long": "Video too long!",
         "action_failed": "Action failed",
@@ -31,6 +34,9 @@ const TRANSLATIONS = {
         "add_caption": "Añade un pie de foto...",
         "upload_btn": "Subir",
         "upload_success": "¡Subida Exitosa!",
+        "checking": "Verificando...",
+        "already_uploaded": "¡Ya se subió!",
+        "server_busy": "Servidor ocupado, reintentando en {s}s...",
         "file_too_large": "¡Archivo demasiado grande!",
         "video_too_long": "¡Video demasiado largo!",
         "action_failed": "Acción fallida",
@@ -170,6 +176,20 @@ function showConfirm(message, onConfirm, requireCheck = false) {
     noBtn.addEventListener('click', noHandler);
 }
 
+// WebP derivatives when the browser can decode them, otherwise the JPEG fallback
+const SUPPORTS_WEBP = (() => {
+    try {
+        return document.createElement('canvas').toDataURL('image/webp').startsWith('data:image/webp');
+    } catch (e) {
+        return false;
+    }
+})();
+
+function pickSrcset(item) {
+    if (!item.srcset) return '';
+    return SUPPORTS_WEBP ? item.srcset.webp : item.srcset.jpeg;
+}
+
 function formatBytes(bytes, decimals = 2) {
     if (!+bytes) return '0 Bytes';
     const k = 1024;
@@ -256,6 +276,23 @@ function toLocalTime(utcDateStr) {
     return date.toLocaleString(undefined, options);
 }
 
+// Subscribes to the server's live event stream (/events). `onLiveChange(true/false)`
+// reports whether pushes are flowing, so callers can fall back to polling.
+function connectLiveEvents(handlers, onLiveChange) {
+    if (!window.EventSource) {
+        onLiveChange(false);
+        return null;
+    }
+    const source = new EventSource('/events');
+    source.onopen = () => onLiveChange(true);
+    // The browser reconnects by itself (resuming from the last event id)
+    source.onerror = () => onLiveChange(false);
+    Object.entries(handlers).forEach(([event, handler]) => {
+        source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+    });
+    return source;
+}
+
 function updateBanner() {
     if (window.APP_CONFIG) {
         const bannerMsg = window.APP_CONFIG[`banner_message_${currentLang}`] || window.APP_CONFIG[`banner_message_en`];
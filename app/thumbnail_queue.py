@@ -0,0 +1,242 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import select, update, func, or_
+
+from app.config import settings
+from app.database import ReadSessionLocal
+from app.models import Media, ThumbnailJob
+from app.events import EventHub
+from app.writer import DbWriter
+from app.thumbnails import render_thumbnail, media_stem, derivative_name, default_width, thumbnail_urls
+
+logger = logging.getLogger(__name__)
+
+# How often the dispatcher looks for jobs when nothing woke it up
+POLL_INTERVAL_SEC = 5
+# Number of finished jobs the latency stats are computed over
+STATS_WINDOW = 100
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+class ThumbnailQueue:
+    """
+    Drains ``thumbnail_jobs`` into a bounded pool of worker processes.
+
+    Jobs are rows in SQLite, so pending work survives a restart; jobs that
+    were running when the app stopped are put back to pending on startup.
+    The pool size bounds concurrent PIL decodes and ffmpeg processes.
+    """
+
+    def __init__(self, workers: int, writer: DbWriter, events: Optional[EventHub] = None):
+        self.workers = max(1, workers)
+        self.writer = writer
+        self.events = events
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._inflight: Dict[int, asyncio.Task] = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Created lazily so importing the app never forks
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def start(self):
+        async def requeue_running(db):
+            await db.execute(
+                update(ThumbnailJob)
+                .where(ThumbnailJob.status == "running")
+                .values(status="pending", started_at=None)
+            )
+
+        await self.writer.run(requeue_running)
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def enqueue(self, db, media_id: int, source_path: str, mime_type: str):
+        """Adds a job to ``db``'s transaction. Call ``wake()`` after commit."""
+        db.add(ThumbnailJob(
+            media_id=media_id,
+            source_path=source_path,
+            mime_type=mime_type,
+            status="pending",
+            created_at=_utcnow(),
+        ))
+
+    def wake(self):
+        self._wake.set()
+
+    async def _dispatch_loop(self):
+        while True:
+            try:
+                free = self.workers - len(self._inflight)
+                if free > 0:
+                    for job_id in await self._claim(free):
+                        self._inflight[job_id] = asyncio.create_task(self._run(job_id))
+            except Exception as e:
+                logger.error(f"Thumbnail dispatcher error: {e}")
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_INTERVAL_SEC)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, limit: int):
+        async def claim(db):
+            result = await db.execute(
+                select(ThumbnailJob.id)
+                .where(ThumbnailJob.status == "pending")
+                .where(or_(ThumbnailJob.not_before.is_(None), ThumbnailJob.not_before <= _utcnow()))
+                .order_by(ThumbnailJob.id)
+                .limit(limit)
+            )
+            job_ids = [row[0] for row in result]
+            if job_ids:
+                await db.execute(
+                    update(ThumbnailJob)
+                    .where(ThumbnailJob.id.in_(job_ids))
+                    .values(status="running", started_at=_utcnow(), attempts=ThumbnailJob.attempts + 1)
+                )
+            return job_ids
+
+        return await self.writer.run(claim)
+
+    async def _run(self, job_id: int):
+        try:
+            async with ReadSessionLocal() as db:
+                job = await db.get(ThumbnailJob, job_id)
+                source_path = os.path.join(settings.UPLOAD_DIR, job.source_path)
+                mime_type, media_id, attempts = job.mime_type, job.media_id, job.attempts
+
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            try:
+                widths = await loop.run_in_executor(
+                    pool, render_thumbnail,
+                    source_path, mime_type, settings.THUMBNAIL_DIR, settings.THUMBNAIL_WIDTHS,
+                    settings.GENERATE_VIDEO_THUMBNAILS, settings.VIDEO_THUMBNAIL_TIMESTAMP,
+                    settings.THUMBNAIL_FFMPEG_TIMEOUT_SEC,
+                )
+                error = None
+            except BrokenProcessPool:
+                # Counted like any failure: a file that kills its worker every
+                # time backs off and ends up failed instead of breaking each new pool
+                self._replace_pool(pool)
+                widths, error = None, "Worker process died"
+            except Exception as e:
+                widths, error = None, str(e) or type(e).__name__
+
+            ready = None
+            if error is None and widths:
+                stem = media_stem(source_path)
+                ready = {
+                    "thumbnail_path": derivative_name(stem, default_width(widths), "jpeg"),
+                    "thumbnail_widths": ",".join(str(w) for w in widths),
+                }
+            if error is None:
+                values = {"status": "done", "error": None}
+            else:
+                logger.error(f"Thumbnail job {job_id} failed: {error}")
+                values = {"status": "failed", "error": error}
+                if attempts < settings.THUMBNAIL_MAX_ATTEMPTS:
+                    # Back off so a file that keeps failing does not occupy the pool
+                    delay = settings.THUMBNAIL_RETRY_DELAY_SEC * 2 ** (attempts - 1)
+                    values.update(status="pending", not_before=_utcnow() + timedelta(seconds=delay))
+
+            async def record(db):
+                if ready:
+                    await db.execute(update(Media).where(Media.id == media_id).values(**ready))
+                await db.execute(
+                    update(ThumbnailJob).where(ThumbnailJob.id == job_id).values(finished_at=_utcnow(), **values)
+                )
+
+            await self.writer.run(record)
+
+            if ready and self.events:
+                # Partial update: live clients swap in the thumbnail for this item
+                self.events.publish("media.update", {
+                    "id": media_id,
+                    **thumbnail_urls(source_path, ready["thumbnail_path"], ready["thumbnail_widths"]),
+                })
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Thumbnail job {job_id} could not be recorded: {e}")
+        finally:
+            self._inflight.pop(job_id, None)
+            self.wake()
+
+    def _replace_pool(self, pool: ProcessPoolExecutor):
+        """
+        A worker died (OOM kill, crash in a decoder): every job on ``pool``
+        fails with BrokenProcessPool. The next dispatch starts a new pool.
+        """
+        if self._pool is pool:
+            logger.error("Thumbnail worker pool broke; starting a new one")
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def stats(self, db) -> dict:
+        """Queue depth by status plus latency over the most recent finished jobs."""
+        result = await db.execute(
+            select(ThumbnailJob.status, func.count(ThumbnailJob.id)).group_by(ThumbnailJob.status)
+        )
+        counts = {status: count for status, count in result}
+
+        result = await db.execute(
+            select(ThumbnailJob.created_at, ThumbnailJob.started_at, ThumbnailJob.finished_at)
+            .where(ThumbnailJob.status == "done")
+            .order_by(ThumbnailJob.id.desc())
+            .limit(STATS_WINDOW)
+        )
+        total, run = [], []
+        for created_at, started_at, finished_at in result:
+            if created_at and started_at and finished_at:
+                total.append((finished_at - created_at).total_seconds())
+                run.append((finished_at - started_at).total_seconds())
+
+        def summary(values):
+            if not values:
+                return {"avg_ms": None, "p95_ms": None}
+            values = sorted(values)
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            return {"avg_ms": round(sum(values) / len(values) * 1000, 1), "p95_ms": round(p95 * 1000, 1)}
+
+        return {
+            "workers": self.workers,
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "failed": counts.get("failed", 0),
+            "done": counts.get("done", 0),
+            "depth": counts.get("pending", 0) + counts.get("running", 0),
+            "latency": summary(total), # enqueue -> thumbnail written
+            "run_time": summary(run),  # time spent in the worker
+        }
@@ -0,0 +1,144 @@
+"""
+Thumbnail rendering. These functions run inside the worker processes of
+app/thumbnail_queue.py, so this module keeps its imports light (no app/DB).
+
+Each upload gets a set of derivatives, one per width in THUMBNAIL_WIDTHS
+(capped at the source width), in WebP plus a JPEG fallback. JPEGs are
+decoded at reduced scale via ``Image.draft`` and all images are rotated
+per their EXIF orientation:
+
+    thumb_{stem}_{width}.webp
+    thumb_{stem}_{width}.jpg
+"""
+import os
+import math
+import subprocess
+from typing import List, Optional, Sequence
+
+from PIL import Image, ImageOps
+
+JPEG_QUALITY = 70
+WEBP_QUALITY = 75
+# The legacy single ``thumbnail`` URL points at the JPEG closest to this width
+DEFAULT_WIDTH = 800
+HEIF_TYPES = ("image/heic", "image/heif", "image/heic-sequence", "image/heif-sequence")
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+_heif_registered = False
+
+def _register_heif():
+    # pillow-heif is only imported the first time a worker sees a HEIC file
+    global _heif_registered
+    if not _heif_registered:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+        _heif_registered = True
+
+def media_stem(filename: str) -> str:
+    return os.path.basename(filename).split('.')[0]
+
+def derivative_name(stem: str, width: int, fmt: str) -> str:
+    return f"thumb_{stem}_{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+def default_width(widths: Sequence[int]) -> int:
+    return min(widths, key=lambda w: abs(w - DEFAULT_WIDTH))
+
+def derivative_files(stem: str, widths: Sequence[int]) -> List[str]:
+    """All files written for one upload, e.g. for cleanup on delete."""
+    return [derivative_name(stem, w, fmt) for w in widths for fmt in ("webp", "jpeg")]
+
+def thumbnail_urls(filename: str, thumbnail_path: Optional[str], thumbnail_widths: Optional[str]) -> dict:
+    """Legacy single thumbnail URL plus srcset strings per format for responsive clients."""
+    srcset = None
+    if thumbnail_widths:
+        stem = media_stem(filename)
+        widths = [int(w) for w in thumbnail_widths.split(",")]
+        srcset = {
+            fmt: ", ".join(f"/thumbnails/{derivative_name(stem, w, fmt)} {w}w" for w in widths)
+            for fmt in ("webp", "jpeg")
+        }
+    return {
+        "thumbnail": f"/thumbnails/{thumbnail_path}" if thumbnail_path else None,
+        "srcset": srcset,
+    }
+
+def _save_derivatives(img: Image.Image, stem: str, thumb_dir: str, widths: Sequence[int]) -> List[int]:
+    img = img.convert("RGB")
+    produced = []
+    # Largest first, each smaller size is resized from the previous one
+    for target in sorted(set(widths), reverse=True):
+        width = min(target, img.width)
+        if width in produced:
+            continue
+        if width < img.width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+        img.save(os.path.join(thumb_dir, derivative_name(stem, width, "webp")), "WEBP", quality=WEBP_QUALITY)
+        img.save(os.path.join(thumb_dir, derivative_name(stem, width, "jpeg")), "JPEG", quality=JPEG_QUALITY)
+        produced.append(width)
+    return sorted(produced)
+
+def _decode_scaled(img: Image.Image, max_width: int) -> Image.Image:
+    """
+    Decodes ``img`` no larger than needed for a ``max_width`` wide derivative
+    and returns it upright. JPEGs use ``Image.draft`` so the decoder itself
+    works at 1/2, 1/4 or 1/8 scale; a 48 MP photo then never exists in memory
+    at full resolution. Rotation happens after the shrink, on the small copy.
+    """
+    orientation = img.getexif().get(0x0112)
+    transposed = orientation in _TRANSPOSED_ORIENTATIONS
+    display_width = img.height if transposed else img.width
+
+    if display_width > max_width:
+        scale = max_width / display_width
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        if img.format == "JPEG":
+            img.draft("RGB", size)
+        img = img.resize(size, Image.LANCZOS)
+    return ImageOps.exif_transpose(img)
+
+def _process_image_thumbnail(input_path, stem, thumb_dir, widths, mime_type="image/jpeg"):
+    if mime_type in HEIF_TYPES or input_path.lower().endswith((".heic", ".heif")):
+        _register_heif()
+    with Image.open(input_path) as img:
+        return _save_derivatives(_decode_scaled(img, max(widths)), stem, thumb_dir, widths)
+
+def _process_video_thumbnail(input_path, stem, thumb_dir, widths, timestamp, timeout=None):
+    # Grab one full-resolution frame, then derive the sizes from it like an image
+    frame_path = os.path.join(thumb_dir, f"thumb_{stem}_frame.jpg")
+    cmd = [
+        "ffmpeg", "-y",
+        "-ss", str(timestamp),
+        "-i", input_path,
+        "-vframes", "1",
+        "-q:v", "2",
+        frame_path
+    ]
+    try:
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # ffmpeg was killed; a half-written frame must not become the thumbnail
+        if os.path.exists(frame_path):
+            os.remove(frame_path)
+        raise
+    if not os.path.exists(frame_path):
+        return []
+    try:
+        return _process_image_thumbnail(frame_path, stem, thumb_dir, widths)
+    finally:
+        os.remove(frame_path)
+
+def render_thumbnail(source_path: str, mime_type: str, thumb_dir: str, widths: Sequence[int],
+                     video_enabled: bool, video_timestamp: float,
+                     ffmpeg_timeout: Optional[float] = None) -> Optional[List[int]]:
+    """
+    Writes the derivatives for one file and returns the widths produced.
+    Raises subprocess.TimeoutExpired when ffmpeg runs past ``ffmpeg_timeout``.
+    """
+    stem = media_stem(source_path)
+
+    if mime_type.startswith("image"):
+        return _process_image_thumbnail(source_path, stem, thumb_dir, widths, mime_type)
+    if mime_type.startswith("video") and video_enabled:
+        return _process_video_thumbnail(source_path, stem, thumb_dir, widths, video_timestamp, ffmpeg_timeout) or None
+    return None
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import text
+
+from app.writer import DbWriter
+
+logger = logging.getLogger(__name__)
+
+# One statement, executed for every media item with views since the last flush
+FLUSH_SQL = text(
+    "UPDATE media SET view_count = COALESCE(view_count, 0) + :views, last_viewed = :last_viewed "
+    "WHERE id = :media_id"
+)
+
+
+class ViewCounter:
+    """
+    Slideshow view counts, added up in memory and written to ``media`` with
+    one writer job every ``flush_interval`` seconds instead of one UPDATE and
+    commit per slide. Pending counts are written on shutdown; a crash loses
+    at most one interval of views.
+    """
+
+    def __init__(self, flush_interval: float, writer: DbWriter):
+        self.flush_interval = flush_interval
+        self.writer = writer
+        self._views: Counter = Counter()
+        self._last_viewed: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_total = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(self._views.values())
+
+    def record(self, media_ids: Iterable[int]):
+        now = datetime.now(timezone.utc)
+        for media_id in media_ids:
+            self._views[media_id] += 1
+            self._last_viewed[media_id] = now
+
+    async def start(self):
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Flushing view counts failed: {e}")
+
+    async def flush(self) -> int:
+        """Writes everything pending; returns the number of rows updated."""
+        if not self._views:
+            return 0
+        views, last_viewed = self._views, self._last_viewed
+        self._views, self._last_viewed = Counter(), {}
+
+        params = [
+            {
+                "media_id": media_id,
+                "views": count,
+                # Same text CURRENT_TIMESTAMP would store
+                "last_viewed": last_viewed[media_id].strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            for media_id, count in views.items()
+        ]
+
+        async def write(db):
+            await db.execute(FLUSH_SQL, params)
+
+        try:
+            await self.writer.run(write)
+        except Exception:
+            # Put them back for the next attempt, keeping views recorded meanwhile
+            self._views.update(views)
+            for media_id, ts in last_viewed.items():
+                self._last_viewed.setdefault(media_id, ts)
+            raise
+        self.flushed_total += sum(views.values())
+        return len(params)
@@ -0,0 +1,138 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Most jobs committed in one transaction
+MAX_BATCH = 64
+# Number of recent batches the latency stats are computed over
+STATS_WINDOW = 200
+
+WriteJob = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class DbWriter:
+    """
+    The one task that writes to the database. Callers hand it a mutation with
+    ``await writer.run(job)``: ``job(session)`` makes its changes without
+    committing and returns plain values (ORM objects expire on commit).
+
+    Jobs queued while a transaction is running are group-committed: the next
+    transaction runs all of them in order and commits once, so a burst of
+    uploads costs one commit rather than one each and writers never contend
+    for the SQLite lock. If a job raises, that transaction is rolled back and
+    its jobs are run again one per transaction, so only the failing job gets
+    the error. Jobs may therefore run twice and must only touch the session;
+    files and events are handled after ``run`` returns.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], max_batch: int = MAX_BATCH):
+        self._session_factory = session_factory
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batches: Deque[Tuple[int, float, float]] = deque(maxlen=STATS_WINDOW) # size, wait, commit
+        self.jobs_total = 0
+        self.failed_total = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        """Finishes the queued jobs, then stops."""
+        if self._task:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item and not item[1].done():
+                    item[1].set_exception(RuntimeError("Database writer stopped"))
+
+    async def run(self, job: WriteJob) -> Any:
+        if self._task is None:
+            raise RuntimeError("Database writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, future, time.perf_counter()))
+        return await future
+
+    async def _write_loop(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._commit(batch)
+            except Exception as e:
+                # Never lose the writer; the futures have been failed already
+                logger.error(f"Database writer error: {e}")
+
+    async def _execute(self, jobs: List[WriteJob]) -> List[Any]:
+        async with self._session_factory() as session:
+            results = [await job(session) for job in jobs]
+            await session.commit()
+        return results
+
+    async def _commit(self, batch):
+        started = time.perf_counter()
+        try:
+            results = await self._execute([job for job, _, _ in batch])
+            outcomes = [(result, None) for result in results]
+        except Exception as e:
+            if len(batch) == 1:
+                outcomes = [(None, e)]
+            else:
+                outcomes = []
+                for job, _, _ in batch:
+                    try:
+                        outcomes.append(((await self._execute([job]))[0], None))
+                    except Exception as job_error:
+                        outcomes.append((None, job_error))
+
+        finished = time.perf_counter()
+        oldest = min(queued for _, _, queued in batch)
+        self._batches.append((len(batch), started - oldest, finished - started))
+        self.jobs_total += len(batch)
+
+        for (_, future, _), (result, error) in zip(batch, outcomes):
+            if future.done():
+                continue # caller went away
+            if error is None:
+                future.set_result(result)
+            else:
+                self.failed_total += 1
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        """Queue depth, group-commit sizes and latency over recent batches."""
+        def ms(values):
+            if not values:
+                return {"avg_ms": None, "p95_ms": None}
+            values = sorted(values)
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            return {"avg_ms": round(sum(values) / len(values) * 1000, 1), "p95_ms": round(p95 * 1000, 1)}
+
+        sizes = [size for size, _, _ in self._batches]
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "jobs": self.jobs_total,
+            "failed": self.failed_total,
+            "avg_batch": round(sum(sizes) / len(sizes), 1) if sizes else None,
+            "max_batch": max(sizes) if sizes else None,
+            "wait": ms([wait for _, wait, _ in self._batches]),     # queued -> transaction start
+            "commit": ms([commit for _, _, commit in self._batches]), # transaction incl. commit
+        }
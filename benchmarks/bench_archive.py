@@ -0,0 +1,107 @@
+"""
+Archive daemon throughput on a synthetic upload tree: the previous writer
+(one thread, ZIP_DEFLATED, then testzip() reading the archive back) against
+build_batch in daemon/archive_daemon.py (photos and videos stored, hashed
+in the copy pass, sampled windows read back, batches on a process pool).
+
+Files are random bytes, which deflate cannot shrink, like JPEG/MP4/HEIC.
+Run it on the disk the archives will live on; the page cache makes a second
+run of the same tree read from memory.
+
+    python benchmarks/bench_archive.py --total-mb 2048 --workers 1 2 4
+"""
+import os
+import sys
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+TEST_DIR = tempfile.mkdtemp(prefix="wedding_bench_")
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["ARCHIVE_DIR"] = os.path.join(TEST_DIR, "archives")
+
+sys.path.append(os.getcwd())
+
+from app.config import settings
+from daemon.archive_daemon import build_batch, plan_batches
+
+
+def make_tree(total_mb: int):
+    """Photo-sized and video-sized files in one folder per upload, as the app stores them."""
+    block = os.urandom(8 * 1024 * 1024)
+    rows, written, i = [], 0, 0
+    while written < total_mb * 1024 * 1024:
+        i += 1
+        is_video = i % 10 == 0
+        size = (40 if is_video else 4) * 1024 * 1024 + i * 4099
+        folder = f"17172576{i:02d}_{i:08x}_Guest"
+        filename = f"{folder}/{i:032x}.{'mp4' if is_video else 'jpg'}"
+        os.makedirs(os.path.join(settings.UPLOAD_DIR, folder), exist_ok=True)
+        with open(os.path.join(settings.UPLOAD_DIR, filename), "wb") as f:
+            left = size
+            while left:
+                offset = (i * 7919) % len(block)
+                chunk = (block[offset:] + block[:offset])[:min(left, len(block))]
+                f.write(chunk)
+                left -= len(chunk)
+        rows.append((i, filename, "video/mp4" if is_video else "image/jpeg", None, i))
+        written += size
+    return rows, written
+
+
+def deflate_and_testzip(rows) -> float:
+    start = time.perf_counter()
+    zip_path = os.path.join(settings.ARCHIVE_DIR, "baseline.zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for _, filename, _, _, _ in rows:
+            zf.write(os.path.join(settings.UPLOAD_DIR, filename), filename)
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        assert zf.testzip() is None
+    elapsed = time.perf_counter() - start
+    os.remove(zip_path)
+    return elapsed
+
+
+def parallel_stored(rows, workers: int, batch_mb: int) -> float:
+    start = time.perf_counter()
+    batches = plan_batches(rows, batch_mb * 1024 * 1024)
+    paths = [os.path.join(settings.ARCHIVE_DIR, f"batch_{n}.zip") for n in range(len(batches))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(build_batch, path, settings.UPLOAD_DIR, [row[:4] for row in batch])
+            for path, batch in zip(paths, batches)
+        ]
+        archived = sum(len(f.result()) for f in futures)
+    elapsed = time.perf_counter() - start
+    assert archived == len(rows)
+    for path in paths:
+        os.remove(path)
+    return elapsed
+
+
+def main(args):
+    os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
+    rows, total = make_tree(args.total_mb)
+    mb = total / (1024 * 1024)
+    print(f"{len(rows)} files, {mb:.0f} MB; batches of {args.batch_mb} MB")
+
+    elapsed = deflate_and_testzip(rows)
+    print(f"{'deflate + testzip, 1 thread':>32}: {elapsed:6.2f} s  {mb / elapsed:7.1f} MB/s")
+    for workers in args.workers:
+        elapsed = parallel_stored(rows, workers, args.batch_mb)
+        print(f"{f'stored + sampled verify, {workers} proc':>32}: {elapsed:6.2f} s  {mb / elapsed:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--total-mb", type=int, default=1024)
+    parser.add_argument("--batch-mb", type=int, default=256)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    try:
+        main(args)
+    finally:
+        shutil.rmtree(TEST_DIR)
@@ -0,0 +1,132 @@
+"""
+Read latency and write throughput under concurrent uploads, comparing a
+single default-configured engine (the old setup) with the tuned one from
+app.database: PRAGMA profile on every connection, a small write pool and a
+separate read-only pool.
+
+--writers tasks each loop over an upload-shaped transaction (dedup SELECT,
+INSERT, short pause standing in for the integrity check, COMMIT) while
+--readers tasks fetch feed pages. Reports commits/s, "database is locked"
+errors and read p50/p99 for both setups.
+
+    python benchmarks/bench_db_concurrency.py --writers 32 --readers 8 --seconds 10
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="wedding_bench_")
+DB_URL = f"sqlite+aiosqlite:///{os.path.join(TEST_DIR, 'bench.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["UPLOAD_STAGING_DIR"] = os.path.join(TEST_DIR, "incoming")
+os.environ["THUMBNAIL_DIR"] = os.path.join(TEST_DIR, "thumbnails")
+os.environ["ARCHIVE_DIR"] = os.path.join(TEST_DIR, "archives")
+os.environ["DATABASE_URL"] = DB_URL
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import select, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.database import init_db, make_engine
+from app.config import settings
+from app.models import Media
+from app.main import _feed_query
+
+
+class Run:
+    def __init__(self):
+        self.commits = 0
+        self.locked = 0
+        self.read_ms = []
+        self.seq = 0
+
+
+async def writer(sessions, run: Run, deadline: float, hold_sec: float):
+    while time.monotonic() < deadline:
+        run.seq += 1
+        file_hash = f"{id(run):x}-{run.seq:x}".rjust(64, "0")
+        try:
+            async with sessions() as db:
+                await db.execute(select(Media.id).where(Media.sha256_hash == file_hash))
+                await db.execute(insert(Media).values(
+                    filename=f"bench/{file_hash}.jpg", original_filename="IMG.jpg", file_type="image",
+                    mime_type="image/jpeg", file_size_bytes=1024, sha256_hash=file_hash,
+                    guest_uuid="bench", uploaded_by="Bench",
+                ))
+                await asyncio.sleep(hold_sec)
+                await db.commit()
+            run.commits += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            run.locked += 1
+
+
+async def reader(sessions, run: Run, deadline: float, interval_sec: float):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        async with sessions() as db:
+            (await db.execute(_feed_query(limit=20))).scalars().all()
+        run.read_ms.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval_sec)
+
+
+async def measure(write_sessions, read_sessions, args) -> Run:
+    run = Run()
+    deadline = time.monotonic() + args.seconds
+    await asyncio.gather(
+        *(writer(write_sessions, run, deadline, args.hold_ms / 1000) for _ in range(args.writers)),
+        *(reader(read_sessions, run, deadline, args.read_interval_ms / 1000) for _ in range(args.readers)),
+    )
+    return run
+
+
+def report(name: str, run: Run, seconds: float):
+    timings = sorted(run.read_ms) or [0.0]
+    p50 = timings[len(timings) // 2]
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name:>8}: {run.commits / seconds:7.1f} commits/s  {run.locked:4d} locked errors  "
+          f"reads p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  ({len(timings)} reads)")
+
+
+async def main(args):
+    await init_db()
+
+    # Old setup: one engine for everything, default pool, no per-connection PRAGMAs
+    baseline = create_async_engine(DB_URL, connect_args={"check_same_thread": False})
+    sessions = async_sessionmaker(bind=baseline, class_=AsyncSession)
+    before = await measure(sessions, sessions, args)
+    await baseline.dispose()
+
+    write_engine = make_engine(DB_URL, pool_size=settings.DB_WRITE_POOL_SIZE)
+    read_engine = make_engine(DB_URL, pool_size=settings.DB_READ_POOL_SIZE, read_only=True)
+    after = await measure(
+        async_sessionmaker(bind=write_engine, class_=AsyncSession),
+        async_sessionmaker(bind=read_engine, class_=AsyncSession),
+        args,
+    )
+    await write_engine.dispose()
+    await read_engine.dispose()
+
+    report("baseline", before, args.seconds)
+    report("tuned", after, args.seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--hold-ms", type=float, default=5, help="time each write transaction stays open")
+    parser.add_argument("--read-interval-ms", type=float, default=50, help="pause between one reader's requests")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args))
+    finally:
+        shutil.rmtree(TEST_DIR)
@@ -0,0 +1,148 @@
+"""
+/slideshow/feed page latency on a large table, with and without the feed
+indexes created by init_db.
+
+Seeds --rows media rows into a throwaway database, checks with EXPLAIN QUERY
+PLAN that every feed filter combination walks an index instead of sorting,
+then reports p50/p99 page latency through the app for both setups.
+
+    python benchmarks/bench_feed_indexes.py --rows 100000 --max-p99-ms 50
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+TEST_DIR = tempfile.mkdtemp(prefix="wedding_bench_")
+DB_PATH = os.path.join(TEST_DIR, "bench.db")
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["UPLOAD_STAGING_DIR"] = os.path.join(TEST_DIR, "incoming")
+os.environ["THUMBNAIL_DIR"] = os.path.join(TEST_DIR, "thumbnails")
+os.environ["ARCHIVE_DIR"] = os.path.join(TEST_DIR, "archives")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import sqlite
+
+from app.database import FEED_INDEXES
+from app.main import app, _feed_query, response_cache
+
+# (description, _feed_query kwargs, URL) for each filter combination the UI uses
+CASES = [
+    ("public newest", {}, "/slideshow/feed?limit=20"),
+    ("public cursor, page 50", {"cursor": "CURSOR"}, "/slideshow/feed?limit=20&cursor=CURSOR"),
+    ("admin all", {"admin_mode": True}, "/slideshow/feed?limit=6&admin_mode=true"),
+    ("admin photos", {"admin_mode": True, "type": "image"}, "/slideshow/feed?limit=6&admin_mode=true&type=image"),
+    ("admin starred", {"admin_mode": True, "filter": "starred"}, "/slideshow/feed?limit=6&admin_mode=true&filter=starred"),
+    ("admin hidden", {"admin_mode": True, "filter": "hidden"}, "/slideshow/feed?limit=6&admin_mode=true&filter=hidden"),
+    ("admin hidden videos", {"admin_mode": True, "filter": "hidden", "type": "video"},
+     "/slideshow/feed?limit=6&admin_mode=true&filter=hidden&type=video"),
+]
+
+
+def seed(rows: int):
+    rng = random.Random(42)
+    start = datetime(2025, 6, 1, 16, 0)
+    conn = sqlite3.connect(DB_PATH)
+    batch = []
+    for i in range(1, rows + 1):
+        # ~12 hours of uploads, several per second at peak, so timestamps collide
+        created = start + timedelta(seconds=int(i * 43200 / rows))
+        batch.append((
+            f"bench/{i}.jpg", f"IMG_{i}.jpg", "video" if rng.random() < 0.15 else "image", "image/jpeg",
+            1024, f"{i:064x}", f"guest-{i % 300}", f"Guest {i % 300}",
+            created.strftime("%Y-%m-%d %H:%M:%S"), # as CURRENT_TIMESTAMP writes it
+            rng.random() < 0.05, rng.random() < 0.03, 0,
+        ))
+    conn.executemany(
+        "INSERT INTO media (filename, original_filename, file_type, mime_type, file_size_bytes, sha256_hash, "
+        "guest_uuid, uploaded_by, created_at, is_hidden, is_starred, view_count) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def query_plan(kwargs: dict) -> str:
+    compiled = _feed_query(**kwargs).compile(dialect=sqlite.dialect())
+    params = [str(compiled.params[name]) for name in compiled.positiontup]
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    finally:
+        conn.close()
+    return " / ".join(row[-1] for row in rows)
+
+
+def latency(client, url: str, runs: int):
+    timings = []
+    for _ in range(runs):
+        response_cache.bump() # measure the query, not the cached first page
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    timings.sort()
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+
+def run_cases(client, cursor: str, runs: int):
+    results = {}
+    for name, kwargs, url in CASES:
+        kwargs = {k: (cursor if v == "CURSOR" else v) for k, v in kwargs.items()}
+        results[name] = (query_plan(kwargs), *latency(client, url.replace("CURSOR", cursor), runs))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--max-p99-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    try:
+        with TestClient(app) as client:
+            seed(args.rows)
+
+            # A cursor deep into the public feed
+            cursor = None
+            for _ in range(50):
+                cursor = client.get("/slideshow/feed", params={"limit": 20, "cursor": cursor}).json()["next_cursor"]
+
+            indexed = run_cases(client, cursor, args.runs)
+
+            conn = sqlite3.connect(DB_PATH)
+            for statement in FEED_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {statement.split()[5]}")
+            conn.commit()
+            conn.close()
+            unindexed = run_cases(client, cursor, max(10, args.runs // 10))
+
+        failures = []
+        for name, _, _ in CASES:
+            plan, p50, p99 = indexed[name]
+            _, old_p50, old_p99 = unindexed[name]
+            print(f"{name:>22}: p50 {p50:6.2f} ms  p99 {p99:6.2f} ms   "
+                  f"(no indexes: p50 {old_p50:7.2f} ms  p99 {old_p99:7.2f} ms)")
+            print(f"{'':>22}  {plan}")
+            if "TEMP B-TREE" in plan or "USING INDEX ix_media_" not in plan:
+                failures.append(f"{name}: feed query does not use a feed index ({plan})")
+            if "cursor" in name and "created_at<?" not in plan:
+                failures.append(f"{name}: cursor does not seek into the index ({plan})")
+            if p99 > args.max_p99_ms:
+                failures.append(f"{name}: p99 {p99:.1f} ms over {args.max_p99_ms} ms")
+        assert not failures, "\n".join(failures)
+    finally:
+        shutil.rmtree(TEST_DIR)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cost of building one /slideshow/feed page: the old path (full Media ORM
+objects, per-row dicts with pytz fixes, FastAPI's jsonable_encoder + json)
+against the lean one in app/serialize.py (selected columns as rows,
+created_at formatted by SQLite, orjson).
+
+Reports mean/p99 latency and, via tracemalloc, memory allocated per page.
+
+    python benchmarks/bench_feed_serialization.py --page 50
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+TEST_DIR = tempfile.mkdtemp(prefix="wedding_bench_")
+DB_PATH = os.path.join(TEST_DIR, "bench.db")
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["UPLOAD_STAGING_DIR"] = os.path.join(TEST_DIR, "incoming")
+os.environ["THUMBNAIL_DIR"] = os.path.join(TEST_DIR, "thumbnails")
+os.environ["ARCHIVE_DIR"] = os.path.join(TEST_DIR, "archives")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+
+sys.path.append(os.getcwd())
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, desc
+
+from app.database import init_db, ReadSessionLocal
+from app.models import Media
+from app.main import _feed_item, _feed_query
+from app.serialize import dumps, feed_rows
+
+
+def seed(rows: int):
+    rng = random.Random(42)
+    start = datetime(2025, 6, 1, 16, 0)
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany(
+        "INSERT INTO media (filename, original_filename, file_type, mime_type, file_size_bytes, sha256_hash, "
+        "guest_uuid, uploaded_by, caption, created_at, is_hidden, is_starred, view_count, thumbnail_path, thumbnail_widths) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, 0, ?, ?)",
+        [(
+            f"1717257600_ab12cd34_Guest/{i:032x}.jpg", f"IMG_{i}.jpg", "image", "image/jpeg", 2_500_000, f"{i:064x}",
+            f"guest-{i % 300}", f"Guest {i % 300}", "Dancing all night" if i % 3 else None,
+            (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"), rng.random() < 0.05,
+            f"thumb_{i:032x}_800.jpg", "320,800,1920",
+        ) for i in range(1, rows + 1)])
+    conn.commit()
+    conn.close()
+
+
+async def old_page(db, limit: int) -> bytes:
+    query = select(Media).where(Media.is_hidden == False).order_by(desc(Media.created_at), desc(Media.id)).limit(limit)
+    media_items = (await db.execute(query)).scalars().all()
+    data = [_feed_item(m) for m in media_items]
+    last = media_items[-1]
+    body = {"items": data, "next_cursor": f"{last.created_at.isoformat()}_{last.id}"}
+    # What FastAPI does with a returned dict
+    return json.dumps(jsonable_encoder(body), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+async def lean_page(db, limit: int) -> bytes:
+    data = feed_rows(await db.execute(_feed_query(limit=limit)))
+    last = data[-1]
+    return dumps({"items": data, "next_cursor": f"{last['created_at']}_{last['id']}"})
+
+
+async def measure(build, limit: int, runs: int):
+    timings = []
+    async with ReadSessionLocal() as db:
+        await build(db, limit) # warm up
+        for _ in range(runs):
+            start = time.perf_counter()
+            await build(db, limit)
+            timings.append((time.perf_counter() - start) * 1000)
+            db.expunge_all()
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        await build(db, limit)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    allocated = sum(s.size_diff for s in stats if s.size_diff > 0)
+    blocks = sum(s.count_diff for s in stats if s.count_diff > 0)
+    timings.sort()
+    return sum(timings) / len(timings), timings[min(len(timings) - 1, int(len(timings) * 0.99))], peak, allocated, blocks
+
+
+async def main(args):
+    await init_db()
+    seed(args.rows)
+    results = {
+        "ORM + jsonable_encoder": await measure(old_page, args.page, args.runs),
+        "lean rows + orjson": await measure(lean_page, args.page, args.runs),
+    }
+    for name, (mean, p99, peak, allocated, blocks) in results.items():
+        print(f"{name:>24}: mean {mean:6.2f} ms  p99 {p99:6.2f} ms  "
+              f"peak {peak / 1024:7.1f} KiB  retained {allocated / 1024:6.1f} KiB in {blocks} blocks")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=300)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args))
+    finally:
+        shutil.rmtree(TEST_DIR)
@@ -0,0 +1,85 @@
+"""
+Cost of one check_schedule_mode() lookup: the old read-parse-scan of
+schedule.json on every call versus the cached compiled schedule.
+
+    python benchmarks/bench_schedule.py --blocks 20 200 --calls 20000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.getcwd())
+
+import pytz
+
+from app.schedule import ScheduleStore
+
+TIMEZONE = "America/Los_Angeles"
+
+
+def legacy_check(path: str, now: datetime) -> dict:
+    """check_schedule_mode as it was: file I/O and parsing on every call."""
+    with open(path, "r") as f:
+        schedule = json.load(f)
+        schedule.sort(key=lambda x: x.get("start", ""))
+    for block in schedule:
+        start = datetime.fromisoformat(block["start"]).astimezone(pytz.timezone(TIMEZONE))
+        end = datetime.fromisoformat(block["end"]).astimezone(pytz.timezone(TIMEZONE))
+        if start <= now < end:
+            return {"mode": block.get("mode", "standard"), "message": block.get("message", ""),
+                    "remaining_seconds": (end - now).total_seconds()}
+        elif now < start:
+            return {"mode": "standard", "message": "", "remaining_seconds": (start - now).total_seconds()}
+    return {"mode": "standard", "message": "", "remaining_seconds": None}
+
+
+def write_schedule(path: str, count: int, base: datetime):
+    blocks = []
+    for i in range(count):
+        start = base + timedelta(minutes=15 * i)
+        blocks.append({"start": start.isoformat(), "end": (start + timedelta(minutes=10)).isoformat(),
+                       "mode": "blackout" if i % 2 else "unlimited", "message": f"Block {i}"})
+    with open(path, "w") as f:
+        json.dump(blocks, f, indent=4)
+
+
+def bench(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blocks", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    tz = pytz.timezone(TIMEZONE)
+    work_dir = tempfile.mkdtemp(prefix="wedding_bench_schedule_")
+    try:
+        for count in args.blocks:
+            path = os.path.join(work_dir, f"schedule_{count}.json")
+            base = datetime.now(tz) - timedelta(minutes=15 * count // 2)
+            write_schedule(path, count, base)
+            store = ScheduleStore(path, TIMEZONE)
+            # Worst case for the linear scan: now is past every block
+            now = base + timedelta(minutes=15 * count + 60)
+            assert legacy_check(path, now) == store.current(now)
+
+            legacy_us = bench(lambda: legacy_check(path, now), args.calls)
+            cached_us = bench(lambda: store.current(now), args.calls)
+            print(f"{count:>4} blocks: legacy {legacy_us:9.1f} us/call  compiled {cached_us:7.2f} us/call  "
+                  f"({legacy_us / cached_us:,.0f}x)")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Admin search latency: the FTS5 index (media_fts) against the old
+leading-wildcard LIKE scan over caption, uploaded_by and original_filename.
+
+Seeds --rows media rows with short captions into a throwaway database (the
+media_fts triggers index them as they are inserted), then reports p50/p99
+/slideshow/feed?q=... latency through the app for a few typical searches,
+once with full-text search and once with it switched off.
+
+    python benchmarks/bench_search.py --rows 50000
+"""
+import os
+import sys
+import time
+import random
+import logging
+import shutil
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+TEST_DIR = tempfile.mkdtemp(prefix="wedding_bench_")
+DB_PATH = os.path.join(TEST_DIR, "bench.db")
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["UPLOAD_STAGING_DIR"] = os.path.join(TEST_DIR, "incoming")
+os.environ["THUMBNAIL_DIR"] = os.path.join(TEST_DIR, "thumbnails")
+os.environ["ARCHIVE_DIR"] = os.path.join(TEST_DIR, "archives")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from app import database
+from app.main import app, response_cache
+
+WORDS = ("first dance cake toast bride groom garden sunset family friends party "
+         "ring vows kiss flowers music table speech laugh night").split()
+NAMES = ["Maria", "Jose", "Ana", "Luis", "Sofia", "Carlos", "Elena", "Miguel", "Lucia", "Diego"]
+SEARCHES = ["cake", "sunset vows", "Mar", "IMG_123", "fireworks"]
+
+
+def seed(rows: int):
+    rng = random.Random(42)
+    start = datetime(2025, 6, 1, 16, 0)
+    batch = []
+    for i in range(1, rows + 1):
+        created = start + timedelta(seconds=int(i * 43200 / rows))
+        caption = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 6))) or None
+        name = f"{rng.choice(NAMES)} {rng.choice(NAMES)}ez"
+        batch.append((
+            f"bench/{i}.jpg", f"IMG_{i}.jpg", "image", "image/jpeg", 1024, f"{i:064x}",
+            f"guest-{i % 300}", name, caption, created.strftime("%Y-%m-%d %H:%M:%S"), 0, 0, 0,
+        ))
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany(
+        "INSERT INTO media (filename, original_filename, file_type, mime_type, file_size_bytes, sha256_hash, "
+        "guest_uuid, uploaded_by, caption, created_at, is_hidden, is_starred, view_count) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def latency(client, q: str, order: str, runs: int):
+    timings = []
+    for _ in range(runs):
+        response_cache.bump() # measure the query, not the cached first page
+        start = time.perf_counter()
+        response = client.get("/slideshow/feed", params={"limit": 6, "admin_mode": "true", "q": q, "order": order})
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    timings.sort()
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    try:
+        with TestClient(app) as client:
+            assert database.fts_enabled, "SQLite was built without FTS5"
+            seed(args.rows)
+
+            for q in SEARCHES:
+                fts_newest = latency(client, q, "newest", args.runs)
+                fts_ranked = latency(client, q, "relevance", args.runs)
+                database.fts_enabled = False
+                like = latency(client, q, "newest", args.runs)
+                database.fts_enabled = True
+                print(f"{q!r:>14}: FTS newest p50 {fts_newest[0]:6.2f} ms p99 {fts_newest[1]:6.2f} ms | "
+                      f"FTS ranked p50 {fts_ranked[0]:6.2f} ms p99 {fts_ranked[1]:6.2f} ms | "
+                      f"LIKE p50 {like[0]:7.2f} ms p99 {like[1]:7.2f} ms")
+    finally:
+        shutil.rmtree(TEST_DIR)
+
+
+if __name__ == "__main__":
+    main()
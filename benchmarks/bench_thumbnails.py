@@ -0,0 +1,89 @@
+"""
+Thumbnail rendering cost for large phone-sized photos.
+
+Generates a corpus of big JPEGs (optionally with a rotated EXIF orientation)
+and renders the THUMBNAIL_WIDTHS derivatives for each one in a fresh
+subprocess, so the reported peak RSS belongs to that image alone.
+
+    python benchmarks/bench_thumbnails.py --megapixels 12 48 --count 3
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.append(os.getcwd())
+
+from PIL import Image
+
+from app.thumbnails import render_thumbnail
+
+WIDTHS = [320, 800, 1920]
+
+
+def make_corpus(directory: str, megapixels, count: int):
+    paths = []
+    for mp in megapixels:
+        width = int((mp * 1_000_000 * 4 / 3) ** 0.5)
+        height = width * 3 // 4
+        for i in range(count):
+            # Noise-free gradients compress like real photos far better than random bytes
+            img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+            exif = img.getexif()
+            exif[0x0112] = 6 if i % 2 else 1
+            path = os.path.join(directory, f"bench_{mp}mp_{i}.jpg")
+            img.save(path, "JPEG", quality=90, exif=exif)
+            paths.append((mp, path))
+    return paths
+
+
+def peak_rss_mb() -> float:
+    # VmHWM is reset on exec, unlike ru_maxrss which a spawned child inherits
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _render(path, out_dir, queue):
+    start = time.perf_counter()
+    render_thumbnail(path, "image/jpeg", out_dir, WIDTHS, False, 0)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, peak_rss_mb()))
+
+
+def measure(path: str, out_dir: str):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_render, args=(path, out_dir, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megapixels", type=int, nargs="+", default=[12, 48])
+    parser.add_argument("--count", type=int, default=3)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="wedding_bench_thumbs_")
+    try:
+        corpus = make_corpus(work_dir, args.megapixels, args.count)
+        for mp in args.megapixels:
+            results = [measure(path, work_dir) for size, path in corpus if size == mp]
+            latencies = [r[0] * 1000 for r in results]
+            peak = max(r[1] for r in results)
+            print(f"{mp:>3} MP: {sum(latencies) / len(latencies):8.1f} ms/image avg  "
+                  f"{max(latencies):8.1f} ms max  {peak:8.1f} MB peak RSS")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Upload throughput with each UPLOAD_VERIFY_MODE.
+
+Runs the app in-process against a throwaway data dir and uploads random
+files through /upload, reporting MB/s and how many bytes the process read
+back from disk (read_chars) for each mode.
+
+    python benchmarks/bench_upload_verify.py --size-mb 100 --count 5
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="wedding_bench_")
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["UPLOAD_STAGING_DIR"] = os.path.join(TEST_DIR, "incoming")
+os.environ["THUMBNAIL_DIR"] = os.path.join(TEST_DIR, "thumbnails")
+os.environ["ARCHIVE_DIR"] = os.path.join(TEST_DIR, "archives")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(TEST_DIR, 'bench.db')}"
+os.environ["GENERATE_VIDEO_THUMBNAILS"] = "false"
+# One guest sends every upload; admission limits would turn most of them away
+os.environ["THROTTLE_DEFAULT_LIMIT"] = "100000"
+os.environ["UPLOAD_GLOBAL_RATE_PER_MIN"] = "100000"
+
+sys.path.append(os.getcwd())
+
+import psutil
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+
+
+def read_chars() -> int:
+    counters = psutil.Process().io_counters()
+    return getattr(counters, "read_chars", counters.read_bytes)
+
+
+def run(client, mode: str, size_mb: int, count: int):
+    settings.UPLOAD_VERIFY_MODE = mode
+    payloads = [os.urandom(size_mb * 1024 * 1024) for _ in range(count)]
+
+    start_read = read_chars()
+    start = time.perf_counter()
+    for i, payload in enumerate(payloads):
+        response = client.post("/upload", files={"file": (f"bench_{i}.mp4", payload, "video/mp4")})
+        assert response.status_code == 200, response.text
+    elapsed = time.perf_counter() - start
+    read_mb = (read_chars() - start_read) / (1024 * 1024)
+
+    total_mb = size_mb * count
+    print(f"{mode:>8}: {total_mb / elapsed:8.1f} MB/s  {elapsed / count * 1000:8.1f} ms/upload  "
+          f"{read_mb:8.1f} MB read back")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--count", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        with TestClient(app) as client:
+            client.cookies.set("guest_name", "Bench")
+            client.cookies.set("guest_uuid", "bench-uuid")
+            for mode in ("rehash", "fsync", "sampled"):
+                run(client, mode, args.size_mb, args.count)
+    finally:
+        shutil.rmtree(TEST_DIR)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ def setup_test_environment():
     """Sets up a consistent test environment for all tests."""
     TEST_DIR = tempfile.mkdtemp(prefix="wedding_app_")
     os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+    os.environ["UPLOAD_STAGING_DIR"] = os.path.join(TEST_DIR, "incoming")
     os.environ["THUMBNAIL_DIR"] = os.path.join(TEST_DIR, "thumbnails")
     os.environ["ARCHIVE_DIR"] = os.path.join(TEST_DIR, "archives")
     os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(TEST_DIR, 'test.db')}"
@@ -1,10 +1,22 @@
 import os
 import sys
 import time
+import gzip
+import json
 import shutil
+import socket
 import asyncio
+import hashlib
+import sqlite3
+import struct
 import zipfile
+import zlib
+import fcntl
 import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from contextlib import AsyncExitStack, nullcontext
 from datetime import datetime, timedelta
 import subprocess
 
@@ -12,6 +24,9 @@ import subprocess
 sys.path.append(os.getcwd())
 
 from app.config import settings
+from app.export import compress_type
+from app.integrity import WriteSampler, fsync_path, samples_match
+from app.notify import notify_socket_path
 
 # Ensure directories exist before logging
 os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
@@ -28,141 +43,379 @@ logging.basicConfig(
 logger = logging.getLogger("ArchiveDaemon")
 
 def backup_database():
-    """Copy database.sqlite to archives."""
-    db_path = "/data/database.sqlite" # Assuming standard path
+    """
+    Snapshot of the live database -> /data/archives/db_backup_{ts}.sqlite.gz,
+    keeping the newest DB_BACKUP_KEEP.
+
+    Uses SQLite's online backup API, so committed WAL contents are included
+    and the copy is consistent. The source connection holds one read
+    transaction for the whole copy. In WAL mode that never blocks the app's
+    writer, and the backup does not restart when the app commits meanwhile.
+    Pages are copied DB_BACKUP_PAGES_PER_STEP at a time with a short pause
+    in between, to spread the I/O. Raises if the backup fails.
+    """
+    db_path = database_path()
     if not os.path.exists(db_path):
         logger.warning(f"Database not found at {db_path}")
         return
 
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = os.path.join(settings.ARCHIVE_DIR, f"db_backup_{ts}.sqlite")
+    backup_path = os.path.join(settings.ARCHIVE_DIR, f"db_backup_{ts}.sqlite.gz")
+    # Dot-prefixed while in progress (rclone skips those)
+    tmp_path = os.path.join(settings.ARCHIVE_DIR, f".db_backup_{ts}.sqlite")
+
+    def pace(status, remaining, total):
+        time.sleep(settings.DB_BACKUP_STEP_SLEEP_MS / 1000)
 
     try:
-        shutil.copy2(db_path, backup_path)
+        src = sqlite3.connect(db_path, timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        dst = sqlite3.connect(tmp_path)
+        try:
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1") # starts the read transaction
+            src.backup(dst, pages=settings.DB_BACKUP_PAGES_PER_STEP, progress=pace)
+            src.execute("COMMIT")
+            check = dst.execute("PRAGMA quick_check").fetchone()[0]
+            if check != "ok":
+                raise Exception(f"Backup failed quick_check: {check}")
+        finally:
+            src.close()
+            dst.close()
+
+        with open(tmp_path, 'rb') as f, gzip.open(tmp_path + ".gz", 'wb', compresslevel=6) as out:
+            shutil.copyfileobj(f, out, 1024 * 1024)
+        os.replace(tmp_path + ".gz", backup_path)
         logger.info(f"Database backed up to {backup_path}")
-    except Exception as e:
-        logger.error(f"DB Backup failed: {e}")
-
-def archive_media():
-    """Zip folders older than 30 mins -> /data/archives/batch_{ts}.zip."""
-    # Since we are dumping all files into UPLOAD_DIR, we need to select files
-    # that haven't been archived yet? Or just dump everything that isn't zipped?
-    # The requirement says: "Zip folders older than 30 mins".
-    # But we are using a flat structure in UPLOAD_DIR based on previous implementation.
-    # To support "folders", maybe we should have organized uploads by timestamp?
-    # Or, we just select *files* in UPLOAD_DIR that are older than 30 mins.
-    # But if we zip them, should we delete them?
-    # The requirements say: "Never delete the active /data/uploads folder."
-    # AND "Delete oldest local ZIPs until usage < limit".
-    # This implies we keep the source files in UPLOAD_DIR forever unless we run out of space?
-    # Actually, "Never delete the active /data/uploads folder" likely refers to the *folder itself*,
-    # not the content.
-    # BUT, typically archival implies moving data.
-    # IF we keep everything in uploads AND zip it, we duplicate usage.
-    # Given "UNRESTRICTED" resources but "MAX_LOCAL_STORAGE_GB" limit (40GB),
-    # we probably want to *move* files to zip, OR zip and keep until space needed.
-    # However, for a wedding, 40GB fills up fast with video.
-    # Let's assume:
-    # 1. Zip files > 30 mins old.
-    # 2. DO NOT delete from uploads yet (Slideshow needs them!).
-    # Wait, if we don't delete from uploads, the pruning logic "Delete oldest local ZIPs" won't free up space used by UPLOAD_DIR.
-    # "Never delete the active /data/uploads folder" might mean "don't delete the directory",
-    # but surely we must delete old files if we hit the limit?
-    # OR, maybe the pruning logic *only* targets the ARCHIVES?
-    # "Step 5: Smart Pruning: ... Delete *oldest* local ZIPs ... *Never* delete the active /data/uploads folder."
-    # This implies the Uploads folder is sacred and fills up until disk full?
-    # That contradicts the goal of "Smart Pruning" if the primary consumer is uploads.
-    # Let's interpret: We assume the 40GB limit applies to the *Archives*?
-    # Or total disk?
-    # "Check local disk usage. IF AND ONLY IF usage > MAX_LOCAL_STORAGE_GB"
-    # This usually means total usage.
-    # If total usage is high, we delete ZIPs.
-    # If we delete ZIPs, we lose the backup on the local machine (but it's on Rclone).
-    # We still have the raw files in /data/uploads.
-    # IF /data/uploads grows beyond 40GB, we are in trouble if we can't prune it.
-    # But the instructions are specific: "Never delete the active /data/uploads folder."
-    # Maybe it means "don't delete the folder itself", or "don't prune *recent* uploads"?
-    # I will stick to the literal instruction: Prune ZIPs, keep Uploads.
-    # Note: If 24GB RAM is available, maybe we don't need to worry too much.
-
-    # Strategy:
-    # 1. Find files in UPLOAD_DIR modified > 30 mins ago.
-    # 2. Add them to a new ZIP if they aren't already archived (tracking this is hard without a DB state).
-    #    Simpler: Just Zip *all* files every 10 mins? No, that's huge.
-    #    Maybe move files to a "processed" subfolder?
-    #    Or, since we back up the DB, we can use the DB to track what has been archived?
-    #    Too complex for a script.
-    #    Let's go with Time-based Batching.
-    #    We zip files modified between (Last Run) and (Now - 30 mins).
-    #    We need to store "Last Run" timestamp.
-
-    state_file = os.path.join(settings.ARCHIVE_DIR, "daemon_state.json")
-    last_run = 0
-    import json
-    if os.path.exists(state_file):
+
+        # Rolling retention (older uncompressed copies included)
+        backups = sorted(f for f in os.listdir(settings.ARCHIVE_DIR) if f.startswith("db_backup_"))
+        for old in backups[:-settings.DB_BACKUP_KEEP]:
+            os.remove(os.path.join(settings.ARCHIVE_DIR, old))
+        return True
+    finally:
+        for path in (tmp_path, tmp_path + ".gz"):
+            if os.path.exists(path):
+                os.remove(path)
+
+def database_path() -> str:
+    """Filesystem path of the SQLite database in DATABASE_URL."""
+    return settings.DATABASE_URL.split(":///", 1)[-1]
+
+def open_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(database_path(), timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}")
+    return conn
+
+def state_path() -> str:
+    return os.path.join(settings.ARCHIVE_DIR, "daemon_state.json")
+
+def load_state() -> dict:
+    if os.path.exists(state_path()):
         try:
-            with open(state_file, 'r') as f:
-                last_run = json.load(f).get("last_run", 0)
+            with open(state_path(), 'r') as f:
+                return json.load(f)
         except: pass
+    return {}
+
+# Stages save state from their own threads
+_state_lock = threading.Lock()
+
+def save_state(**changes):
+    """Merges ``changes`` into daemon_state.json (also read by /admin/stats)."""
+    with _state_lock:
+        state = load_state()
+        state.update(changes)
+        tmp_path = state_path() + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path())
+
+# Media changed since the last cycle (change_seq, see app/database.py) that the
+# manifest does not hold yet for this upload hash. Compared with the hash the
+# row had when archived, not the archived bytes: a file that no longer matches
+# is archived (and flagged) once, not again on every change. The change_seq
+# index keeps a cycle proportional to what happened since the previous one.
+PENDING_SQL = """
+SELECT m.id, m.filename, m.mime_type, m.sha256_hash, m.change_seq
+FROM media m LEFT JOIN archive_manifest a ON a.media_id = m.id
+WHERE m.change_seq > ? AND (a.media_id IS NULL OR a.upload_sha256 IS NOT m.sha256_hash)
+ORDER BY m.change_seq
+"""
+
+MANIFEST_SQL = (
+    "INSERT OR REPLACE INTO archive_manifest "
+    "(media_id, batch, archived_at, sha256, upload_sha256, hash_mismatch) "
+    "VALUES (?, ?, CURRENT_TIMESTAMP, ?, ?, ?)"
+)
 
-    now = time.time()
-    cutoff = now - (30 * 60) # 30 mins ago
-
-    # Find folders (new structure)
-    # We are looking for folders in UPLOAD_DIR that match the pattern timestamp_uuid_name
-    # AND are older than 30 mins (to ensure upload is done).
-
-    folders_to_archive = []
-    for f in os.listdir(settings.UPLOAD_DIR):
-        fp = os.path.join(settings.UPLOAD_DIR, f)
-        if os.path.isdir(fp):
-            # Check age
-            mtime = os.path.getmtime(fp)
-            if mtime > last_run and mtime <= cutoff:
-                folders_to_archive.append(fp)
-
-    if not folders_to_archive:
-        logger.info("No new upload folders to archive.")
-        with open(state_file, 'w') as f:
-            json.dump({"last_run": cutoff}, f)
-        return
+def send_alert(message: str):
+    """Posts ``message`` to DISCORD_WEBHOOK_URL, if one is configured."""
+    if settings.DISCORD_WEBHOOK_URL:
+        subprocess.run(["curl", "-H", "Content-Type: application/json", "-d", json.dumps({"content": message}), settings.DISCORD_WEBHOOK_URL])
+
+# Bytes copied at a time; also the block size of the windows sampled for verification
+COPY_CHUNK = 1024 * 1024
+
+def _write_entry(zf: zipfile.ZipFile, path: str, arcname: str, compress: int, sampler: WriteSampler):
+    """
+    Copies ``path`` into the archive in one read; returns the SHA-256, CRC-32
+    and size of the bytes written. ``sampler`` records windows of them.
+    """
+    digest, crc, size = hashlib.sha256(), 0, 0
+    info = zipfile.ZipInfo.from_file(path, arcname)
+    info.compress_type = compress
+    with open(path, 'rb') as src, zf.open(info, 'w') as dst:
+        for chunk in iter(lambda: src.read(COPY_CHUNK), b''):
+            digest.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            sampler.record(size, chunk)
+            size += len(chunk)
+            dst.write(chunk)
+    return digest.hexdigest(), crc, size
+
+def _entry_reads_back(f, zf: zipfile.ZipFile, info: zipfile.ZipInfo, sampler: WriteSampler) -> bool:
+    """
+    Spot-checks one written entry. Stored data sits unchanged after the local
+    header, so the sampled windows are compared in place; deflated entries
+    (a few image types only) are decompressed in full, which checks their CRC.
+    """
+    if info.compress_type != zipfile.ZIP_STORED:
+        try:
+            with zf.open(info) as src:
+                while src.read(COPY_CHUNK):
+                    pass
+        except zipfile.BadZipFile:
+            return False
+        return True
+    f.seek(info.header_offset)
+    header = f.read(30)
+    if header[:4] != b"PK\x03\x04":
+        return False
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    return samples_match(f.fileno(), sampler, info.header_offset + 30 + name_len + extra_len)
 
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    zip_name = f"batch_{ts}.zip"
-    zip_path = os.path.join(settings.ARCHIVE_DIR, zip_name)
+def _run_now(fn, *args) -> Future:
+    """Runs ``fn`` in this process, returning its outcome like ProcessPoolExecutor.submit."""
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def build_batch(zip_path: str, upload_dir: str, entries: list) -> list:
+    """
+    Writes one batch ZIP; runs in a pool process. ``entries`` are
+    (media_id, filename, mime_type, sha256_hash). Photos and videos are
+    stored, not deflated. Returns (media_id, sha256) of the files archived.
+
+    The integrity check of the content is the SHA-256 taken while each file
+    is copied, compared with media.sha256_hash. The written ZIP then gets
+    the "sampled" check uploads get (see app/integrity.py) instead of a full
+    read-back: fsync, its central directory compared with the CRCs and sizes
+    from the copy pass (structure only: those are the values the writer
+    emitted), and small windows of every entry's data read back and compared.
+    """
+    archived, expected, samplers = [], {}, {}
+    stride = max(1, settings.UPLOAD_VERIFY_SAMPLE_EVERY_MB * 1024 * 1024 // COPY_CHUNK)
+    with zipfile.ZipFile(zip_path, 'w', allowZip64=True) as zf:
+        for media_id, filename, mime_type, upload_hash in entries:
+            file_path = os.path.join(upload_dir, filename)
+            sampler = WriteSampler(COPY_CHUNK, stride)
+            try:
+                # Keep relative path from UPLOAD_DIR
+                checksum, crc, size = _write_entry(zf, file_path, filename, compress_type(mime_type), sampler)
+            except FileNotFoundError:
+                # Deleted by the guest since the batch was planned
+                continue
+            if upload_hash and checksum != upload_hash:
+                logger.error(f"{filename} does not match its upload checksum; archived as found")
+            archived.append((media_id, checksum))
+            expected[filename] = (crc, size)
+            samplers[filename] = sampler
+
+    # Verify
+    fsync_path(zip_path)
+    with open(zip_path, 'rb') as f, zipfile.ZipFile(f, 'r') as zf:
+        infos = zf.infolist()
+        found = {info.filename: (info.CRC, info.file_size) for info in infos}
+        if found != expected:
+            raise Exception(f"Archive {os.path.basename(zip_path)} does not list the files written")
+        for info in infos:
+            if not _entry_reads_back(f, zf, info, samplers[info.filename]):
+                raise Exception(f"Archive {os.path.basename(zip_path)}: {info.filename} does not read back as written")
+    return archived
+
+# Linux ioctl that shares a file's extents (btrfs, XFS with reflink=1, ...)
+FICLONE = 0x40049409
+
+SNAPSHOT_INDEX = "index.json"
+
+def _clone(src: str, dst: str) -> str:
+    """
+    Makes ``dst`` a copy of ``src`` without duplicating its bytes where the
+    filesystem allows: a hardlink, else a reflink, else a plain copy.
+    Uploads are never modified in place, so sharing them is safe.
+    """
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass # other filesystem, or links not supported
+    try:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return "reflink"
+    except OSError:
+        pass
+    shutil.copyfile(src, dst)
+    return "copy"
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_snapshot(snapshot_dir: str, upload_dir: str, entries: list) -> list:
+    """
+    ARCHIVE_MODE=snapshot: a batch directory of content-addressed links to
+    the originals (``ab/<sha256>.jpg``) plus index.json mapping each upload
+    path to its object, instead of a ZIP holding a second copy. The SHA-256
+    recorded at upload is used as the address; it is only computed for rows
+    without one. Returns (media_id, sha256) of the files linked.
+    """
+    os.makedirs(snapshot_dir)
+    archived, files, methods = [], [], {}
+    for media_id, filename, mime_type, upload_hash in entries:
+        file_path = os.path.join(upload_dir, filename)
+        try:
+            size = os.path.getsize(file_path)
+            checksum = upload_hash or _file_sha256(file_path)
+            obj = f"{checksum[:2]}/{checksum}{os.path.splitext(filename)[1].lower()}"
+            os.makedirs(os.path.join(snapshot_dir, checksum[:2]), exist_ok=True)
+            if not os.path.exists(os.path.join(snapshot_dir, obj)):
+                method = _clone(file_path, os.path.join(snapshot_dir, obj))
+                methods[method] = methods.get(method, 0) + 1
+        except FileNotFoundError:
+            # Deleted by the guest since the batch was planned
+            continue
+        archived.append((media_id, checksum))
+        files.append({"media_id": media_id, "path": filename, "object": obj, "sha256": checksum,
+                      "size": size, "mime_type": mime_type})
+
+    # Written last: a snapshot with an index is complete
+    with open(os.path.join(snapshot_dir, SNAPSHOT_INDEX), 'w') as f:
+        json.dump({"created_at": datetime.now().isoformat(), "files": files}, f, indent=1)
+    if methods.get("copy"):
+        logger.warning(f"{os.path.basename(snapshot_dir)}: {methods['copy']} files copied (no hardlink/reflink support)")
+    return archived
+
+def plan_batches(rows: list, max_bytes: int) -> list:
+    """Splits pending rows (in change_seq order) into batches of about ``max_bytes`` of originals."""
+    batches, current, size = [], [], 0
+    for row in rows:
+        try:
+            file_size = os.path.getsize(os.path.join(settings.UPLOAD_DIR, row[1]))
+        except OSError:
+            # Deleted by the guest, or pruned after an earlier archive
+            continue
+        if current and size + file_size > max_bytes:
+            batches.append(current)
+            current, size = [], 0
+        current.append(row)
+        size += file_size
+    if current:
+        batches.append(current)
+    return batches
+
+def archive_media() -> int:
+    """
+    Zip media not archived yet -> /data/archives/batch_{ts}_{seq}.zip, recorded
+    in archive_manifest. Batches of ARCHIVE_BATCH_MB are built on up to
+    ARCHIVE_WORKERS processes at once. With ARCHIVE_MODE=snapshot each batch
+    is a snapshot_{ts}_{seq} directory of links instead (see build_snapshot).
+    Returns the number of files archived; raises (after alerting) on failure.
+    """
+    mark = load_state().get("archive_seq", 0)
+    conn = open_db()
 
     try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for folder_path in folders_to_archive:
-                # Archive folder content
-                parent = os.path.dirname(folder_path)
-                for root, dirs, files in os.walk(folder_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, settings.UPLOAD_DIR) # Keep relative path from UPLOAD_DIR
-                        zf.write(file_path, arcname)
-
-        logger.info(f"Created archive {zip_name} with {len(folders_to_archive)} folders.")
-
-        # Verify
-        if zipfile.is_zipfile(zip_path):
-            with zipfile.ZipFile(zip_path, 'r') as zf:
-                ret = zf.testzip()
-                if ret is not None:
-                     raise Exception(f"Corrupt file in zip: {ret}")
-        else:
-            raise Exception("Invalid zip file created")
+        try:
+            rows = conn.execute(PENDING_SQL, (mark,)).fetchall()
+        except sqlite3.OperationalError as e:
+            # Tables are created by the app on startup
+            logger.warning(f"Archive manifest not available yet: {e}")
+            return
 
-        # Update state
-        with open(state_file, 'w') as f:
-            json.dump({"last_run": cutoff}, f)
+        if not rows:
+            logger.info("No new uploads to archive.")
+            return
+        high = rows[-1][4]
+        upload_hashes = {row[0]: row[3] for row in rows}
+
+        snapshot = settings.ARCHIVE_MODE == "snapshot"
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        jobs = {}
+        for batch in plan_batches(rows, settings.ARCHIVE_BATCH_MB * 1024 * 1024):
+            # The batch's last change_seq keeps names unique, also when cycles run back to back
+            name = f"snapshot_{ts}_{batch[-1][4]}" if snapshot else f"batch_{ts}_{batch[-1][4]}.zip"
+            jobs[name] = [row[:4] for row in batch]
+        if not jobs:
+            logger.info("Changed media no longer on disk; nothing to archive.")
+
+        failed, mismatched, total = [], [], 0
+        # Linking is metadata work; only ZIP batches are worth a process each
+        workers = 1 if snapshot else min(settings.ARCHIVE_WORKERS, len(jobs))
+        build = build_snapshot if snapshot else build_batch
+        with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as pool:
+            submit = pool.submit if pool else _run_now
+            # Built under a dot name that rclone skips, renamed once complete
+            futures = {
+                submit(build, os.path.join(settings.ARCHIVE_DIR, "." + name), settings.UPLOAD_DIR, entries): name
+                for name, entries in jobs.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                tmp_path = os.path.join(settings.ARCHIVE_DIR, "." + name)
+                try:
+                    archived = future.result()
+                    if not archived:
+                        remove_archive(tmp_path)
+                        continue
+                    os.replace(tmp_path, os.path.join(settings.ARCHIVE_DIR, name))
+                    records = []
+                    for media_id, checksum in archived:
+                        upload_hash = upload_hashes[media_id]
+                        mismatch = bool(upload_hash) and checksum != upload_hash
+                        if mismatch:
+                            mismatched.append(media_id)
+                        records.append((media_id, name, checksum, upload_hash, mismatch))
+                    with conn:
+                        conn.executemany(MANIFEST_SQL, records)
+                    total += len(archived)
+                    logger.info(f"Created archive {name} with {len(archived)} files.")
+                except Exception as e:
+                    failed.append(f"{name}: {e}")
+                    # Nothing was recorded, so the next cycle archives these again
+                    remove_archive(tmp_path)
+                    remove_archive(os.path.join(settings.ARCHIVE_DIR, name))
+
+        if mismatched:
+            send_alert(f"Archived {len(mismatched)} files that no longer match their upload checksum "
+                       f"(media {', '.join(map(str, mismatched))}); see hash_mismatch in archive_manifest")
+        if failed:
+            # Keep the mark; batches that succeeded are skipped through the manifest
+            raise Exception("; ".join(failed))
+        save_state(archive_seq=high)
+        return total
 
     except Exception as e:
-        logger.error(f"Archival failed: {e}")
-        # Alert Discord
-        if settings.DISCORD_WEBHOOK_URL:
-            # Simple curl or requests
-            subprocess.run(["curl", "-H", "Content-Type: application/json", "-d", f'{{"content": "Archival Failed: {e}"}}', settings.DISCORD_WEBHOOK_URL])
+        send_alert(f"Archival Failed: {e}")
+        raise
+    finally:
+        conn.close()
 
 def check_rclone_config():
     """Check if rclone config exists and is valid (not empty)."""
@@ -173,38 +426,44 @@ def check_rclone_config():
         return False
     return True
 
-def rclone_copy():
-    """Rclone copy /data/archives remote:wedding_backup."""
+def rclone_copy() -> bool:
+    """
+    Rclone copy /data/archives remote:wedding_backup. Returns True once
+    copied, False when no remote is configured; raises if rclone fails.
+    """
     if not check_rclone_config():
         logger.warning("Rclone config missing or empty. Skipping remote backup.")
-        return
-
-    cmd = ["rclone", "copy", settings.ARCHIVE_DIR, f"{settings.RCLONE_REMOTE_NAME}:wedding_backup"]
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            logger.error(f"Rclone failed: {result.stderr}")
-        else:
-            logger.info("Rclone copy successful.")
-            # Update state for admin dashboard
-            state_file = os.path.join(settings.ARCHIVE_DIR, "daemon_state.json")
-            state = {}
-            if os.path.exists(state_file):
-                try:
-                    with open(state_file, 'r') as f:
-                        state = json.load(f)
-                except: pass
-
-            state["last_rclone_success"] = time.time()
+        return False
 
-            with open(state_file, 'w') as f:
-                json.dump(state, f)
+    # Dot names are archives and backups still being written, and the notify socket
+    cmd = ["rclone", "copy", settings.ARCHIVE_DIR, f"{settings.RCLONE_REMOTE_NAME}:wedding_backup",
+           "--exclude", ".*", "--exclude", ".*/**"]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Rclone failed ({result.returncode}): {result.stderr.strip()[-500:]}")
+    logger.info("Rclone copy successful.")
+    # Update state for admin dashboard
+    save_state(last_rclone_success=time.time())
+    return True
 
-    except Exception as e:
-        logger.error(f"Rclone execution error: {e}")
+def remove_archive(path: str):
+    """Deletes a ZIP batch or a snapshot directory, if it exists."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def local_archives() -> list:
+    """ZIP batches and snapshot directories in ARCHIVE_DIR, oldest first."""
+    archives = [
+        os.path.join(settings.ARCHIVE_DIR, f) for f in os.listdir(settings.ARCHIVE_DIR)
+        if not f.startswith('.') and (f.endswith('.zip') or f.startswith('snapshot_'))
+    ]
+    archives.sort(key=os.path.getmtime)
+    return archives
 
 def smart_pruning(verify_remote=True):
-    """Prune oldest ZIPs if disk usage > MAX_LOCAL_STORAGE_GB."""
+    """Prune oldest archives (ZIPs or snapshots) if disk usage > MAX_LOCAL_STORAGE_GB."""
     # Check total disk usage of the volume containing ARCHIVE_DIR
     total, used, free = shutil.disk_usage(settings.ARCHIVE_DIR)
     used_gb = used / (1024**3)
@@ -213,75 +472,201 @@ def smart_pruning(verify_remote=True):
         logger.warning(f"Disk usage {used_gb:.2f}GB > Limit {settings.MAX_LOCAL_STORAGE_GB}GB. Pruning...")
 
         if verify_remote and not check_rclone_config():
-            logger.warning("Rclone config missing or empty. Cannot verify remote status. Skipping pruning of ZIPs.")
+            logger.warning("Rclone config missing or empty. Cannot verify remote status. Skipping pruning of archives.")
             return
 
-        # Identify local ZIPs verified as on remote
-        # We need to run `rclone lsl remote:wedding_backup` and match?
-        # That might be slow.
-        # Alternatively, we assume if rclone copy succeeded, they are there.
-        # But `rclone copy` is idempotent.
-
-        # Let's list local zips
-        zips = [os.path.join(settings.ARCHIVE_DIR, f) for f in os.listdir(settings.ARCHIVE_DIR) if f.endswith('.zip')]
-        zips.sort(key=os.path.getmtime) # Oldest first
-
-        while used_gb > settings.MAX_LOCAL_STORAGE_GB:
-            zips = [os.path.join(settings.ARCHIVE_DIR, f) for f in os.listdir(settings.ARCHIVE_DIR) if f.endswith('.zip')]
-            zips.sort(key=os.path.getmtime) # Oldest first
-
-            if not zips:
-                logger.warning("No more zips to prune, but disk usage is still high.")
+        # Only archives are deleted, never the uploads they hold. A snapshot
+        # shares its bytes with the upload folders, so removing one frees little
+        for archive in local_archives():
+            if used_gb <= settings.MAX_LOCAL_STORAGE_GB:
                 break
 
-            z = zips.pop(0) # Get the oldest zip
-
             if verify_remote:
-                check_cmd = ["rclone", "lsjson", f"{settings.RCLONE_REMOTE_NAME}:wedding_backup/{os.path.basename(z)}"]
+                check_cmd = ["rclone", "lsjson", f"{settings.RCLONE_REMOTE_NAME}:wedding_backup/{os.path.basename(archive)}"]
                 res = subprocess.run(check_cmd, capture_output=True, text=True)
                 if res.returncode != 0 or res.stdout.strip() == "[]":
-                    logger.warning(f"Skipping {z} - not found on remote.")
+                    logger.warning(f"Skipping {archive} - not found on remote.")
                     continue
 
             # Exists on remote (or verification skipped)
-            logger.info(f"Deleting archive: {z}")
-            os.remove(z)
-
-            try:
-                with zipfile.ZipFile(z, 'r') as zf:
-                    # Get top level folders
-                    folders = set()
-                    for name in zf.namelist():
-                        # name is like "folder/file.jpg"
-                        if '/' in name:
-                            folders.add(name.split('/')[0])
-
-                    for folder in folders:
-                        full_path = os.path.join(settings.UPLOAD_DIR, folder)
-                        if os.path.exists(full_path):
-                            logger.info(f"Pruning uploaded folder after verification: {folder}")
-                            shutil.rmtree(full_path)
-            except Exception as e:
-                logger.error(f"Failed to prune source folders from zip {z}: {e}")
+            logger.info(f"Deleting archive: {archive}")
+            remove_archive(archive)
 
             # Update usage
             total, used, free = shutil.disk_usage(settings.ARCHIVE_DIR)
             used_gb = used / (1024**3)
-
-def run_loop():
-    logger.info("Daemon started.")
-    while True:
+        else:
+            if used_gb > settings.MAX_LOCAL_STORAGE_GB:
+                logger.warning("No more archives to prune, but disk usage is still high.")
+
+def database_mtime() -> float:
+    """Last write to the database or its WAL."""
+    path = database_path()
+    return max((os.path.getmtime(p) for p in (path, path + "-wal") if os.path.exists(p)), default=0.0)
+
+class Stage:
+    """
+    One daemon job with its own cadence. It runs every ``interval`` seconds
+    at the latest. It also runs sooner when triggered: by app events named in
+    ``events`` ("*" for any), or by an upstream stage that did some work.
+    Triggers are debounced: the stage waits for ``debounce`` quiet seconds,
+    but no longer than ``max_delay`` after the first one, so a rush of
+    uploads becomes one run. Stages named in ``then`` are triggered when
+    ``func`` returns something truthy. ``locks`` are taken while it runs.
+    ``func`` fails by raising; the run is counted in ``failures`` and the
+    message kept as ``last_error`` until a run succeeds.
+    """
+
+    def __init__(self, name, func, interval, debounce=0.0, max_delay=None, events=(), then=(), locks=()):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.debounce = debounce
+        self.max_delay = max_delay if max_delay is not None else debounce
+        self.events = set(events)
+        self.then = tuple(then)
+        self.locks = tuple(sorted(locks)) # fixed order, no deadlocks
+        self._wake = asyncio.Event()
+        self.triggers = 0
+        self.runs = 0
+        self.failures = 0
+        self.last_started = None
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_error = None
+
+    def trigger(self):
+        self.triggers += 1
+        self._wake.set()
+
+    async def wait(self):
+        """Returns when the interval elapses or a debounced trigger is due."""
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+        except asyncio.TimeoutError:
+            return
+        deadline = loop.time() + self.max_delay
+        while True:
+            self._wake.clear()
+            quiet = min(self.debounce, deadline - loop.time())
+            if quiet <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=quiet)
+            except asyncio.TimeoutError:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "triggers": self.triggers,
+            "last_started": self.last_started,
+            "last_duration_sec": self.last_duration,
+            "avg_duration_sec": round(self.total_duration / self.runs, 3) if self.runs else None,
+            "max_duration_sec": round(self.max_duration, 3),
+            "last_error": self.last_error,
+        }
+
+class Scheduler:
+    """
+    Runs each stage as its own asyncio task. Stage functions are blocking, so
+    they run in threads. App events arrive as datagrams on the notify
+    socket (see app/notify.py), and stage timings are written to
+    daemon_state.json under "stages".
+    """
+
+    def __init__(self, stages):
+        self.stages = {stage.name: stage for stage in stages}
+        self._locks = defaultdict(asyncio.Lock)
+
+    def notify(self, event: str):
+        for stage in self.stages.values():
+            if "*" in stage.events or event in stage.events:
+                stage.trigger()
+
+    async def run_stage(self, stage: Stage):
+        async with AsyncExitStack() as stack:
+            for name in stage.locks:
+                await stack.enter_async_context(self._locks[name])
+            stage.last_started = time.time()
+            start = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(stage.func)
+                stage.last_error = None
+            except Exception as e:
+                logger.error(f"Stage {stage.name} failed: {e}")
+                stage.failures += 1
+                stage.last_error = str(e)
+                result = None
+            elapsed = time.perf_counter() - start
+        stage.runs += 1
+        stage.last_duration = round(elapsed, 3)
+        stage.total_duration += elapsed
+        stage.max_duration = max(stage.max_duration, elapsed)
+        save_state(stages={name: s.stats() for name, s in self.stages.items()})
+        if result:
+            for name in stage.then:
+                self.stages[name].trigger()
+
+    async def _stage_loop(self, stage: Stage):
+        while True:
+            await self.run_stage(stage)
+            await stage.wait()
+
+    async def serve(self, socket_path: str):
+        """Listens for app events on ``socket_path`` and runs the stages until cancelled."""
+        if os.path.exists(socket_path):
+            os.remove(socket_path) # left over from a previous run
+        scheduler = self
+
+        class NotifyProtocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                scheduler.notify(data.decode(errors="replace"))
+
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            NotifyProtocol, local_addr=socket_path, family=socket.AF_UNIX
+        )
         try:
-            logger.info("Starting backup cycle...")
-            backup_database()
-            archive_media()
-            rclone_copy()
-            smart_pruning(verify_remote=True)
-            logger.info("Cycle complete. Sleeping 10 mins.")
-        except Exception as e:
-            logger.error(f"Unhandled exception in loop: {e}")
+            await asyncio.gather(*(self._stage_loop(stage) for stage in self.stages.values()))
+        finally:
+            transport.close()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+_last_backup_mtime = None
+
+def backup_database_if_changed():
+    """backup_database, skipped while nothing was written since the last one."""
+    global _last_backup_mtime
+    mtime = database_mtime()
+    if mtime == _last_backup_mtime:
+        return False
+    if backup_database():
+        _last_backup_mtime = mtime
+        return True
+    return False
+
+def default_stages():
+    return [
+        # New uploads are archived once a burst settles, at most 2 minutes after the first
+        Stage("archive", archive_media, interval=600, debounce=30, max_delay=120,
+              events={"media.new"}, then=("rclone",)),
+        # Any change (uploads, moderation, views flushed, banner) makes the database worth backing up
+        Stage("backup", backup_database_if_changed, interval=600, debounce=60, max_delay=300,
+              events={"*"}, then=("rclone",)),
+        # Uploads whatever the stages above produced; the interval retries failures
+        Stage("rclone", rclone_copy, interval=1800, debounce=10, then=("prune",), locks=("remote",)),
+        # Disk usage check is cheap; it deletes only what is on the remote
+        Stage("prune", lambda: smart_pruning(verify_remote=True), interval=600, locks=("remote",)),
+    ]
 
-        time.sleep(600) # 10 mins
+async def run_daemon():
+    logger.info("Daemon started.")
+    await Scheduler(default_stages()).serve(notify_socket_path())
 
 if __name__ == "__main__":
-    run_loop()
+    asyncio.run(run_daemon())
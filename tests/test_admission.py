@@ -0,0 +1,98 @@
+import uuid
+import pytest
+from unittest.mock import patch
+
+from app.admission import AdmissionController, AdmissionDenied
+
+def make_controller(**overrides):
+    options = dict(guest_limit=2, guest_window_sec=60, global_per_min=100,
+                   max_concurrent=10, max_concurrent_per_guest=2)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+def test_guest_rate_limit_and_refill():
+    controller = make_controller()
+    with patch("app.admission.time.monotonic", return_value=1000.0):
+        controller.acquire("a", new_file=True).release()
+        controller.acquire("a", new_file=True).release()
+        with pytest.raises(AdmissionDenied) as denied:
+            controller.acquire("a", new_file=True)
+        # 2 per minute refills one token every 30s
+        assert denied.value.retry_after == pytest.approx(30)
+        # Other guests and chunk transfers are unaffected
+        controller.acquire("b", new_file=True).release()
+        controller.acquire("a", new_file=False).release()
+        # "unlimited" mode skips the per-guest rate
+        controller.acquire("a", new_file=True, rate_limited=False).release()
+
+    with patch("app.admission.time.monotonic", return_value=1030.0):
+        controller.acquire("a", new_file=True).release()
+
+def test_concurrency_limits():
+    controller = make_controller(max_concurrent=3)
+    first = controller.acquire("a", new_file=False)
+    controller.acquire("a", new_file=False)
+    with pytest.raises(AdmissionDenied):
+        controller.acquire("a", new_file=False)
+    controller.acquire("b", new_file=False)
+    with pytest.raises(AdmissionDenied):
+        controller.acquire("c", new_file=False)
+
+    first.release()
+    first.release() # Releasing twice is harmless
+    controller.acquire("c", new_file=False)
+    assert controller.stats()["active"] == 3
+    assert controller.stats()["rejected_busy"] == 2
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "BusyGuest")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def test_upload_returns_429_with_retry_after(client):
+    import app.main as main
+    with patch.object(main, "upload_admission", make_controller(guest_limit=1)):
+        first = client.post("/upload", files={"file": ("a.mp4", b"first file", "video/mp4")})
+        assert first.status_code == 200
+
+        second = client.post("/upload", files={"file": ("b.mp4", b"second file", "video/mp4")})
+        assert second.status_code == 429
+        assert int(second.headers["Retry-After"]) >= 1
+        # Slots were released once each request finished
+        assert main.upload_admission.stats()["active"] == 0
+
+def test_refused_upload_body_is_not_read(client):
+    import app.main as main
+    received, sent = [], []
+
+    async def receive():
+        received.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    cookie = f"guest_name=BusyGuest; guest_uuid={client.cookies.get('guest_uuid')}"
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/upload", "raw_path": b"/upload",
+        "root_path": "", "query_string": b"",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"multipart/form-data; boundary=x"),
+            (b"content-length", b"104857600"),
+            (b"cookie", cookie.encode()),
+        ],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    with patch.object(main, "upload_admission", make_controller(max_concurrent=1)):
+        busy = main.upload_admission.acquire("someone-else", new_file=False)
+        client.portal.call(main.app, scope, receive, send)
+        busy.release()
+
+    assert sent[0]["status"] == 429
+    assert received == []
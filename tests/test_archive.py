@@ -0,0 +1,216 @@
+import os
+import uuid
+import zipfile
+import pytest
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "ArchiveGuest")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+@pytest.fixture
+def daemon(monkeypatch):
+    from app.main import settings
+    from app.database import engine
+    from daemon import archive_daemon
+    # The app's directories and database (other tests reload app.config)
+    monkeypatch.setattr(archive_daemon, "settings", settings)
+    monkeypatch.setattr(archive_daemon, "database_path", lambda: engine.url.database)
+    return archive_daemon
+
+def upload(client):
+    client.cookies.set("guest_uuid", str(uuid.uuid4()))
+    response = client.post("/upload", files={"file": ("vow.mp4", uuid.uuid4().bytes, "video/mp4")})
+    return response.json()["id"]
+
+def manifest(daemon):
+    with daemon.open_db() as conn:
+        return dict(conn.execute("SELECT media_id, batch FROM archive_manifest").fetchall())
+
+def test_each_upload_is_archived_once(client, daemon):
+    from app.main import settings
+
+    first = upload(client)
+    daemon.archive_media()
+    batch = manifest(daemon)[first]
+    with zipfile.ZipFile(os.path.join(settings.ARCHIVE_DIR, batch)) as zf:
+        names = zf.namelist()
+    assert any(name.endswith(".mp4") for name in names)
+
+    # Moderation bumps change_seq, but the item is in the manifest already
+    client.cookies.set("admin_token", "magic")
+    client.post(f"/admin/media/{first}/action", data={"action": "star"})
+    second = upload(client)
+    daemon.archive_media()
+    archived = manifest(daemon)
+    assert archived[first] == batch
+    assert archived[second] != batch
+    with zipfile.ZipFile(os.path.join(settings.ARCHIVE_DIR, archived[second])) as zf:
+        assert len(zf.namelist()) == 1
+
+def test_mismatched_file_is_flagged_and_archived_once(client, daemon, monkeypatch):
+    from app.main import settings
+    alerts = []
+    monkeypatch.setattr(daemon, "send_alert", alerts.append)
+
+    media_id = upload(client)
+    with daemon.open_db() as conn:
+        filename = conn.execute("SELECT filename FROM media WHERE id = ?", (media_id,)).fetchone()[0]
+    with open(os.path.join(settings.UPLOAD_DIR, filename), "ab") as f:
+        f.write(b"bit rot")
+
+    daemon.archive_media()
+    batch = manifest(daemon)[media_id]
+    with daemon.open_db() as conn:
+        assert conn.execute("SELECT hash_mismatch FROM archive_manifest WHERE media_id = ?", (media_id,)).fetchone() == (1,)
+    assert len(alerts) == 1 and str(media_id) in alerts[0]
+
+    # A later change to the row does not archive it again
+    client.cookies.set("admin_token", "magic")
+    client.post(f"/admin/media/{media_id}/action", data={"action": "star"})
+    daemon.archive_media()
+    assert manifest(daemon)[media_id] == batch
+    assert len(alerts) == 1
+
+def test_batches_are_built_in_parallel_and_stored(client, daemon, monkeypatch):
+    from app.main import settings
+    monkeypatch.setattr(settings, "ARCHIVE_BATCH_MB", 0) # one file per batch
+    monkeypatch.setattr(settings, "ARCHIVE_WORKERS", 2)
+
+    ids = [upload(client) for _ in range(3)]
+    daemon.archive_media()
+    archived = manifest(daemon)
+    assert len({archived[media_id] for media_id in ids}) == 3
+    for media_id in ids:
+        with zipfile.ZipFile(os.path.join(settings.ARCHIVE_DIR, archived[media_id])) as zf:
+            assert [info.compress_type for info in zf.infolist()] == [zipfile.ZIP_STORED]
+            assert zf.testzip() is None
+
+def test_bad_write_in_batch_is_caught(client, daemon, monkeypatch, tmp_path):
+    import struct
+    from app.main import settings
+    media_id = upload(client)
+    with daemon.open_db() as conn:
+        filename = conn.execute("SELECT filename FROM media WHERE id = ?", (media_id,)).fetchone()[0]
+
+    def corrupt(path):
+        # Flip the first stored byte, as a bad write to disk would
+        with open(path, "r+b") as f:
+            name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(30 + name_len + extra_len)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+    zip_path = str(tmp_path / "batch.zip")
+    assert daemon.build_batch(zip_path, settings.UPLOAD_DIR, [(media_id, filename, "video/mp4", None)])
+    monkeypatch.setattr(daemon, "fsync_path", corrupt)
+    with pytest.raises(Exception, match="does not read back"):
+        daemon.build_batch(zip_path, settings.UPLOAD_DIR, [(media_id, filename, "video/mp4", None)])
+
+def test_snapshot_mode_links_originals(client, daemon, monkeypatch):
+    import json
+    from app.main import settings
+    monkeypatch.setattr(settings, "ARCHIVE_MODE", "snapshot")
+
+    media_id = upload(client)
+    daemon.archive_media()
+    snapshot = os.path.join(settings.ARCHIVE_DIR, manifest(daemon)[media_id])
+    with open(os.path.join(snapshot, "index.json")) as f:
+        entry = next(e for e in json.load(f)["files"] if e["media_id"] == media_id)
+
+    original = os.stat(os.path.join(settings.UPLOAD_DIR, entry["path"]))
+    linked = os.stat(os.path.join(snapshot, entry["object"]))
+    assert entry["object"].startswith(entry["sha256"][:2] + "/" + entry["sha256"])
+    assert (linked.st_ino, linked.st_size) == (original.st_ino, entry["size"])
+
+def test_database_backup_is_a_consistent_gzipped_copy(client, daemon, monkeypatch, tmp_path):
+    import gzip
+    import shutil
+    import sqlite3
+    from app.main import settings
+    monkeypatch.setattr(settings, "DB_BACKUP_KEEP", 2)
+    monkeypatch.setattr(settings, "DB_BACKUP_PAGES_PER_STEP", 1)
+    monkeypatch.setattr(settings, "DB_BACKUP_STEP_SLEEP_MS", 0)
+
+    media_id = upload(client)
+    for name in ["db_backup_20200101_000000.sqlite", "db_backup_20200101_000100.sqlite.gz"]:
+        open(os.path.join(settings.ARCHIVE_DIR, name), "wb").close()
+    daemon.backup_database()
+
+    backups = sorted(f for f in os.listdir(settings.ARCHIVE_DIR) if "db_backup_" in f)
+    assert len(backups) == 2 and backups[0] == "db_backup_20200101_000100.sqlite.gz"
+    restored = tmp_path / "restored.sqlite"
+    with gzip.open(os.path.join(settings.ARCHIVE_DIR, backups[1])) as src, open(restored, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    conn = sqlite3.connect(restored)
+    assert conn.execute("SELECT COUNT(*) FROM media WHERE id = ?", (media_id,)).fetchone() == (1,)
+    conn.close()
+
+def test_scheduler_debounces_events_and_chains_stages(daemon, tmp_path):
+    import asyncio
+    from app.notify import DaemonNotifier
+    runs = {"archive": 0, "rclone": 0}
+
+    def stage(name):
+        def run():
+            runs[name] += 1
+            return runs[name] > 1 # the startup run finds nothing to do
+        return run
+
+    scheduler = daemon.Scheduler([
+        daemon.Stage("archive", stage("archive"), interval=60, debounce=0.05, max_delay=1,
+                     events={"media.new"}, then=("rclone",)),
+        daemon.Stage("rclone", stage("rclone"), interval=60),
+    ])
+    socket_path = str(tmp_path / "daemon.sock")
+
+    async def scenario():
+        task = asyncio.create_task(scheduler.serve(socket_path))
+        await asyncio.sleep(0.2)
+        notifier = DaemonNotifier(socket_path)
+        for _ in range(5):
+            notifier.notify("media.new", {})
+        notifier.notify("banner", {})
+        await asyncio.sleep(0.5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    # Startup run, then one run for the burst, which triggers one upload
+    assert runs == {"archive": 2, "rclone": 2}
+    assert scheduler.stages["archive"].stats()["triggers"] == 5
+    assert daemon.load_state()["stages"]["rclone"]["runs"] == 2
+    assert not os.path.exists(socket_path)
+
+def test_notify_socket_survives_purge(client):
+    from app.main import settings
+    from app.notify import notify_socket_path
+    socket_dir = os.path.abspath(os.path.dirname(notify_socket_path()))
+    for cleared in (settings.ARCHIVE_DIR, settings.UPLOAD_DIR, settings.THUMBNAIL_DIR):
+        assert os.path.commonpath([socket_dir, os.path.abspath(cleared)]) != os.path.abspath(cleared)
+
+def test_failing_stage_is_recorded(daemon, monkeypatch):
+    import asyncio
+    import subprocess
+
+    # Stage functions report failure by raising
+    monkeypatch.setattr(daemon, "check_rclone_config", lambda: True)
+    monkeypatch.setattr(daemon.subprocess, "run",
+                        lambda *a, **kw: subprocess.CompletedProcess(a, 1, "", "remote unreachable"))
+    downstream = []
+    scheduler = daemon.Scheduler([
+        daemon.Stage("rclone", daemon.rclone_copy, interval=60, then=("prune",)),
+        daemon.Stage("prune", lambda: downstream.append(1), interval=60),
+    ])
+
+    asyncio.run(scheduler.run_stage(scheduler.stages["rclone"]))
+    stats = scheduler.stages["rclone"].stats()
+    assert (stats["runs"], stats["failures"]) == (1, 1)
+    assert "remote unreachable" in stats["last_error"]
+    assert scheduler.stages["prune"].triggers == 0
+    assert daemon.load_state()["stages"]["rclone"]["failures"] == 1
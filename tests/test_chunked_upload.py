@@ -0,0 +1,113 @@
+import os
+import uuid
+import pytest
+from unittest.mock import patch
+
+CHUNK = 1024 * 1024
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "ChunkUser")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def init_upload(client, content, filename="video.mp4", content_type="video/mp4"):
+    from app.config import settings
+    with patch.object(settings, "UPLOAD_CHUNK_SIZE_MB", 1):
+        response = client.post("/upload/init", data={
+            "filename": filename,
+            "size": str(len(content)),
+            "content_type": content_type,
+            "caption": "Chunked Caption",
+        })
+    assert response.status_code == 200
+    return response.json()
+
+def test_chunked_upload_out_of_order_and_resume(client):
+    content = os.urandom(int(2.5 * CHUNK))
+    session = init_upload(client, content)
+    assert session["total_chunks"] == 3
+    upload_id = session["upload_id"]
+
+    # Last chunk first, then the first one
+    assert client.put(f"/upload/{upload_id}/chunk/2", content=content[2 * CHUNK:]).status_code == 200
+    assert client.put(f"/upload/{upload_id}/chunk/0", content=content[:CHUNK]).status_code == 200
+
+    # Finalizing with a gap is refused
+    response = client.post(f"/upload/{upload_id}/finalize")
+    assert response.status_code == 409
+    assert response.json()["detail"]["missing"] == [1]
+
+    # A reconnecting client asks what the server already has
+    status = client.get(f"/upload/{upload_id}").json()
+    assert status["received"] == [0, 2]
+    assert status["offset"] == CHUNK
+
+    assert client.put(f"/upload/{upload_id}/chunk/1", content=content[CHUNK:2 * CHUNK]).status_code == 200
+    response = client.post(f"/upload/{upload_id}/finalize")
+    assert response.status_code == 200
+    media_id = response.json()["id"]
+
+    # The hash computed chunk by chunk matches a plain upload of the same bytes
+    response = client.post("/upload", files={"file": ("again.mp4", content, "video/mp4")})
+    assert response.json()["message"] == "Duplicate detected"
+
+    mine = client.get("/my-uploads").json()
+    item = next(m for m in mine if m["id"] == media_id)
+    assert item["file_size"] == len(content)
+    assert item["caption"] == "Chunked Caption"
+
+def test_chunk_with_wrong_length_is_rejected(client):
+    content = os.urandom(CHUNK + 10)
+    upload_id = init_upload(client, content)["upload_id"]
+    response = client.put(f"/upload/{upload_id}/chunk/0", content=content[:100])
+    assert response.status_code == 400
+
+def test_other_guest_cannot_touch_upload(client):
+    content = os.urandom(100)
+    upload_id = init_upload(client, content)["upload_id"]
+
+    original = client.cookies.get("guest_uuid")
+    client.cookies.set("guest_uuid", "someone-else")
+    try:
+        assert client.get(f"/upload/{upload_id}").status_code == 403
+    finally:
+        client.cookies.set("guest_uuid", original)
+
+def test_unknown_upload_id(client):
+    assert client.get(f"/upload/{'0' * 32}").status_code == 404
+    assert client.get("/upload/../../etc").status_code == 404
+
+def test_concurrent_finalize_returns_one_result(client):
+    from concurrent.futures import ThreadPoolExecutor
+    content = os.urandom(CHUNK + 10)
+    upload_id = init_upload(client, content)["upload_id"]
+    client.put(f"/upload/{upload_id}/chunk/0", content=content[:CHUNK])
+    client.put(f"/upload/{upload_id}/chunk/1", content=content[CHUNK:])
+
+    with ThreadPoolExecutor(2) as pool:
+        responses = list(pool.map(lambda _: client.post(f"/upload/{upload_id}/finalize"), range(2)))
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json() == responses[1].json()
+    assert "id" in responses[0].json()
+
+def test_open_uploads_are_capped(client):
+    from app.config import settings
+    original = client.cookies.get("guest_uuid")
+    client.cookies.set("guest_uuid", str(uuid.uuid4()))
+    try:
+        with patch.object(settings, "UPLOAD_MAX_SESSIONS_PER_GUEST", 2):
+            init_upload(client, b"a" * 10)
+            init_upload(client, b"b" * 10)
+            response = client.post("/upload/init", data={"filename": "c.mp4", "size": "10", "content_type": "video/mp4"})
+            assert response.status_code == 429
+
+        client.cookies.set("guest_uuid", str(uuid.uuid4()))
+        with patch.object(settings, "UPLOAD_STAGING_MAX_GB", 0.0):
+            response = client.post("/upload/init", data={"filename": "d.mp4", "size": "10", "content_type": "video/mp4"})
+            assert response.status_code == 503
+    finally:
+        client.cookies.set("guest_uuid", original)
@@ -0,0 +1,55 @@
+import uuid
+import asyncio
+import pytest
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "CountGuest")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def seeded_counts():
+    """What a fresh GROUP BY seed would report, to compare with the live counters."""
+    from app.counters import MediaCounters
+    from app.database import SessionLocal
+
+    async def seed():
+        counters = MediaCounters()
+        async with SessionLocal() as db:
+            await counters.seed(db)
+        return counters.public(), counters.totals()
+    return asyncio.run(seed())
+
+def test_counters_follow_upload_hide_and_delete(client):
+    import app.main as main
+    before = client.get("/public/stats").json()
+
+    media_id = client.post("/upload", files={"file": ("count.mp4", uuid.uuid4().bytes, "video/mp4")}).json()["id"]
+    after_upload = client.get("/public/stats").json()
+    assert after_upload["videos"] == before["videos"] + 1
+    assert after_upload["total_media"] == before["total_media"] + 1
+
+    client.cookies.set("admin_token", "magic")
+    client.post(f"/admin/media/{media_id}/action", data={"action": "hide"})
+    client.post(f"/admin/media/{media_id}/action", data={"action": "hide"}) # Hiding twice counts once
+    assert client.get("/public/stats").json() == before
+    assert (main.media_counters.public(), main.media_counters.totals()) == seeded_counts()
+
+    client.post(f"/admin/media/{media_id}/action", data={"action": "delete"})
+    assert client.get("/public/stats").json() == before
+    assert (main.media_counters.public(), main.media_counters.totals()) == seeded_counts()
+
+def test_public_stats_etag(client):
+    response = client.get("/public/stats")
+    etag = response.headers["etag"]
+
+    cached = client.get("/public/stats", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    client.post("/upload", files={"file": ("etag.mp4", uuid.uuid4().bytes, "video/mp4")})
+    changed = client.get("/public/stats", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+def test_connections_get_the_pragma_profile():
+    from app.config import settings
+    from app.database import engine, read_engine
+
+    async def pragmas(eng):
+        async with eng.connect() as conn:
+            return {
+                name: (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+                for name in ("busy_timeout", "cache_size", "temp_store", "synchronous", "query_only")
+            }
+
+    write, read = asyncio.run(pragmas(engine)), asyncio.run(pragmas(read_engine))
+    assert write["busy_timeout"] == read["busy_timeout"] == settings.SQLITE_BUSY_TIMEOUT_MS
+    assert write["cache_size"] == -settings.SQLITE_CACHE_SIZE_MB * 1024
+    assert write["temp_store"] == 2 # memory
+    assert write["synchronous"] == 1 # NORMAL
+    assert (write["query_only"], read["query_only"]) == (0, 1)
+
+def test_read_pool_refuses_writes():
+    from app.database import read_engine, init_db
+
+    async def write():
+        await init_db()
+        async with read_engine.connect() as conn:
+            await conn.execute(text("DELETE FROM app_config"))
+
+    with pytest.raises(OperationalError):
+        asyncio.run(write())
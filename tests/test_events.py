@@ -0,0 +1,74 @@
+import uuid
+import pytest
+
+from app.events import EventHub, SUBSCRIBER_QUEUE_SIZE, format_sse
+
+def drain(sub):
+    items = []
+    while not sub.queue.empty():
+        items.append(sub.queue.get_nowait())
+    return items
+
+def test_publish_reaches_subscribers():
+    hub = EventHub()
+    first, second = hub.subscribe(), hub.subscribe()
+    hub.publish("banner", {"banner_message_en": "Hi"})
+    assert [e[1] for e in drain(first)] == ["banner"]
+    assert [e[1] for e in drain(second)] == ["banner"]
+
+    hub.unsubscribe(second)
+    hub.publish("media.delete", {"id": 1})
+    assert len(drain(first)) == 1
+    assert drain(second) == []
+
+def test_reconnect_replays_missed_events():
+    hub = EventHub()
+    hub.publish("media.new", {"id": 1})
+    seen = hub.last_id
+    hub.publish("media.new", {"id": 2})
+    hub.publish("media.delete", {"id": 1})
+
+    sub = hub.subscribe(last_event_id=seen)
+    assert not sub.overflowed
+    assert [(e[1], e[2]["id"]) for e in drain(sub)] == [("media.new", 2), ("media.delete", 1)]
+
+    # An id this process never issued (e.g. from before a restart) forces a resync
+    assert hub.subscribe(last_event_id=5).overflowed
+
+def test_slow_subscriber_is_told_to_resync():
+    hub = EventHub()
+    sub = hub.subscribe()
+    for i in range(SUBSCRIBER_QUEUE_SIZE + 1):
+        hub.publish("media.new", {"id": i})
+    assert sub.overflowed
+
+def test_format_sse():
+    assert format_sse(7, "media.delete", {"id": 3}) == 'id: 7\nevent: media.delete\ndata: {"id": 3}\n\n'
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "LiveGuest")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def test_uploads_and_moderation_are_published(client):
+    import app.main as main
+    sub = main.event_hub.subscribe()
+    try:
+        response = client.post("/upload", files={"file": ("live.mp4", uuid.uuid4().bytes, "video/mp4")})
+        media_id = response.json()["id"]
+
+        client.cookies.set("admin_token", "magic")
+        assert client.post(f"/admin/media/{media_id}/action", data={"action": "hide"}).status_code == 200
+        assert client.post("/admin/banner", data={"message_en": "Cake time", "message_es": ""}).status_code == 200
+
+        events = [(e[1], e[2]) for e in drain(sub)]
+        assert ("media.new", media_id) in [(name, data.get("id")) for name, data in events]
+        update = next(data for name, data in events if name == "media.update" and data["id"] == media_id)
+        assert update["is_hidden"] is True
+        assert ("banner", {"banner_message_en": "Cake time", "banner_message_es": None}) in events
+    finally:
+        main.event_hub.unsubscribe(sub)
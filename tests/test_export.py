@@ -0,0 +1,55 @@
+import io
+import uuid
+import zipfile
+import pytest
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "ExportGuest")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def test_export_streams_selected_originals(client):
+    payloads = [uuid.uuid4().bytes * 1000 for _ in range(3)]
+    for data in payloads:
+        assert client.post("/upload", files={"file": ("clip.mp4", data, "video/mp4")}).status_code == 200
+
+    assert client.get("/admin/export.zip", params={"uploader": "ExportGuest"}).status_code == 401
+
+    client.cookies.set("admin_token", "magic")
+    response = client.get("/admin/export.zip", params={"uploader": "exportguest", "type": "video", "start": "2000-01-01"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+        infos = zf.infolist()
+        assert [info.filename.split("/")[-1] for info in infos] == ["clip.mp4"] * 3
+        assert len({info.filename for info in infos}) == 3
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in infos)
+        assert [zf.read(info) for info in infos] == payloads
+        assert zf.testzip() is None
+
+    assert client.get("/admin/export.zip", params={"start": "yesterday"}).status_code == 400
+
+def test_export_range_with_utc_offset(client):
+    from datetime import datetime, timedelta, timezone
+    client.cookies.set("guest_uuid", str(uuid.uuid4()))
+    assert client.post("/upload", files={"file": ("offset.mp4", uuid.uuid4().bytes, "video/mp4")}).status_code == 200
+
+    # A minute ago, written in UTC+05:00; read as UTC it would be hours ahead
+    start = (datetime.now(timezone.utc) - timedelta(minutes=1)).astimezone(timezone(timedelta(hours=5)))
+    client.cookies.set("admin_token", "magic")
+    response = client.get("/admin/export.zip", params={"uploader": "exportguest", "start": start.isoformat()})
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+        assert "offset.mp4" in [info.filename.split("/")[-1] for info in zf.infolist()]
+
+def test_arcnames_are_unique_and_stay_inside_their_folder():
+    from app.export import unique_arcname
+    taken = set()
+    assert unique_arcname("a", "clip.mp4", "x.mp4", taken) == "a/clip.mp4"
+    assert unique_arcname("a", "../../clip.mp4", "x.mp4", taken) == "a/clip (2).mp4"
+    assert unique_arcname("b", "clip.mp4", "x.mp4", taken) == "b/clip.mp4"
+    assert unique_arcname("a", None, "x.mp4", taken) == "a/x.mp4"
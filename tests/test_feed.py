@@ -0,0 +1,146 @@
+import uuid
+import pytest
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "FeedGuest")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def test_cursor_pages_do_not_repeat_same_second_uploads(client):
+    # Uploads in the same second share created_at; the id breaks the tie
+    uploaded = [
+        client.post("/upload", files={"file": (f"{i}.mp4", uuid.uuid4().bytes, "video/mp4")}).json()["id"]
+        for i in range(3)
+    ]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 1, "admin_mode": "true"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/slideshow/feed", params=params).json()
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert seen[:3] == sorted(uploaded, reverse=True)
+
+def test_feed_indexes_exist(client):
+    import asyncio
+    from sqlalchemy import text
+    from app.database import engine, FEED_INDEXES
+
+    async def index_names():
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'media'"))
+            return {row[0] for row in result}
+
+    expected = {statement.split()[5] for statement in FEED_INDEXES}
+    assert expected <= asyncio.run(index_names())
+
+def _search(client, q, order="relevance"):
+    page = client.get("/slideshow/feed", params={"limit": 50, "admin_mode": "true", "q": q, "order": order}).json()
+    return [item["id"] for item in page["items"]]
+
+def test_search_matches_prefixes_and_ranks_captions_first(client):
+    from app import database
+    assert database.fts_enabled
+
+    def upload(caption):
+        # A guest each, to stay under the per-guest upload limit
+        client.cookies.set("guest_uuid", str(uuid.uuid4()))
+        files = {"file": ("IMG_4711.mp4", uuid.uuid4().bytes, "video/mp4")}
+        return client.post("/upload", files=files, data={"caption": caption}).json()["id"]
+
+    cake = upload("Cutting the wedding cake")
+    dance = upload("First dance")
+    both = upload("Cake, cake and more cake")
+
+    assert set(_search(client, "wedd")) == {cake}
+    assert _search(client, "cake")[0] == both
+    assert set(_search(client, "CAKE cut")) == {cake}
+    assert dance in _search(client, "img_47", order="newest")
+    # Punctuation alone falls back to LIKE rather than an FTS syntax error
+    assert _search(client, '"*') == []
+
+def test_search_index_follows_deletes(client):
+    client.cookies.set("guest_uuid", str(uuid.uuid4()))
+    media_id = client.post(
+        "/upload", files={"file": ("x.mp4", uuid.uuid4().bytes, "video/mp4")}, data={"caption": "zanzibar"}
+    ).json()["id"]
+    assert _search(client, "zanzi") == [media_id]
+
+    client.delete(f"/media/{media_id}")
+    assert _search(client, "zanzi") == []
+
+def test_lean_feed_items_match_live_event_items(client):
+    from app.main import event_hub
+
+    client.cookies.set("guest_uuid", str(uuid.uuid4()))
+    media_id = client.post(
+        "/upload", files={"file": ("x.mp4", uuid.uuid4().bytes, "video/mp4")}, data={"caption": "same shape"}
+    ).json()["id"]
+    published = next(data for _, event, data in reversed(event_hub._history)
+                     if event == "media.new" and data["id"] == media_id)
+
+    page = client.get("/slideshow/feed", params={"limit": 1, "admin_mode": "true"})
+    assert page.headers["content-type"] == "application/json"
+    assert page.json()["items"][0] == published
+
+    mine = client.get("/my-uploads").json()
+    assert mine[0]["created_at"] == published["created_at"]
+
+def test_first_page_is_cached_until_an_upload(client):
+    params = {"limit": 5, "admin_mode": "true"}
+    first = client.get("/slideshow/feed", params=params)
+    etag = first.headers["etag"]
+    assert client.get("/slideshow/feed", params=params).json() == first.json()
+
+    not_modified = client.get("/slideshow/feed", params=params, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    new_id = client.post("/upload", files={"file": ("cache.mp4", uuid.uuid4().bytes, "video/mp4")}).json()["id"]
+    fresh = client.get("/slideshow/feed", params=params, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert fresh.json()["items"][0]["id"] == new_id
+
+def test_random_first_page_is_not_cached(client):
+    from app.main import response_cache
+    params = {"limit": 5, "order": "random", "type": "video"}
+    first = client.get("/slideshow/feed", params=params)
+    assert "etag" not in first.headers
+    assert "since" in first.json()
+    assert not any(key[3] == "random" for key in response_cache._entries if key[0] == "feed")
+
+def test_since_returns_only_changes_and_tombstones(client):
+    since = client.get("/slideshow/feed", params={"limit": 1}).json()["since"]
+
+    client.cookies.set("guest_uuid", str(uuid.uuid4()))
+    hidden, deleted, kept = [
+        client.post("/upload", files={"file": (f"delta{i}.mp4", uuid.uuid4().bytes, "video/mp4")}).json()["id"]
+        for i in range(3)
+    ]
+    client.cookies.set("admin_token", "magic")
+    assert client.post(f"/admin/media/{hidden}/action", data={"action": "hide"}).status_code == 200
+    client.cookies.delete("admin_token")
+    assert client.delete(f"/media/{deleted}").status_code == 200
+
+    public = client.get("/slideshow/feed", params={"since": since}).json()
+    assert [item["id"] for item in public["items"]] == [kept]
+    assert set(public["removed"]) == {hidden, deleted}
+    assert public["since"] > since
+
+    admin = client.get("/slideshow/feed", params={"since": since, "admin_mode": "true"}).json()
+    assert {item["id"]: item["is_hidden"] for item in admin["items"]} == {kept: False, hidden: True}
+    assert admin["removed"] == [deleted]
+
+    assert client.get("/slideshow/feed", params={"since": public["since"]}).json() == {
+        "items": [], "removed": [], "since": public["since"]
+    }
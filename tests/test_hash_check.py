@@ -0,0 +1,66 @@
+import hashlib
+import uuid
+import pytest
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "HashUser")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def test_hash_check_before_upload(client):
+    content = f"hash check {uuid.uuid4()}".encode()
+    digest = hashlib.sha256(content).hexdigest()
+
+    assert client.head(f"/media/hash/{digest}").status_code == 404
+
+    response = client.post("/upload", files={"file": ("dup.jpg", content, "image/jpeg")})
+    assert response.status_code == 200
+
+    assert client.head(f"/media/hash/{digest}").status_code == 200
+    assert client.get(f"/media/hash/{digest.upper()}").json() == {"exists": True}
+
+def test_invalid_hash_rejected(client):
+    assert client.get("/media/hash/not-a-hash").status_code == 400
+
+def test_chunked_init_short_circuits_duplicates(client):
+    content = f"chunked dup {uuid.uuid4()}".encode()
+    client.post("/upload", files={"file": ("dup.jpg", content, "image/jpeg")})
+
+    response = client.post("/upload/init", data={
+        "filename": "dup.jpg",
+        "size": str(len(content)),
+        "content_type": "image/jpeg",
+        "sha256": hashlib.sha256(content).hexdigest(),
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["message"] == "Duplicate detected"
+    assert "upload_id" not in data
+
+def test_hash_check_requires_guest_and_is_rate_limited(client):
+    import app.main as main
+    from unittest.mock import patch
+    from app.admission import AdmissionController
+    digest = hashlib.sha256(b"probe").hexdigest()
+
+    original = client.cookies.get("guest_uuid")
+    client.cookies.delete("guest_uuid")
+    try:
+        assert client.head(f"/media/hash/{digest}").status_code == 401
+    finally:
+        client.cookies.set("guest_uuid", original)
+
+    controller = AdmissionController(guest_limit=5, guest_window_sec=600, global_per_min=100,
+                                     max_concurrent=10, max_concurrent_per_guest=3, lookup_per_min=2)
+    # Clock frozen, so no token comes back however slowly the requests run
+    with patch.object(main, "upload_admission", controller), \
+            patch("app.admission.time.monotonic", return_value=1000.0):
+        for _ in range(2):
+            assert client.head(f"/media/hash/{digest}").status_code == 404
+        response = client.head(f"/media/hash/{digest}")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
@@ -52,3 +52,5 @@ def test_admin_stats_endpoint(client):
     assert "ram_percent" in data
     assert "media_total" in data
     # Validate that it didn't crash on psutil
+    assert "thumbnail_queue" in data
+    assert "depth" in data["thumbnail_queue"]
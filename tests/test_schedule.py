@@ -0,0 +1,93 @@
+import os
+import time
+import uuid
+import random
+import pytest
+import pytz
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.schedule import CompiledSchedule, ScheduleStore
+
+TZ = pytz.timezone("America/Los_Angeles")
+
+def linear_scan(blocks, now):
+    """The original check_schedule_mode loop, for comparison."""
+    for block in sorted(blocks, key=lambda b: b["start"]):
+        start = datetime.fromisoformat(block["start"]).astimezone(TZ)
+        end = datetime.fromisoformat(block["end"]).astimezone(TZ)
+        if start <= now < end:
+            return {"mode": block["mode"], "message": block["message"], "remaining_seconds": (end - now).total_seconds()}
+        elif now < start:
+            return {"mode": "standard", "message": "", "remaining_seconds": (start - now).total_seconds()}
+    return {"mode": "standard", "message": "", "remaining_seconds": None}
+
+def test_compiled_matches_linear_scan():
+    rng = random.Random(7)
+    base = TZ.localize(datetime(2025, 6, 1, 16, 0))
+    blocks = []
+    for i in range(40):
+        start = base + timedelta(minutes=rng.randint(0, 600))
+        end = start + timedelta(minutes=rng.randint(1, 120))
+        blocks.append({"start": start.isoformat(), "end": end.isoformat(),
+                       "mode": rng.choice(["blackout", "unlimited"]), "message": f"block {i}"})
+    compiled = CompiledSchedule(blocks, TZ)
+
+    for minute in range(-30, 800, 7):
+        now = base + timedelta(minutes=minute, seconds=13)
+        assert compiled.mode_at(now) == linear_scan(blocks, now)
+
+def test_malformed_blocks_are_skipped():
+    now = TZ.localize(datetime(2025, 6, 1, 18, 0))
+    blocks = [
+        {"start": "not a date", "end": "2025-06-01T19:00:00-07:00", "mode": "blackout", "message": ""},
+        {"start": "2025-06-01T17:00:00-07:00", "end": "2025-06-01T19:00:00-07:00", "mode": "unlimited", "message": "Party"},
+    ]
+    assert CompiledSchedule(blocks, TZ).mode_at(now)["mode"] == "unlimited"
+
+def test_store_picks_up_outside_edits(tmp_path):
+    store = ScheduleStore(str(tmp_path / "schedule.json"), "America/Los_Angeles")
+    now = TZ.localize(datetime(2025, 6, 1, 18, 0))
+    assert store.current(now)["mode"] == "standard"
+
+    store.save([{"start": "2025-06-01T17:00:00-07:00", "end": "2025-06-01T19:00:00-07:00", "mode": "blackout", "message": ""}])
+    assert store.current(now)["mode"] == "blackout"
+
+    # A hand edit is noticed once the reload interval has passed
+    with open(store.path, "w") as f:
+        f.write("[]")
+    os.utime(store.path, (time.time() + 10, time.time() + 10))
+    with patch("app.schedule.time.monotonic", return_value=time.monotonic() + 60):
+        assert store.current(now)["mode"] == "standard"
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "ScheduleGuest")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def test_admin_schedule_applies_immediately(client, tmp_path):
+    import app.main as main
+    store = ScheduleStore(str(tmp_path / "schedule.json"), main.settings.EVENT_TIMEZONE)
+    with patch.object(main, "schedule_store", store):
+        assert client.get("/config").json()["mode"] == "standard"
+
+        now = datetime.now(pytz.timezone(main.settings.EVENT_TIMEZONE)).replace(tzinfo=None)
+        client.cookies.set("admin_token", "magic")
+        response = client.post("/admin/schedule", params={
+            "start": (now - timedelta(minutes=5)).isoformat(timespec="minutes"),
+            "end": (now + timedelta(minutes=30)).isoformat(timespec="minutes"),
+            "mode": "blackout",
+            "message": "Speeches",
+        })
+        assert response.status_code == 200
+
+        config = client.get("/config").json()
+        assert config["mode"] == "blackout"
+        assert config["schedule_message"] == "Speeches"
+
+        assert client.delete("/admin/schedule/0").status_code == 200
+        assert client.get("/config").json()["mode"] == "standard"
@@ -0,0 +1,101 @@
+import uuid
+import random
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app.shuffle import ShuffleIndex
+
+OLD = datetime.now(timezone.utc) - timedelta(days=1)
+
+def _index(n, starred=()):
+    index = ShuffleIndex(random.Random(7))
+    for i in range(1, n + 1):
+        index._items[i] = (i in starred, OLD.timestamp())
+    return index
+
+def _play_through(index, limit):
+    seen, cursor = [], None
+    while True:
+        ids, cursor = index.page(cursor, limit)
+        seen += ids
+        if not cursor:
+            return seen
+
+def _play_through_from(index, cursor, limit):
+    seen = []
+    while cursor:
+        ids, cursor = index.page(cursor, limit)
+        seen += ids
+    return seen
+
+def test_pages_cover_everything_once():
+    index = _index(100)
+    seen = _play_through(index, 7)
+    assert sorted(seen) == list(range(1, 101))
+
+def test_starred_items_come_early():
+    positions = []
+    for seed in range(50):
+        index = _index(100, starred={1})
+        index._rng = random.Random(seed)
+        positions.append(_play_through(index, 20).index(1))
+    assert sum(positions) / len(positions) < 20
+
+def test_new_uploads_come_next_and_removed_are_skipped():
+    index = _index(50)
+    ids, cursor = index.page(None, 10)
+    index.add(51, False, datetime.now(timezone.utc))
+    upcoming = index._sessions[cursor.split(":")[0]].order[10]
+    index.remove(upcoming)
+
+    ids, cursor = index.page(cursor, 10)
+    assert ids[0] == 51
+    assert upcoming not in ids
+
+def test_unhidden_items_are_not_dealt_twice():
+    index = _index(50)
+    ids, cursor = index.page(None, 10)
+    dealt = ids[0]
+    upcoming = index._sessions[cursor.split(":")[0]].order[30]
+
+    # Hide and unhide one item already shown and one still to come
+    for media_id in (dealt, upcoming):
+        index.remove(media_id)
+        index.add(media_id, False, OLD)
+
+    seen = ids + _play_through_from(index, cursor, 10)
+    assert sorted(seen) == list(range(1, 51))
+
+def test_unknown_cursor_starts_a_new_shuffle():
+    index = _index(10)
+    ids, cursor = index.page("gone:5", 20)
+    assert sorted(ids) == list(range(1, 11))
+    assert cursor is None
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "ShuffleGuest")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def test_random_feed_pages_without_repeats(client):
+    for i in range(5):
+        client.post("/upload", files={"file": (f"{i}.mp4", uuid.uuid4().bytes, "video/mp4")})
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, "order": "random"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/slideshow/feed", params=params).json()
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    newest = client.get("/slideshow/feed", params={"limit": 1000}).json()["items"]
+    assert len(seen) == len(set(seen))
+    assert set(seen) == {item["id"] for item in newest}
@@ -0,0 +1,164 @@
+import os
+import io
+import time
+import uuid
+import pytest
+from PIL import Image
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "ThumbUser")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+def make_jpeg(width=1200, height=900):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), color=(uuid.uuid4().int % 255, 80, 120)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+def wait_for_thumbnail(client, media_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        item = next(m for m in client.get("/my-uploads").json() if m["id"] == media_id)
+        if item["thumbnail"]:
+            return item
+        time.sleep(0.2)
+    raise AssertionError("Thumbnail was not generated in time")
+
+def test_thumbnail_generated_in_background(client):
+    response = client.post("/upload", files={"file": ("photo.jpg", make_jpeg(), "image/jpeg")})
+    assert response.status_code == 200
+    media_id = response.json()["id"]
+
+    item = wait_for_thumbnail(client, media_id)
+    assert item["thumbnail"].startswith("/thumbnails/thumb_")
+    assert client.get(item["thumbnail"]).status_code == 200
+
+    client.cookies.set("admin_token", "magic")
+    stats = client.get("/admin/stats").json()["thumbnail_queue"]
+    assert stats["done"] >= 1
+    assert stats["latency"]["avg_ms"] is not None
+
+def test_responsive_derivatives(client):
+    response = client.post("/upload", files={"file": ("wide.jpg", make_jpeg(2400, 1600), "image/jpeg")})
+    media_id = response.json()["id"]
+
+    item = wait_for_thumbnail(client, media_id)
+    assert item["thumbnail"].endswith("_800.jpg")
+    webp = item["srcset"]["webp"].split(", ")
+    assert [entry.split(" ")[1] for entry in webp] == ["320w", "800w", "1920w"]
+    for entry in webp + item["srcset"]["jpeg"].split(", "):
+        assert client.get(entry.split(" ")[0]).status_code == 200
+
+def test_small_source_is_not_upscaled(client):
+    response = client.post("/upload", files={"file": ("small.jpg", make_jpeg(500, 400), "image/jpeg")})
+    media_id = response.json()["id"]
+
+    item = wait_for_thumbnail(client, media_id)
+    widths = [entry.split(" ")[1] for entry in item["srcset"]["jpeg"].split(", ")]
+    assert widths == ["320w", "500w"]
+
+def test_exif_orientation_applied(client):
+    img = Image.new("RGB", (1600, 1200), color=(30, 60, 90))
+    exif = img.getexif()
+    exif[0x0112] = 6  # rotated 90° clockwise
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", exif=exif)
+
+    response = client.post("/upload", files={"file": ("portrait.jpg", buf.getvalue(), "image/jpeg")})
+    item = wait_for_thumbnail(client, response.json()["id"])
+
+    thumb = Image.open(io.BytesIO(client.get(item["thumbnail"]).content))
+    assert thumb.width < thumb.height
+
+def test_stuck_ffmpeg_times_out(tmp_path, monkeypatch):
+    import subprocess
+    from app.thumbnails import render_thumbnail
+
+    fake = tmp_path / "ffmpeg"
+    fake.write_text("#!/bin/sh\nsleep 10\n")
+    fake.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    started = time.time()
+    with pytest.raises(subprocess.TimeoutExpired):
+        render_thumbnail(str(tmp_path / "clip.mp4"), "video/mp4", str(tmp_path), [320], True, 0, ffmpeg_timeout=0.5)
+    assert time.time() - started < 5
+
+def test_failed_job_backs_off(client):
+    import sqlite3
+    from datetime import datetime
+    from app.database import engine
+
+    response = client.post("/upload", files={"file": ("broken.jpg", f"not a jpeg {uuid.uuid4()}".encode(), "image/jpeg")})
+    media_id = response.json()["id"]
+
+    conn = sqlite3.connect(engine.url.database)
+    try:
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            status, attempts, not_before, error = conn.execute(
+                "SELECT status, attempts, not_before, error FROM thumbnail_jobs WHERE media_id = ?", (media_id,)
+            ).fetchone()
+            if error:
+                break
+            time.sleep(0.2)
+    finally:
+        conn.close()
+
+    # Waiting for its retry, not claimed again straight away
+    assert (status, attempts) == ("pending", 1)
+    assert datetime.fromisoformat(not_before) > datetime.utcnow()
+
+def test_pool_replaced_after_worker_dies(client, monkeypatch):
+    import signal
+    from app.main import thumbnail_queue
+    # A job caught in the broken pool counts as failed and is retried
+    monkeypatch.setattr("app.thumbnail_queue.settings.THUMBNAIL_RETRY_DELAY_SEC", 0)
+    client.cookies.set("guest_uuid", str(uuid.uuid4()))
+    client.cookies.set("admin_token", "magic")
+    failed = client.get("/admin/stats").json()["thumbnail_queue"]["failed"]
+
+    # Make sure a pool is running, then kill its workers behind its back
+    wait_for_thumbnail(client, client.post("/upload", files={"file": ("a.jpg", make_jpeg(), "image/jpeg")}).json()["id"])
+    pool = thumbnail_queue._pool
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+    time.sleep(0.5)
+
+    response = client.post("/upload", files={"file": ("b.jpg", make_jpeg(), "image/jpeg")})
+    item = wait_for_thumbnail(client, response.json()["id"])
+    assert item["thumbnail"]
+    assert thumbnail_queue._pool is not pool
+
+    assert client.get("/admin/stats").json()["thumbnail_queue"]["failed"] == failed
+
+def _kill_worker(*args):
+    os._exit(1)
+
+def test_job_that_kills_its_worker_ends_failed(client, monkeypatch):
+    import sqlite3
+    from app.database import engine
+    from app.thumbnail_queue import settings
+    monkeypatch.setattr("app.thumbnail_queue.settings.THUMBNAIL_RETRY_DELAY_SEC", 0)
+    monkeypatch.setattr("app.thumbnail_queue.render_thumbnail", _kill_worker)
+    client.cookies.set("guest_uuid", str(uuid.uuid4()))
+
+    media_id = client.post("/upload", files={"file": ("poison.jpg", make_jpeg(), "image/jpeg")}).json()["id"]
+
+    conn = sqlite3.connect(engine.url.database)
+    try:
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            status, attempts = conn.execute(
+                "SELECT status, attempts FROM thumbnail_jobs WHERE media_id = ?", (media_id,)
+            ).fetchone()
+            if status == "failed":
+                break
+            time.sleep(0.2)
+    finally:
+        conn.close()
+    assert (status, attempts) == ("failed", settings.THUMBNAIL_MAX_ATTEMPTS)
@@ -0,0 +1,55 @@
+import os
+import uuid
+import pytest
+from unittest.mock import patch
+
+from app.integrity import WriteSampler, verify_written_file
+
+BLOCK = 1024 * 1024
+
+@pytest.fixture(scope="module")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    with TestClient(app) as c:
+        c.cookies.set("guest_name", "IntegrityUser")
+        c.cookies.set("guest_uuid", str(uuid.uuid4()))
+        yield c
+
+@pytest.mark.parametrize("mode", ["rehash", "fsync", "sampled"])
+def test_upload_in_each_verify_mode(client, mode):
+    from app.config import settings
+    content = os.urandom(3 * BLOCK + 123)
+    with patch.object(settings, "UPLOAD_VERIFY_MODE", mode):
+        response = client.post("/upload", files={"file": ("clip.mp4", content, "video/mp4")})
+    assert response.status_code == 200
+    assert "id" in response.json()
+
+def write_sampled(path, content):
+    sampler = WriteSampler(BLOCK, stride=2)
+    with open(path, "wb") as f:
+        for offset in range(0, len(content), BLOCK):
+            block = content[offset:offset + BLOCK]
+            sampler.record(offset, block)
+            f.write(block)
+    return sampler
+
+def test_sampled_verify_detects_corruption(tmp_path):
+    path = str(tmp_path / "file.bin")
+    content = os.urandom(5 * BLOCK + 7)
+    sampler = write_sampled(path, content)
+    assert verify_written_file(path, mode="sampled", file_hash="", size=len(content), sampler=sampler)
+
+    # Flip a byte inside a sampled window (head of block 2)
+    with open(path, "r+b") as f:
+        f.seek(2 * BLOCK + 10)
+        f.write(bytes([content[2 * BLOCK + 10] ^ 0xFF]))
+    assert not verify_written_file(path, mode="sampled", file_hash="", size=len(content), sampler=sampler)
+
+def test_size_mismatch_detected(tmp_path):
+    path = str(tmp_path / "file.bin")
+    content = os.urandom(BLOCK + 1)
+    sampler = write_sampled(path, content)
+    with open(path, "r+b") as f:
+        f.truncate(BLOCK)
+    assert not verify_written_file(path, mode="fsync", file_hash="", size=len(content), sampler=sampler)
@@ -0,0 +1,36 @@
+import uuid
+import asyncio
+
+from sqlalchemy import text
+
+def _view_count(media_id):
+    from app.database import engine
+
+    async def read():
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT view_count, last_viewed FROM media WHERE id = :id"), {"id": media_id})
+            return result.first()
+    return asyncio.run(read())
+
+def test_views_are_batched_and_flushed_on_shutdown():
+    from app.main import app, view_counter
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        client.cookies.set("guest_name", "ViewGuest")
+        client.cookies.set("guest_uuid", str(uuid.uuid4()))
+        media_id = client.post("/upload", files={"file": ("v.mp4", uuid.uuid4().bytes, "video/mp4")}).json()["id"]
+
+        assert client.post(f"/media/{media_id}/viewed").status_code == 200
+        response = client.post("/media/viewed", json=[media_id, media_id, 999999])
+        assert response.json()["recorded"] == 3
+        assert client.post("/media/viewed", json=[media_id] * 501).status_code == 413
+
+        # Nothing written yet
+        assert _view_count(media_id)[0] == 0
+        assert view_counter.pending == 4
+
+    view_count, last_viewed = _view_count(media_id)
+    assert view_count == 3
+    assert last_viewed is not None
+    assert view_counter.pending == 0
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from sqlalchemy import select, delete
+
+from app.models import AppConfig
+from app.writer import DbWriter
+
+def _run(coro):
+    from app.database import init_db
+
+    async def main():
+        await init_db()
+        return await coro()
+    return asyncio.run(main())
+
+def test_queued_jobs_share_one_commit_and_failures_stay_isolated():
+    from app.database import SessionLocal
+
+    async def scenario():
+        writer = DbWriter(SessionLocal)
+        await writer.start()
+        await writer.run(lambda db: db.execute(delete(AppConfig).where(AppConfig.key.like("writer-test-%"))))
+
+        def insert(i):
+            async def job(db):
+                db.add(AppConfig(key=f"writer-test-{i}", value=str(i)))
+                return i
+            return job
+
+        async def broken(db):
+            db.add(AppConfig(key="writer-test-0", value="duplicate key"))
+            await db.flush()
+
+        results = await asyncio.gather(
+            *(writer.run(insert(i)) for i in range(10)), writer.run(broken), return_exceptions=True
+        )
+        stats = writer.stats()
+        await writer.stop()
+
+        async with SessionLocal() as db:
+            rows = await db.execute(select(AppConfig.key).where(AppConfig.key.like("writer-test-%")))
+            return results, stats, {row[0] for row in rows}
+
+    results, stats, keys = _run(scenario)
+    assert results[:10] == list(range(10))
+    assert isinstance(results[10], Exception)
+    assert keys == {f"writer-test-{i}" for i in range(10)}
+    assert stats["max_batch"] == 11
+    assert stats["failed"] == 1
+
+def test_run_requires_a_started_writer():
+    from app.database import SessionLocal
+
+    async def scenario():
+        await DbWriter(SessionLocal).run(lambda db: db.execute(select(1)))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())